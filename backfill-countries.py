@@ -0,0 +1,38 @@
+import argparse
+import os
+import sys
+import time
+
+import database
+from ollama_hunter.geo import RANGES_FILE, CountryIndex, backfill_countries
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fill in hosts' countries from an offline IP range file, without whois or network lookups.")
+    parser.add_argument("--ranges", default=RANGES_FILE,
+                        help="CSV of IP ranges and countries, optionally gzipped (default: %(default)s).")
+    parser.add_argument("--all", action="store_true",
+                        help="Look up every host, replacing countries that differ, not just missing ones.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report how many hosts would change.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.ranges):
+        print(f"[!] Range file {args.ranges} not found. Pass --ranges or set GEO_RANGES.")
+        sys.exit(1)
+
+    database.create_database() # Ensure db is created
+    started = time.perf_counter()
+    index = CountryIndex.from_file(args.ranges)
+    print(f"[i] Loaded {len(index)} ranges for {len(index.names)} countries in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    looked_up, changed = backfill_countries(index, overwrite=args.all, dry_run=args.dry_run)
+    elapsed = time.perf_counter() - started
+    print(f"[i] Looked up {looked_up} hosts in {elapsed:.2f}s")
+    if args.dry_run:
+        print(f"[i] {changed} hosts would get a new country.")
+    else:
+        print(f"[✓] Backfilled countries: {changed} hosts changed.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Times a discovery run over synthetic Shodan pages against the local stub Ollama.
+
+Page fetches are simulated with a fixed delay and never touch Shodan; every
+host is a ``127.x.y.z`` address answered by the stub.
+
+    python benchmarks/bench_discovery.py --pages 20 --per-page 50 --latency 0.05 --concurrency 1 16
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--per-page", type=int, default=50)
+    parser.add_argument("--page-latency", type=float, default=0.5, help="Simulated Shodan page fetch time.")
+    parser.add_argument("--delay", type=float, default=0.5, help="Seconds between page fetches.")
+    parser.add_argument("--port", type=int, default=18435)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub response delay in seconds.")
+    parser.add_argument("--concurrency", type=int, nargs='+', default=[1, 4, 16])
+    args = parser.parse_args()
+
+    os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ['OLLAMA_PORT'] = str(args.port)
+
+    import stub_ollama
+    from ollama_hunter import discovery
+
+    def scrape(page, headers, query, log):
+        time.sleep(args.page_latency)
+        if page > args.pages:
+            return []
+        return [{'ip': f"127.{page}.{i // 254}.{1 + i % 254}", 'country': None, 'city': None, 'org': None,
+                 'timestamp': None} for i in range(args.per_page)]
+
+    discovery.scrape_hosts_from_page = scrape
+    discovery.DELAY = args.delay
+    stub_ollama.serve(args.port, args.latency)
+
+    hosts = args.pages * args.per_page
+    for concurrency in args.concurrency:
+        started = time.perf_counter()
+        discovery.discover_hosts(
+            "cookie",
+            query=f"bench {concurrency}",  # a new run each time
+            log=lambda message: message.startswith("[i]") and print(message),
+            skip_ttl=0,
+            concurrency=concurrency,
+        )
+        elapsed = time.perf_counter() - started
+        print(f"{args.pages} pages x {args.per_page} hosts, concurrency {concurrency}, "
+              f"stub latency {args.latency * 1000:.0f} ms: {elapsed:.1f}s ({hosts / elapsed:.0f} hosts/s)\n")
+
+if __name__ == "__main__":
+    main()
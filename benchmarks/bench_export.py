@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Measures time to first byte, total time and peak Python memory of the bulk exports.
+
+    python benchmarks/bench_export.py --hosts 50000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_providers import load_app, seed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=50000)
+    parser.add_argument("--path", action="append", help="Endpoint to stream (repeatable).")
+    args = parser.parse_args()
+    paths = args.path or ["/api/providers.ndjson", "/api/providers.csv"]
+
+    os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(), "bench.db")
+    import database
+    database.create_database()
+    seed(database, args.hosts, random.Random(args.hosts))
+    client = load_app().test_client()
+
+    for path in paths:
+        tracemalloc.start()
+        started = time.perf_counter()
+        response = client.get(path, buffered=False)
+        chunks = iter(response.response)
+        size = len(next(chunks))
+        first_byte = time.perf_counter() - started
+        for chunk in chunks:
+            size += len(chunk)
+        response.close()
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{args.hosts} hosts  {path:<24} first byte {first_byte * 1000:7.1f} ms   "
+              f"total {elapsed:6.2f}s   {size / 1e6:6.1f} MB sent   peak {peak / 1e6:6.1f} MB")
+
+if __name__ == "__main__":
+    main()
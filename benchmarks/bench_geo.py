@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Times building the offline country index and looking hosts up in it.
+
+A synthetic range file about the size of a free IPv4 country database is
+written first, unless ``--ranges`` points at a real one.
+
+    python benchmarks/bench_geo.py --ranges-count 300000 --lookups 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from ollama_hunter import geo
+
+COUNTRIES = ['United States', 'Germany', 'China', 'France', 'Singapore', 'Japan', 'Brazil', 'India']
+
+def write_ranges(path, count, rng):
+    step = 2 ** 32 // count
+    with open(path, 'w') as f:
+        for i in range(count):
+            start = i * step
+            f.write(f"{start},{start + rng.randint(step // 2, step - 1)},{rng.choice(COUNTRIES)}\n")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ranges", help="A real range file to load instead of a synthetic one.")
+    parser.add_argument("--ranges-count", type=int, default=300000)
+    parser.add_argument("--lookups", type=int, default=100000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    path = args.ranges
+    if not path:
+        path = os.path.join(tempfile.mkdtemp(), "ranges.csv")
+        write_ranges(path, args.ranges_count, rng)
+
+    started = time.perf_counter()
+    index = geo.CountryIndex.from_file(path)
+    loaded = time.perf_counter() - started
+    tracemalloc.start()
+    copy = geo.CountryIndex.from_file(path)
+    retained, peak = tracemalloc.get_traced_memory()
+    del copy
+    tracemalloc.stop()
+    print(f"load {len(index)} ranges: {loaded:.2f}s, {retained / 2 ** 20:.1f} MiB retained, "
+          f"{peak / 2 ** 20:.1f} MiB peak")
+
+    ips = [f"{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}"
+           for _ in range(args.lookups)]
+    started = time.perf_counter()
+    for ip in ips:
+        index.lookup(ip)
+    single = time.perf_counter() - started
+    started = time.perf_counter()
+    found = index.lookup_many(ips)
+    batch = time.perf_counter() - started
+    print(f"{args.lookups} lookups: one by one {args.lookups / single:,.0f}/s, "
+          f"batch {args.lookups / batch:,.0f}/s ({len(found)} placed)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Compares job start-up cost: forking ``refresh-hosts.py`` vs. the in-process runner.
+
+Both variants run a refresh against an empty temporary database, so the
+numbers are pure start-up and bookkeeping overhead, not probe time.
+
+    python benchmarks/bench_jobs.py --runs 20
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def _report(label, samples):
+    samples = sorted(samples)
+    p50 = statistics.median(samples) * 1000
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000
+    print(f"{label:<28} p50 {p50:8.2f} ms   p99 {p99:8.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    os.environ['DATABASE_PATH'] = os.path.join(tmpdir, "bench.db")
+    sys.path.insert(0, ROOT)
+
+    samples = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "refresh-hosts.py"], cwd=ROOT, stdout=subprocess.DEVNULL, check=True)
+        samples.append(time.perf_counter() - started)
+    _report("subprocess refresh-hosts.py", samples)
+
+    started = time.perf_counter()
+    from ollama_hunter import jobs
+    from ollama_hunter.refresh import refresh_hosts
+    manager = jobs.JobManager(echo=None)
+    print(f"{'first import (once)':<28} {(time.perf_counter() - started) * 1000:8.2f} ms")
+
+    samples = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        job, _ = manager.submit("refresh", refresh_hosts)
+        job.wait()
+        samples.append(time.perf_counter() - started)
+    _report("in-process JobManager", samples)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Measures observation storage per row and range-query latency.
+
+    python benchmarks/bench_observations.py --hosts 20000 --probes 100
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=20000)
+    parser.add_argument("--probes", type=int, default=100, help="observations per host")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(), "bench.db")
+    import database
+
+    database.create_database()
+    with database.transaction() as conn:
+        conn.executemany("INSERT INTO hosts (ip_address, last_seen, performance, is_alive) VALUES (?, '', 'Small', 1)",
+                         [(f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",) for i in range(args.hosts)])
+    size_before = os.path.getsize(database.DB_FILE)
+
+    # Probes arrive in refresh order: one round across all hosts per hour.
+    start = int(time.time()) - args.probes * 3600
+    rng = random.Random(0)
+    started = time.perf_counter()
+    for probe in range(args.probes):
+        with database.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO observations (host_id, observed_at, status, latency_ms, models_hash) VALUES (?, ?, ?, ?, ?)",
+                [(host_id, start + probe * 3600 + host_id % 3600, 1, rng.randint(20, 900), host_id % 50)
+                 for host_id in range(1, args.hosts + 1)])
+    elapsed = time.perf_counter() - started
+    rows = args.hosts * args.probes
+    database.get_db_connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    size = os.path.getsize(database.DB_FILE) - size_before
+    print(f"appended {rows} rows in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s), {size / rows:.1f} bytes/row")
+
+    def timed(label, query):
+        timings = []
+        for _ in range(args.queries):
+            began = time.perf_counter()
+            found = query()
+            timings.append(time.perf_counter() - began)
+        timings.sort()
+        print(f"{label:<28} p50 {timings[len(timings) // 2] * 1000:7.2f} ms  "
+              f"p95 {timings[int(len(timings) * 0.95)] * 1000:7.2f} ms  ({len(found)} rows)")
+
+    ips = [f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}" for i in range(args.hosts)]
+    timed("one host, full history", lambda: database.get_observations(rng.choice(ips)))
+    timed("one host, last day", lambda: database.get_observations(rng.choice(ips), since=start + (args.probes - 24) * 3600))
+    timed("all hosts, 10-minute window", lambda: database.get_observations(
+        since=(t := start + rng.randrange(args.probes) * 3600), until=t + 600))
+
+if __name__ == "__main__":
+    main()
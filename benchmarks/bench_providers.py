@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Measures ``/`` and ``/api/providers`` latency on synthetic fleets.
+
+    python benchmarks/bench_providers.py --hosts 1000 10000 50000 --runs 20
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+FAMILIES = ["llama3", "llama3.1", "qwen2.5", "qwen2.5-coder", "mistral", "gemma2", "phi3", "deepseek-r1",
+            "codellama", "nomic-embed-text", "mixtral", "command-r", "llava", "starcoder2", "yi"]
+TAGS = [("latest", "8.0B"), ("1.5b", "1.5B"), ("7b", "7.6B"), ("14b", "14.8B"), ("32b", "32.8B"), ("70b", "70.6B")]
+QUANTS = ["Q4_0", "Q4_K_M", "Q5_K_M", "Q8_0", "F16"]
+
+def load_app():
+    spec = importlib.util.spec_from_file_location("provider_service", os.path.join(ROOT, "provider-service.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.app
+
+def seed(database, hosts, rng):
+    """Fills the database with ``hosts`` live hosts of 1-8 models each."""
+    results = []
+    for i in range(hosts):
+        models = []
+        for family in rng.sample(FAMILIES, rng.randint(1, 8)):
+            tag, size = rng.choice(TAGS)
+            models.append({'name': f"{family}:{tag}", 'modified_at': "2024-07-01T12:00:00Z",
+                           'digest': f"{rng.getrandbits(64):016x}",
+                           'parameter_size': size, 'quantization_level': rng.choice(QUANTS)})
+        results.append({'ip_address': f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+                        'performance': rng.choice(["High-Performance", "Mid-Range", "Small-Model / Hobbyist"]),
+                        'country': rng.choice(["United States", "Germany", "China", None]),
+                        'models': models})
+        if len(results) == 5000:
+            database.write_probe_results(results)
+            results = []
+    database.write_probe_results(results)
+
+def measure(client, path, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        response = client.get(path)
+        response.get_data()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return statistics.median(samples) * 1000, p99 * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--path", action="append", help="Endpoint to time (repeatable).")
+    args = parser.parse_args()
+    paths = args.path or ["/", "/api/providers"]
+
+    os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(), "bench.db")
+    import database
+    client = load_app().test_client()
+
+    for hosts in args.hosts:
+        database.DB_FILE = os.path.join(tempfile.mkdtemp(), f"bench-{hosts}.db")
+        database.create_database()
+        seed(database, hosts, random.Random(hosts))
+        for path in paths:
+            p50, p99 = measure(client, path, args.runs)
+            print(f"{hosts:>6} hosts  {path:<28} p50 {p50:9.1f} ms   p99 {p99:9.1f} ms")
+
+if __name__ == "__main__":
+    main()
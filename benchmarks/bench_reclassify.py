@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Compares reclassifying every host in Python against the set-based SQL pass.
+
+    python benchmarks/bench_reclassify.py --hosts 50000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+SIZES = ['70.6B', '32.8B', '14.8B', '8.0B', '7.2B', '3.8B', '137M']
+QUANTS = ['Q4_0', 'Q4_K_M', 'Q8_0', 'F16', 'IQ3_XS']
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=50000)
+    parser.add_argument("--catalog", type=int, default=2000, help="distinct models across the fleet")
+    args = parser.parse_args()
+
+    os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(), "bench.db")
+    import database
+    from ollama_hunter.classifier import estimate_host_performance
+
+    database.create_database()
+    rng = random.Random(0)
+    catalog = [{'name': f"model{i}", 'modified_at': 'N/A', 'parameter_size': rng.choice(SIZES),
+                'quantization_level': rng.choice(QUANTS)} for i in range(args.catalog)]
+    results = [{'ip_address': f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}", 'performance': "stale",
+                'models': rng.sample(catalog, rng.randint(1, 8))} for i in range(args.hosts)]
+    for start in range(0, len(results), 5000):
+        database.write_probe_results(results[start:start + 5000])
+
+    # Python: load every host's models, classify each host, write the changes
+    started = time.perf_counter()
+    conn = database.get_db_connection()
+    by_host = {}
+    for row in conn.execute("SELECT host_id, parameter_size, quantization_level FROM models"):
+        by_host.setdefault(row['host_id'], []).append(dict(row))
+    tiers = [(estimate_host_performance(models), host_id) for host_id, models in by_host.items()]
+    with database.transaction() as conn:
+        conn.executemany("UPDATE hosts SET performance = ? WHERE id = ?", tiers)
+    python_elapsed = time.perf_counter() - started
+    print(f"python per-host      {args.hosts} hosts in {python_elapsed:6.2f}s")
+
+    with database.transaction() as conn:
+        conn.execute("UPDATE hosts SET performance = 'stale'")
+    started = time.perf_counter()
+    changed = database.reclassify_hosts()
+    sql_elapsed = time.perf_counter() - started
+    print(f"sql, one pass        {args.hosts} hosts in {sql_elapsed:6.2f}s ({changed} changed, "
+          f"{python_elapsed / sql_elapsed:.1f}x faster)")
+
+if __name__ == "__main__":
+    main()
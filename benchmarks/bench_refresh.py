@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Times a full refresh of a synthetic fleet against the local stub Ollama.
+
+Hosts are spread over ``127.x.y.z`` so the per-/24 limits are exercised.
+
+    python benchmarks/bench_refresh.py --hosts 10000 --concurrency 64 --latency 0.05
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=10000)
+    parser.add_argument("--port", type=int, default=18434)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub response delay in seconds.")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--per-subnet", type=int, default=4)
+    parser.add_argument("--max-rate", type=float, default=0)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ['OLLAMA_PORT'] = str(args.port)
+
+    import database
+    import stub_ollama
+    from ollama_hunter.refresh import refresh_hosts
+
+    database.create_database()
+    now = "2024-01-01T00:00:00"
+    with database.connect() as conn:
+        conn.executemany(
+            "INSERT INTO hosts (ip_address, last_seen, performance, is_alive) VALUES (?, ?, 'Unknown', 1)",
+            ((f"127.{1 + i // (254 * 256)}.{i // 254 % 256}.{1 + i % 254}", now) for i in range(args.hosts)),
+        )
+
+    stub_ollama.serve(args.port, args.latency)
+    started = time.perf_counter()
+    refresh_hosts(
+        log=lambda message: message.startswith("[i]") and print(message),
+        concurrency=args.concurrency,
+        per_subnet=args.per_subnet,
+        max_rate=args.max_rate,
+        full=True,
+    )
+    elapsed = time.perf_counter() - started
+    print(f"{args.hosts} hosts, concurrency {args.concurrency}, per-/24 {args.per_subnet}, "
+          f"stub latency {args.latency * 1000:.0f} ms: {elapsed:.1f}s ({args.hosts / elapsed:.0f} hosts/s)")
+
+if __name__ == "__main__":
+    main()
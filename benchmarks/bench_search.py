@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Times /api/models/search lookups against counting hosts at query time.
+
+    python benchmarks/bench_search.py --hosts 60000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+FAMILIES = ['llama3', 'llama3.1', 'llama3.2', 'qwen2.5', 'qwen2.5-coder', 'mistral', 'mixtral', 'gemma2',
+            'phi3', 'deepseek-r1', 'deepseek-coder-v2', 'codellama', 'nomic-embed-text', 'llava']
+TAGS = ['latest', '7b', '8b', '14b', '32b', '70b', '8x7b', 'instruct', 'q4_K_M', 'fp16']
+QUERIES = ['ll', 'lla', 'llama3', 'coder', ':70b', 'qwen2.5-coder:32b', 'deepseek', 'zzz']
+
+def percentile(samples, fraction):
+    return sorted(samples)[int(len(samples) * fraction)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=60000)
+    parser.add_argument("--names", type=int, default=20000, help="distinct model names across the fleet")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(), "bench.db")
+    import database
+
+    database.create_database()
+    rng = random.Random(0)
+    names = [f"{rng.choice(FAMILIES)}:{rng.choice(TAGS)}" for _ in range(len(FAMILIES) * len(TAGS))]
+    names += [f"user{i}/{rng.choice(FAMILIES)}-ft{i}:{rng.choice(TAGS)}" for i in range(args.names - len(names))]
+    # Popular names are on most hosts, fine-tunes on a few
+    weights = [50 if i < len(FAMILIES) * len(TAGS) else 1 for i in range(len(names))]
+    results = []
+    for i in range(args.hosts):
+        models = {name: {'name': name, 'modified_at': 'N/A', 'parameter_size': '8B', 'quantization_level': 'Q4_0'}
+                  for name in rng.choices(names, weights, k=rng.randint(1, 10))}
+        results.append({'ip_address': f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}", 'performance': "Mid-Range",
+                        'models': list(models.values())})
+    for start in range(0, len(results), 5000):
+        database.write_probe_results(results[start:start + 5000])
+    conn = database.get_db_connection()
+    rows = conn.execute("SELECT COUNT(*) FROM host_models").fetchone()[0]
+    print(f"{args.hosts} hosts, {rows} host model rows, {len(set(names))} distinct names")
+
+    for query in QUERIES:
+        samples = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            found = database.search_models(query)
+            samples.append(time.perf_counter() - started)
+
+        # The same answer by counting live hosts per matching name at query time
+        started = time.perf_counter()
+        conn.execute('''
+            SELECT c.name, COUNT(DISTINCT hm.host_id) AS hosts
+            FROM model_catalog c
+            JOIN host_models hm ON hm.model_id = c.id
+            JOIN hosts h ON h.id = hm.host_id AND h.is_alive
+            WHERE c.name LIKE ?
+            GROUP BY c.name ORDER BY hosts DESC LIMIT 20
+        ''', (f"%{query}%",)).fetchall()
+        counted = time.perf_counter() - started
+
+        print(f"q={query!r:22} {len(found):3} results  p50 {statistics.median(samples) * 1000:6.2f} ms  "
+              f"p95 {percentile(samples, 0.95) * 1000:6.2f} ms  (LIKE + count: {counted * 1000:7.1f} ms)")
+
+if __name__ == "__main__":
+    main()
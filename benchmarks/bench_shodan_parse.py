@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Times each Shodan result-page parser backend over the saved fixture pages.
+
+    python benchmarks/bench_shodan_parse.py --repeat 200
+
+Reports the median parse time and the peak memory allocated while parsing
+one page, for every backend whose dependencies are installed.
+"""
+
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from ollama_hunter import shodan
+
+FIXTURES = os.path.join(ROOT, 'tests', 'fixtures', 'shodan_*.html')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    backends = shodan.available_backends()
+    missing = [name for name in shodan.PARSER_BACKENDS if name not in backends]
+    if missing:
+        print(f"[i] Not installed: {', '.join(missing)}")
+
+    for path in sorted(glob.glob(FIXTURES)):
+        with open(path, encoding='utf-8') as f:
+            page = f.read()
+        print(f"{os.path.basename(path)} ({len(page) / 1024:.0f} KiB)")
+        baseline = None
+        for backend in backends:
+            samples = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                hosts = shodan.parse_results(page, backend=backend)
+                samples.append(time.perf_counter() - started)
+            median = statistics.median(samples)
+            baseline = baseline or median
+
+            tracemalloc.start()
+            shodan.parse_results(page, backend=backend)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            print(f"  {backend:6} {len(hosts):3} hosts  {median * 1000:7.3f} ms/page  "
+                  f"peak {peak / 1024:8.1f} KiB  ({median / baseline:.1f}x the {backends[0]} time)")
+
+if __name__ == "__main__":
+    main()
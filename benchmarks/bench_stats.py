@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Times the fleet dashboard from summary tables against ad-hoc GROUP BYs,
+and what keeping the summaries costs on writes.
+
+    python benchmarks/bench_stats.py --hosts 50000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+FAMILIES = ['llama3', 'llama3.1', 'qwen2.5', 'qwen2.5-coder', 'mistral', 'gemma2', 'phi3', 'deepseek-r1']
+TAGS = ['latest', '7b', '8b', '14b', '32b', '70b']
+QUANTS = ['Q4_0', 'Q4_K_M', 'Q8_0', 'F16']
+COUNTRIES = ['United States', 'Germany', 'China', 'France', 'Singapore', None]
+TIERS = ['High-Performance', 'Mid-Range', 'CPU-Only / Low-RAM', 'Small-Model / Hobbyist']
+STATS_TRIGGERS = ('hosts_stats_insert', 'hosts_stats_update', 'hosts_stats_alive',
+                  'host_models_stats_insert', 'host_models_stats_delete')
+
+def fleet(rng, hosts, offset=0):
+    catalog = [{'name': f"{family}:{tag}", 'modified_at': 'N/A', 'parameter_size': '8B', 'quantization_level': quant}
+               for family in FAMILIES for tag in TAGS for quant in QUANTS]
+    return [{'ip_address': f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}", 'performance': rng.choice(TIERS),
+             'country': rng.choice(COUNTRIES), 'models': rng.sample(catalog, rng.randint(0, 6))}
+            for i in range(offset, offset + hosts)]
+
+def write(database, results):
+    started = time.perf_counter()
+    for start in range(0, len(results), 5000):
+        database.write_probe_results(results[start:start + 5000])
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(), "bench.db")
+    import database
+
+    database.create_database()
+    rng = random.Random(0)
+    loaded = write(database, fleet(rng, args.hosts))
+    churn = fleet(rng, args.hosts)  # the same hosts with new model lists
+    with_triggers = write(database, churn)
+    print(f"{args.hosts} hosts: load {loaded:.2f}s, re-probe with new models {with_triggers:.2f}s (summaries kept)")
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        database.get_fleet_stats(limit=25)
+    summary = (time.perf_counter() - started) / args.repeat
+    conn = database.get_db_connection()
+    started = time.perf_counter()
+    conn.execute(database._FLEET_STATS_SQL).fetchall()
+    grouped = time.perf_counter() - started
+    print(f"dashboard from summaries {summary * 1000:7.2f} ms   ad-hoc GROUP BY {grouped * 1000:7.1f} ms")
+
+    started = time.perf_counter()
+    drift = database.verify_summaries()
+    print(f"verify against a full recompute: {len(drift)} drifted in {time.perf_counter() - started:.2f}s")
+
+    with database.transaction() as conn:
+        for trigger in STATS_TRIGGERS:
+            conn.execute(f"DROP TRIGGER {trigger}")
+    without_triggers = write(database, fleet(rng, args.hosts))
+    print(f"re-probe with new models without the stats triggers {without_triggers:.2f}s "
+          f"(summaries cost {(with_triggers / without_triggers - 1) * 100:+.0f}% on writes)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Times parsing /api/tags bodies into model records, against the old dict copy.
+
+    python benchmarks/bench_tags_parse.py --repeat 200
+
+Covers a typical small reply, a large one and malformed ones. Also reports
+the memory the parsed models of the large reply keep alive.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from ollama_hunter import probe
+
+def tags(count):
+    return json.dumps({"models": [{
+        "name": f"model-{i}:latest",
+        "model": f"model-{i}:latest",
+        "modified_at": "2024-07-01T12:00:00.123456789+02:00",
+        "size": 4661224676 + i,
+        "digest": f"{i:064x}",
+        "details": {"parent_model": "", "format": "gguf", "family": "llama", "families": ["llama"],
+                    "parameter_size": "8.0B", "quantization_level": "Q4_0"},
+    } for i in range(count)]}).encode()
+
+def dict_copy(body):
+    """The previous parser: the whole document, then a dict per model."""
+    data = json.loads(body)
+    models = []
+    for m in data.get("models", []):
+        details = m.get("details") or {}
+        models.append({
+            "name": m.get("name"),
+            "modified_at": m.get("modified_at"),
+            "digest": m.get("digest"),
+            "parameter_size": details.get("parameter_size"),
+            "quantization_level": details.get("quantization_level"),
+        })
+    return models
+
+def records(loads):
+    def parse(body):
+        probe._loads = loads
+        return probe._parse_tags(body)
+    return parse
+
+def timed(parse, body, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        try:
+            parse(body)
+        except (ValueError, probe.ProbeError):
+            pass
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+def retained(parse, body):
+    tracemalloc.start()
+    models = parse(body)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del models
+    return size
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    large = tags(1000)
+    payloads = {
+        'small (3 models)': tags(3),
+        'large (1000 models)': large,
+        'truncated': large[:len(large) // 2],
+        'html error page': b"<html><body>" + b"x" * 2000 + b"</body></html>",
+    }
+    parsers = {'dict copy': dict_copy, 'records/json': records(json.loads)}
+    if probe.orjson:
+        parsers['records/orjson'] = records(probe.orjson.loads)
+    else:
+        print("[i] orjson is not installed")
+
+    for name, body in payloads.items():
+        print(f"{name} ({len(body) / 1024:.1f} KiB)")
+        for label, parse in parsers.items():
+            print(f"  {label:15} {timed(parse, body, args.repeat) * 1e6:9.1f} us")
+    print("models kept alive from the large reply")
+    for label, parse in parsers.items():
+        print(f"  {label:15} {retained(parse, large) / 1024:9.1f} KiB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Compares per-host database writes against the batched ``write_probe_results``.
+
+A final pass re-probes the batched hosts with unchanged model lists, which
+leaves the model rows alone now that model lists are diffed. Each host row
+is still rewritten, for its refresh schedule, and gets an observation, so
+the WAL bytes each pass appends are printed as well.
+
+    python benchmarks/bench_writes.py --hosts 2000 --chunk-size 500
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+MODELS = [
+    {'name': 'llama3:8b', 'modified_at': '2024-07-01T12:00:00Z', 'parameter_size': '8.0B', 'quantization_level': 'Q4_0'},
+    {'name': 'qwen2.5-coder:32b', 'modified_at': '2024-11-12T08:30:00Z', 'parameter_size': '32.8B', 'quantization_level': 'Q4_K_M'},
+    {'name': 'nomic-embed-text:latest', 'modified_at': '2024-03-01T10:00:00Z', 'parameter_size': '137M', 'quantization_level': 'F16'},
+]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=2000)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(), "bench.db")
+    import database
+    from ollama_hunter.persistence import ResultWriter
+
+    database.create_database()
+    wal_path = os.environ['DATABASE_PATH'] + "-wal"
+
+    def reset_wal():
+        database.get_db_connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    ips = [f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}" for i in range(args.hosts)]
+    rows = args.hosts * (1 + len(MODELS))
+
+    reset_wal()
+    started = time.perf_counter()
+    for ip in ips:
+        host_id = database.add_or_update_host(ip, "Mid-Range", is_alive=1)
+        database.clear_models_for_host(host_id)
+        database.add_models(host_id, MODELS)
+    elapsed = time.perf_counter() - started
+    print(f"per-host calls      {args.hosts} hosts in {elapsed:6.2f}s ({rows / elapsed:8.0f} rows/s, "
+          f"{os.path.getsize(wal_path) / 1024:8.0f} KiB WAL)")
+
+    ips = [f"11.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}" for i in range(args.hosts)]
+    for label in (f"batched, chunk {args.chunk_size:<4}", "stable re-probe    "):
+        writer = ResultWriter(chunk_size=args.chunk_size, flush_interval=float('inf'))
+        reset_wal()
+        started = time.perf_counter()
+        with writer:
+            for ip in ips:
+                writer.add(ip, MODELS)
+        elapsed = time.perf_counter() - started
+        print(f"{label} {args.hosts} hosts in {elapsed:6.2f}s ({writer.rows_written:7d} rows written, "
+              f"{args.hosts / elapsed:8.0f} hosts/s, {os.path.getsize(wal_path) / 1024:8.0f} KiB WAL)")
+
+if __name__ == "__main__":
+    main()
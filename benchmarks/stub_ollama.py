@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""A tiny stand-in for Ollama's ``/api/tags`` for local benchmarks.
+
+Binds to every address, so on Linux any ``127.x.y.z`` host reaches it and a
+fleet of fake hosts can be spread over many /24s.
+
+    python benchmarks/stub_ollama.py --port 11434 --latency 0.05
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TAGS = {
+    "models": [
+        {
+            "name": "llama3:8b",
+            "modified_at": "2024-07-01T12:00:00Z",
+            "digest": "365c0bd3c000a25d28ddbf732fe1c6add414de7275464c4e4d1c3b5fcb5d8ad1",
+            "size": 4661224676,
+            "details": {"family": "llama", "parameter_size": "8.0B", "quantization_level": "Q4_0"},
+        },
+        {
+            "name": "qwen2.5-coder:32b",
+            "modified_at": "2024-11-12T08:30:00Z",
+            "digest": "4bd6cbf2d094264457a17aab6bd6acd1ed7a72fb8f8be3cfb193f63c78dd56df",
+            "size": 19851349856,
+            "details": {"family": "qwen2", "parameter_size": "32.8B", "quantization_level": "Q4_K_M"},
+        },
+    ]
+}
+
+def make_handler(body, latency):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            if self.path != "/api/tags":
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+def serve(port, latency=0.0, tags=TAGS):
+    """Starts the stub on a daemon thread and returns the server."""
+    body = json.dumps(tags).encode()
+    ThreadingHTTPServer.daemon_threads = True
+    ThreadingHTTPServer.request_queue_size = 1024
+    server = ThreadingHTTPServer(("0.0.0.0", port), make_handler(body, latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before answering.")
+    args = parser.parse_args()
+    serve(args.port, args.latency)
+    print(f"[+] Stub Ollama listening on :{args.port}")
+    threading.Event().wait()
+
+if __name__ == "__main__":
+    main()
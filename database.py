@@ -1,17 +1,107 @@
-
+import functools
+import hashlib
+import json
 import sqlite3
-from datetime import datetime
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 import os
 
+from ollama_hunter import classifier, metrics
+
 # Use DATABASE_PATH from environment variable, with a default for local development
 DB_FILE = os.environ.get('DATABASE_PATH', "ollama_hosts.db")
+BUSY_TIMEOUT_MS = int(os.environ.get('DATABASE_BUSY_TIMEOUT_MS', 5000))
 
-def get_db_connection():
-    """Establishes a connection to the SQLite database."""
-    conn = sqlite3.connect(DB_FILE)
+# Refresh schedule: live hosts are due again after RECHECK_INTERVAL seconds;
+# dead hosts double that per consecutive failure, up to MAX_RECHECK_BACKOFF.
+RECHECK_INTERVAL = 3600
+MAX_RECHECK_BACKOFF = 7 * 24 * 3600
+
+# Observation history: every probe is kept for OBSERVATION_RAW_DAYS, after
+# which only state changes and one row per host per day survive; nothing is
+# kept past OBSERVATION_RETENTION_DAYS.
+OBSERVATION_RAW_DAYS = 30
+OBSERVATION_RETENTION_DAYS = 365
+
+# Observation status codes
+OBS_UNREACHABLE = 0
+OBS_ALIVE = 1
+OBS_EMPTY = 2  # answered, but serves no models
+
+_local = threading.local()
+
+DB_QUERY_SECONDS = metrics.histogram(
+    "ollama_db_query_seconds", "Time spent in database calls, by function.", ["query"])
+
+def _timed(func):
+    """Records each call's duration in DB_QUERY_SECONDS."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with DB_QUERY_SECONDS.time(query=func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+def open_db_connection(path=None):
+    """Opens a new connection to the SQLite database with our pragmas applied.
+
+    WAL lets readers and a writer work at the same time, synchronous=NORMAL
+    is safe under WAL and skips an fsync per commit, and busy_timeout makes
+    a second writer wait for the lock instead of failing immediately.
+    """
+    conn = sqlite3.connect(path or DB_FILE, timeout=BUSY_TIMEOUT_MS / 1000)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
     return conn
 
+def get_db_connection():
+    """Returns this thread's connection to the SQLite database.
+
+    The connection is opened on first use and reused by every later call on
+    the same thread, so callers must not close it; use
+    close_db_connection() when a thread is done with the database.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.path != DB_FILE:
+        if conn is not None:
+            conn.close()
+        conn = _local.conn = open_db_connection()
+        _local.path = DB_FILE
+    return conn
+
+def close_db_connection():
+    """Closes this thread's connection, if it has one."""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+@contextmanager
+def transaction():
+    """Yields this thread's connection inside a transaction.
+
+    Commits when the block finishes and rolls back if it raises.
+    """
+    conn = get_db_connection()
+    with conn:
+        yield conn
+
+@contextmanager
+def connect(path=None):
+    """Yields a dedicated connection that is committed and closed on exit.
+
+    For one-off work that should not keep a connection around, such as
+    scripts and short-lived threads.
+    """
+    conn = open_db_connection(path)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
 def create_database():
     """Initializes the database and creates tables if they don't exist."""
     # Ensure the directory for the database file exists
@@ -20,8 +110,38 @@ def create_database():
         os.makedirs(db_dir)
 
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
+    with conn:
+        if _schema_version(conn) == 0:
+            _create_tables(conn.cursor())
+    migrate_database(conn)
+
+def _schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate_database(conn):
+    """Upgrades the schema in place by running every pending migration.
+
+    The schema version lives in ``PRAGMA user_version``. Each migration runs
+    in its own IMMEDIATE transaction together with the version bump, and the
+    version is re-read under that lock, so two processes starting at once
+    cannot apply the same step twice.
+    """
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = _schema_version(conn)
+            if version >= len(MIGRATIONS):
+                conn.commit()
+                return
+            MIGRATIONS[version](conn.cursor())
+            conn.execute(f"PRAGMA user_version = {version + 1}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+def _create_tables(cursor):
+    """Creates the original (version 0) tables; migrations take it from there."""
     # Create hosts table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS hosts (
@@ -46,8 +166,585 @@ def create_database():
             FOREIGN KEY (host_id) REFERENCES hosts (id)
         )
     ''')
-    conn.commit()
 
+def _migrate_v1_model_catalog(cursor):
+    """Indexes hosts and moves model details into a shared catalog.
+
+    Each distinct (name, parameter_size, quantization_level) is stored once
+    in ``model_catalog``; ``host_models`` links hosts to catalog entries.
+    ``models`` becomes a view with the old columns for ad-hoc queries.
+    """
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_hosts_alive_last_seen ON hosts (is_alive, last_seen)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_hosts_last_seen ON hosts (last_seen)")
+    cursor.execute('''
+        CREATE TABLE model_catalog (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            parameter_size TEXT,
+            quantization_level TEXT
+        )
+    ''')
+    # NULLs never collide in a UNIQUE index, so key on IFNULL'd columns
+    cursor.execute('''
+        CREATE UNIQUE INDEX idx_model_catalog_identity
+        ON model_catalog (name, IFNULL(parameter_size, ''), IFNULL(quantization_level, ''))
+    ''')
+    cursor.execute('''
+        CREATE TABLE host_models (
+            host_id INTEGER NOT NULL REFERENCES hosts (id),
+            model_id INTEGER NOT NULL REFERENCES model_catalog (id),
+            modified_at TEXT,
+            PRIMARY KEY (host_id, model_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX idx_host_models_model ON host_models (model_id, host_id)")
+
+    cursor.execute('''
+        INSERT OR IGNORE INTO model_catalog (name, parameter_size, quantization_level)
+        SELECT name, parameter_size, quantization_level FROM models ORDER BY id
+    ''')
+    cursor.execute('''
+        INSERT OR IGNORE INTO host_models (host_id, model_id, modified_at)
+        SELECT m.host_id, c.id, m.modified_at
+        FROM models m JOIN model_catalog c
+          ON c.name = m.name
+         AND IFNULL(c.parameter_size, '') = IFNULL(m.parameter_size, '')
+         AND IFNULL(c.quantization_level, '') = IFNULL(m.quantization_level, '')
+        ORDER BY m.id
+    ''')
+    cursor.execute("DROP TABLE models")
+    cursor.execute('''
+        CREATE VIEW models AS
+        SELECT hm.host_id, c.name, hm.modified_at, c.parameter_size, c.quantization_level
+        FROM host_models hm JOIN model_catalog c ON c.id = hm.model_id
+    ''')
+
+def _migrate_v2_data_version(cursor):
+    """Adds the ``meta`` table holding the data-version counter."""
+    cursor.execute('''
+        CREATE TABLE meta (
+            key TEXT PRIMARY KEY,
+            value
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("INSERT INTO meta (key, value) VALUES ('data_version', 0), ('data_updated_at', ?)",
+                   (datetime.utcnow().isoformat(),))
+
+def _migrate_v3_refresh_schedule(cursor):
+    """Adds the per-host state the incremental refresh scheduler runs on."""
+    cursor.execute("ALTER TABLE hosts ADD COLUMN last_probed_at TEXT")
+    cursor.execute("ALTER TABLE hosts ADD COLUMN next_probe_at TEXT")
+    cursor.execute("ALTER TABLE hosts ADD COLUMN fail_count INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("ALTER TABLE hosts ADD COLUMN probe_count INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("ALTER TABLE hosts ADD COLUMN change_count INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("CREATE INDEX idx_hosts_next_probe ON hosts (next_probe_at)")
+
+def _migrate_v4_model_diffs(cursor):
+    """Stores model digests and adds the ``model_events`` change log."""
+    cursor.execute("ALTER TABLE host_models ADD COLUMN digest TEXT")
+    cursor.execute('''
+        CREATE TABLE model_events (
+            id INTEGER PRIMARY KEY,
+            host_id INTEGER NOT NULL REFERENCES hosts (id),
+            observed_at TEXT NOT NULL,
+            added TEXT NOT NULL,
+            removed TEXT NOT NULL,
+            updated TEXT NOT NULL
+        )
+    ''')
+    cursor.execute("CREATE INDEX idx_model_events_host ON model_events (host_id, observed_at)")
+    cursor.execute("DROP VIEW models")
+    cursor.execute('''
+        CREATE VIEW models AS
+        SELECT hm.host_id, c.name, hm.modified_at, hm.digest, c.parameter_size, c.quantization_level
+        FROM host_models hm JOIN model_catalog c ON c.id = hm.model_id
+    ''')
+
+def _migrate_v5_observations(cursor):
+    """Adds the append-only ``observations`` history and its ``model_sets``.
+
+    Observations are kept narrow: integer host ids, epoch seconds, a status
+    code, latency in milliseconds and a 64-bit hash of the model set. The
+    primary key clusters each host's history together, so WITHOUT ROWID
+    stores the rows in that order with no separate rowid b-tree; a second
+    index on the timestamp serves time-window queries.
+    """
+    cursor.execute('''
+        CREATE TABLE observations (
+            host_id INTEGER NOT NULL,
+            observed_at INTEGER NOT NULL,
+            status INTEGER NOT NULL,
+            latency_ms INTEGER,
+            models_hash INTEGER,
+            PRIMARY KEY (host_id, observed_at)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX idx_observations_time ON observations (observed_at)")
+    cursor.execute('''
+        CREATE TABLE model_sets (
+            hash INTEGER PRIMARY KEY,
+            models TEXT NOT NULL
+        )
+    ''')
+    cursor.execute("INSERT INTO meta (key, value) VALUES ('observations_compacted_before', 0)")
+
+def _migrate_v6_parsed_sizes(cursor):
+    """Caches each catalogued model's parsed parameter count (in billions)."""
+    cursor.execute("ALTER TABLE model_catalog ADD COLUMN parameter_size_b REAL")
+    cursor.executemany("UPDATE model_catalog SET parameter_size_b = ? WHERE id = ?", [
+        (classifier.parse_size_to_gb(size), model_id)
+        for model_id, size in cursor.execute("SELECT id, parameter_size FROM model_catalog").fetchall()
+    ])
+
+def _migrate_v7_quantizations(cursor):
+    """Adds the quantization lookup table and numeric size/footprint columns.
+
+    Sizes are re-parsed with the stricter parser, which also understands
+    mixture-of-experts sizes such as '8x7B'.
+    """
+    cursor.execute('''
+        CREATE TABLE quantizations (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            bits_per_weight REAL,
+            vram_gb_per_b REAL
+        )
+    ''')
+    cursor.execute("ALTER TABLE model_catalog ADD COLUMN quantization_id INTEGER REFERENCES quantizations (id)")
+    cursor.execute("ALTER TABLE model_catalog ADD COLUMN footprint_gb REAL")
+    _quantization_ids(cursor, classifier.QUANTIZATIONS)
+
+    rows = cursor.execute("SELECT id, parameter_size, quantization_level FROM model_catalog").fetchall()
+    quant_ids = _quantization_ids(cursor, [quant for _, _, quant in rows])
+    cursor.executemany(
+        "UPDATE model_catalog SET parameter_size_b = ?, quantization_id = ?, footprint_gb = ? WHERE id = ?",
+        [_catalog_numbers(size, quant, quant_ids) + (model_id,) for model_id, size, quant in rows])
+    cursor.execute("CREATE INDEX idx_model_catalog_size ON model_catalog (parameter_size_b)")
+    cursor.execute("CREATE INDEX idx_model_catalog_footprint ON model_catalog (footprint_gb)")
+
+def _migrate_v8_host_capacity(cursor):
+    """Adds each host's estimated memory needs as indexed columns."""
+    cursor.execute("ALTER TABLE hosts ADD COLUMN max_model_gb REAL NOT NULL DEFAULT 0")
+    cursor.execute("ALTER TABLE hosts ADD COLUMN capacity_gb REAL NOT NULL DEFAULT 0")
+    cursor.execute(_CAPACITY_SQL)
+    cursor.execute("CREATE INDEX idx_hosts_alive_capacity ON hosts (is_alive, capacity_gb)")
+    cursor.execute("CREATE INDEX idx_hosts_alive_max_model ON hosts (is_alive, max_model_gb)")
+
+# A model's family is its name without the ``:tag``
+_FAMILY_SQL = "CASE WHEN instr({name}, ':') THEN substr({name}, 1, instr({name}, ':') - 1) ELSE {name} END"
+
+def _migrate_v9_model_search(cursor):
+    """Adds a trigram full-text index over distinct model names and families.
+
+    ``model_names`` holds each distinct name once, with the number of live
+    hosts serving it; triggers keep it current as catalog entries, host
+    models and host liveness change, so searches never count at query time.
+    """
+    cursor.execute('''
+        CREATE TABLE model_names (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            family TEXT NOT NULL,
+            host_count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE VIRTUAL TABLE model_search USING fts5 (
+            name, family, content='model_names', content_rowid='id', tokenize='trigram'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER model_names_insert AFTER INSERT ON model_names BEGIN
+            INSERT INTO model_search (rowid, name, family) VALUES (NEW.id, NEW.name, NEW.family);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER model_catalog_insert AFTER INSERT ON model_catalog BEGIN
+            INSERT OR IGNORE INTO model_names (name, family) VALUES (NEW.name, {family});
+        END
+    '''.format(family=_FAMILY_SQL.format(name='NEW.name')))
+    # A host counts once per name, however many sizes/quantizations of it it serves
+    for event, row, delta in (('INSERT', 'NEW', '+ 1'), ('DELETE', 'OLD', '- 1')):
+        cursor.execute('''
+            CREATE TRIGGER host_models_{trigger} AFTER {event} ON host_models
+            WHEN (SELECT is_alive FROM hosts WHERE id = {row}.host_id)
+            BEGIN
+                UPDATE model_names SET host_count = host_count {delta}
+                WHERE name = (SELECT name FROM model_catalog WHERE id = {row}.model_id)
+                  AND NOT EXISTS (
+                      SELECT 1 FROM host_models hm JOIN model_catalog c ON c.id = hm.model_id
+                      WHERE hm.host_id = {row}.host_id AND hm.model_id != {row}.model_id
+                        AND c.name = model_names.name);
+            END
+        '''.format(trigger=event.lower(), event=event, row=row, delta=delta))
+    cursor.execute('''
+        CREATE TRIGGER hosts_alive_count AFTER UPDATE OF is_alive ON hosts
+        WHEN OLD.is_alive IS NOT NEW.is_alive
+        BEGIN
+            UPDATE model_names SET host_count = host_count + (CASE WHEN NEW.is_alive THEN 1 ELSE -1 END)
+            WHERE name IN (
+                SELECT c.name FROM host_models hm JOIN model_catalog c ON c.id = hm.model_id
+                WHERE hm.host_id = NEW.id);
+        END
+    ''')
+    _rebuild_model_names(cursor)
+
+def _rebuild_model_names(cursor):
+    """Recomputes ``model_names`` and its search index from scratch."""
+    cursor.execute("INSERT OR IGNORE INTO model_names (name, family) SELECT DISTINCT name, {} FROM model_catalog".format(
+        _FAMILY_SQL.format(name='name')))
+    cursor.execute('''
+        WITH counts (name, hosts) AS ({counts})
+        UPDATE model_names SET host_count = IFNULL((SELECT hosts FROM counts WHERE counts.name = model_names.name), 0)
+    '''.format(counts=_MODEL_NAME_COUNTS_SQL))
+    cursor.execute("INSERT INTO model_search (model_search) VALUES ('rebuild')")
+
+# Dimensions of the fleet_stats summary. 'status' counts every host as
+# 'alive' or 'dead'; the others count live hosts by country, performance
+# tier, and the model families and quantizations they serve.
+STATS_DIMENSIONS = ('status', 'country', 'performance', 'family', 'quantization')
+
+# Full recompute of fleet_stats, as (dimension, key, hosts) rows
+_FLEET_STATS_SQL = '''
+    SELECT 'status', CASE WHEN is_alive THEN 'alive' ELSE 'dead' END, COUNT(*) FROM hosts GROUP BY 2
+    UNION ALL
+    SELECT 'country', IFNULL(country, ''), COUNT(*) FROM hosts WHERE is_alive GROUP BY 2
+    UNION ALL
+    SELECT 'performance', IFNULL(performance, ''), COUNT(*) FROM hosts WHERE is_alive GROUP BY 2
+    UNION ALL
+    SELECT 'family', n.family, COUNT(DISTINCT hm.host_id)
+    FROM host_models hm
+    JOIN hosts h ON h.id = hm.host_id AND h.is_alive
+    JOIN model_catalog c ON c.id = hm.model_id
+    JOIN model_names n ON n.name = c.name
+    GROUP BY 2
+    UNION ALL
+    SELECT 'quantization', IFNULL(c.quantization_level, ''), COUNT(DISTINCT hm.host_id)
+    FROM host_models hm
+    JOIN hosts h ON h.id = hm.host_id AND h.is_alive
+    JOIN model_catalog c ON c.id = hm.model_id
+    GROUP BY 2
+'''
+
+# Full recompute of model_names.host_count, as (name, hosts) rows
+_MODEL_NAME_COUNTS_SQL = '''
+    SELECT c.name, COUNT(DISTINCT hm.host_id)
+    FROM host_models hm
+    JOIN hosts h ON h.id = hm.host_id AND h.is_alive
+    JOIN model_catalog c ON c.id = hm.model_id
+    GROUP BY c.name
+'''
+
+def _stats_delta(dimension, keys, delta):
+    """Trigger statement adding ``delta`` hosts to each key selected by ``keys``."""
+    return '''
+        INSERT INTO fleet_stats (dimension, key, hosts)
+        SELECT '{dimension}', key, {delta} FROM ({keys}) WHERE true
+        ON CONFLICT (dimension, key) DO UPDATE SET hosts = hosts + excluded.hosts;
+    '''.format(dimension=dimension, keys=keys, delta=delta)
+
+def _migrate_v10_fleet_stats(cursor):
+    """Adds ``fleet_stats``, host counts per dimension kept current by triggers.
+
+    Serving the dashboard then reads a handful of rows, whatever the fleet
+    size, instead of grouping every host and model. A host counts once per
+    family or quantization however many of its models share it.
+    """
+    cursor.execute('''
+        CREATE TABLE fleet_stats (
+            dimension TEXT NOT NULL,
+            key TEXT NOT NULL,
+            hosts INTEGER NOT NULL,
+            PRIMARY KEY (dimension, key)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX idx_fleet_stats_rank ON fleet_stats (dimension, hosts)")
+
+    status = "SELECT CASE WHEN {row}.is_alive THEN 'alive' ELSE 'dead' END AS key"
+    live_column = "SELECT IFNULL({row}.{column}, '') AS key WHERE {row}.is_alive"
+    cursor.execute("CREATE TRIGGER hosts_stats_insert AFTER INSERT ON hosts BEGIN {} END".format("".join([
+        _stats_delta('status', status.format(row='NEW'), 1),
+        _stats_delta('country', live_column.format(row='NEW', column='country'), 1),
+        _stats_delta('performance', live_column.format(row='NEW', column='performance'), 1),
+    ])))
+    cursor.execute('''
+        CREATE TRIGGER hosts_stats_update AFTER UPDATE OF is_alive, country, performance ON hosts
+        WHEN OLD.is_alive IS NOT NEW.is_alive OR OLD.country IS NOT NEW.country
+          OR OLD.performance IS NOT NEW.performance
+        BEGIN {} END
+    '''.format("".join(
+        _stats_delta(dimension, keys.format(row=row, column=dimension), delta)
+        for dimension, keys in (('status', status), ('country', live_column), ('performance', live_column))
+        for row, delta in (('OLD', -1), ('NEW', 1))
+    )))
+
+    # The families and quantizations of a host's models, one row each
+    host_families = '''
+        SELECT DISTINCT n.family AS key
+        FROM host_models hm JOIN model_catalog c ON c.id = hm.model_id JOIN model_names n ON n.name = c.name
+        WHERE hm.host_id = NEW.id'''
+    host_quantizations = '''
+        SELECT DISTINCT IFNULL(c.quantization_level, '') AS key
+        FROM host_models hm JOIN model_catalog c ON c.id = hm.model_id
+        WHERE hm.host_id = NEW.id'''
+    cursor.execute('''
+        CREATE TRIGGER hosts_stats_alive AFTER UPDATE OF is_alive ON hosts
+        WHEN OLD.is_alive IS NOT NEW.is_alive
+        BEGIN {} {} END
+    '''.format(_stats_delta('family', host_families, "CASE WHEN NEW.is_alive THEN 1 ELSE -1 END"),
+               _stats_delta('quantization', host_quantizations, "CASE WHEN NEW.is_alive THEN 1 ELSE -1 END")))
+
+    # A model's family or quantization, unless another model on the host shares it
+    model_family = '''
+        SELECT n.family AS key FROM model_catalog c JOIN model_names n ON n.name = c.name
+        WHERE c.id = {row}.model_id AND NOT EXISTS (
+            SELECT 1 FROM host_models hm
+            JOIN model_catalog oc ON oc.id = hm.model_id JOIN model_names o ON o.name = oc.name
+            WHERE hm.host_id = {row}.host_id AND hm.model_id != {row}.model_id AND o.family = n.family)'''
+    model_quantization = '''
+        SELECT IFNULL(c.quantization_level, '') AS key FROM model_catalog c
+        WHERE c.id = {row}.model_id AND NOT EXISTS (
+            SELECT 1 FROM host_models hm JOIN model_catalog oc ON oc.id = hm.model_id
+            WHERE hm.host_id = {row}.host_id AND hm.model_id != {row}.model_id
+              AND IFNULL(oc.quantization_level, '') = IFNULL(c.quantization_level, ''))'''
+    for event, row, delta in (('INSERT', 'NEW', 1), ('DELETE', 'OLD', -1)):
+        cursor.execute('''
+            CREATE TRIGGER host_models_stats_{trigger} AFTER {event} ON host_models
+            WHEN (SELECT is_alive FROM hosts WHERE id = {row}.host_id)
+            BEGIN {family} {quantization} END
+        '''.format(trigger=event.lower(), event=event, row=row,
+                   family=_stats_delta('family', model_family.format(row=row), delta),
+                   quantization=_stats_delta('quantization', model_quantization.format(row=row), delta)))
+
+    cursor.execute(f"INSERT INTO fleet_stats (dimension, key, hosts) {_FLEET_STATS_SQL}")
+
+def _migrate_v11_discovery_runs(cursor):
+    """Adds checkpoints for discovery runs, so an interrupted run can resume.
+
+    ``last_page`` is the last results page fully processed. ``discovery_seen``
+    holds the IPs a run has already handled; it is written in the same
+    transaction as their probe results and dropped when the run finishes.
+    """
+    cursor.execute('''
+        CREATE TABLE discovery_runs (
+            id INTEGER PRIMARY KEY,
+            query TEXT NOT NULL,
+            start_page INTEGER NOT NULL,
+            last_page INTEGER,
+            seen_count INTEGER NOT NULL DEFAULT 0,
+            started_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            finished_at TEXT
+        )
+    ''')
+    cursor.execute("CREATE INDEX idx_discovery_runs_query ON discovery_runs (query, finished_at)")
+    cursor.execute('''
+        CREATE TABLE discovery_seen (
+            run_id INTEGER NOT NULL REFERENCES discovery_runs (id),
+            ip_address TEXT NOT NULL,
+            seen_at TEXT NOT NULL,
+            PRIMARY KEY (run_id, ip_address)
+        ) WITHOUT ROWID
+    ''')
+
+# Schema migrations, in order; MIGRATIONS[n] upgrades version n to n + 1.
+MIGRATIONS = [
+    _migrate_v1_model_catalog,
+    _migrate_v2_data_version,
+    _migrate_v3_refresh_schedule,
+    _migrate_v4_model_diffs,
+    _migrate_v5_observations,
+    _migrate_v6_parsed_sizes,
+    _migrate_v7_quantizations,
+    _migrate_v8_host_capacity,
+    _migrate_v9_model_search,
+    _migrate_v10_fleet_stats,
+    _migrate_v11_discovery_runs,
+]
+
+# (file signature, (version, updated_at)) of the last data version read
+_data_version_cache = None
+
+def _bump_data_version(cursor):
+    """Marks the host data as changed; call inside the writing transaction."""
+    global _data_version_cache
+    cursor.execute("UPDATE meta SET value = value + 1 WHERE key = 'data_version'")
+    cursor.execute("UPDATE meta SET value = ? WHERE key = 'data_updated_at'", (datetime.utcnow().isoformat(),))
+    _data_version_cache = None
+
+def _file_signature():
+    """mtime and size of the database and its WAL, or None if not on disk.
+
+    Every commit touches one of the two files, so an unchanged signature
+    means the data version cannot have moved.
+    """
+    signature = [DB_FILE]
+    for path in (DB_FILE, DB_FILE + "-wal"):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            if path == DB_FILE:
+                return None
+            stat = None
+        signature.append((stat.st_mtime_ns, stat.st_size) if stat else None)
+    return tuple(signature)
+
+def get_data_version():
+    """Returns ``(version, updated_at)`` for the host data.
+
+    ``version`` increases with every committed write made through this
+    module, from any process. While the database files are untouched the
+    last value is returned without querying SQLite.
+    """
+    global _data_version_cache
+    signature = _file_signature()
+    if signature is not None and _data_version_cache and _data_version_cache[0] == signature:
+        return _data_version_cache[1]
+
+    conn = get_db_connection()
+    rows = dict(conn.execute("SELECT key, value FROM meta WHERE key IN ('data_version', 'data_updated_at')").fetchall())
+    version = (rows['data_version'], rows['data_updated_at'])
+    if signature is not None:
+        _data_version_cache = (signature, version)
+    return version
+
+def _model_key(model):
+    return (model['name'], model['parameter_size'], model['quantization_level'])
+
+def _quantization_ids(cursor, levels):
+    """Returns ``{quantization_level: id}``, adding unknown levels to the lookup table."""
+    levels = [level for level in dict.fromkeys(levels) if level]
+    cursor.executemany(
+        "INSERT OR IGNORE INTO quantizations (name, bits_per_weight, vram_gb_per_b) VALUES (?, ?, ?)",
+        [(level,) + classifier.quantization_info(level) for level in levels])
+    return {row['name']: row['id'] for row in _select_in(
+        cursor, "SELECT id, name FROM quantizations WHERE name IN ({seq})", levels)}
+
+def _catalog_numbers(parameter_size, quantization_level, quant_ids):
+    """``(parameter_size_b, quantization_id, footprint_gb)`` for a catalog entry."""
+    size_b = classifier.parse_size_to_gb(parameter_size)
+    _, vram_gb_per_b = classifier.quantization_info(quantization_level)
+    footprint = round(size_b * vram_gb_per_b, 2) if size_b and vram_gb_per_b else None
+    return size_b, quant_ids.get(quantization_level), footprint
+
+def _catalog_ids(cursor, models):
+    """Returns ``{(name, parameter_size, quantization_level): id}`` for ``models``,
+    adding any missing entries to the model catalog."""
+    keys = list(dict.fromkeys(_model_key(m) for m in models))
+    # Sizes and quantizations are resolved once, when a model is first catalogued
+    quant_ids = _quantization_ids(cursor, [key[2] for key in keys])
+    cursor.executemany('''
+        INSERT OR IGNORE INTO model_catalog
+            (name, parameter_size, quantization_level, parameter_size_b, quantization_id, footprint_gb)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', [key + _catalog_numbers(key[1], key[2], quant_ids) for key in keys])
+    ids = {}
+    for key in keys:
+        cursor.execute('''
+            SELECT id FROM model_catalog
+            WHERE name = ? AND IFNULL(parameter_size, '') = IFNULL(?, '')
+              AND IFNULL(quantization_level, '') = IFNULL(?, '')
+        ''', key)
+        row = cursor.fetchone()
+        if row is None:
+            # OR IGNORE also skips rows that break a constraint, e.g. a NULL name
+            raise ValueError(f"model {key!r} could not be added to the catalog")
+        ids[key] = row[0]
+    return ids
+
+def _insert_host_models(cursor, host_models):
+    """Links ``(host_id, model)`` pairs, cataloguing new models on the way."""
+    catalog_ids = _catalog_ids(cursor, [m for _, m in host_models])
+    cursor.executemany('''
+        INSERT INTO host_models (host_id, model_id, modified_at, digest)
+        VALUES (?, ?, ?, ?)
+        -- An upsert rather than OR REPLACE, whose implicit delete skips the count triggers
+        ON CONFLICT (host_id, model_id) DO UPDATE SET modified_at = excluded.modified_at, digest = excluded.digest
+    ''', [
+        (host_id, catalog_ids[_model_key(m)], m['modified_at'], m.get('digest'))
+        for host_id, m in host_models
+    ])
+    return cursor.rowcount
+
+def _sync_host_models(cursor, models_by_host, now):
+    """Brings each host's stored models in line with a fresh probe.
+
+    ``models_by_host`` maps host ids to the probed model lists. Instead of
+    deleting and re-inserting every row, the stored set is diffed against
+    the probe: new models are inserted, vanished ones deleted, and models
+    whose digest (or, without one, modified_at) moved are updated in place.
+    Hosts with any difference get a ``model_events`` row and their
+    ``change_count`` bumped; a host's first model list is not a change.
+    Returns the number of rows written.
+    """
+    catalog_ids = _catalog_ids(cursor, [m for models in models_by_host.values() for m in models])
+    stored = {}
+    for row in _select_in(cursor, '''
+            SELECT hm.host_id, hm.model_id, hm.modified_at, hm.digest, c.name
+            FROM host_models hm JOIN model_catalog c ON c.id = hm.model_id
+            WHERE hm.host_id IN ({seq})''', list(models_by_host)):
+        stored.setdefault(row['host_id'], {})[row['model_id']] = row
+
+    inserts, deletes, updates, events = [], [], [], []
+    for host_id, models in models_by_host.items():
+        old = stored.get(host_id, {})
+        new = {catalog_ids[_model_key(m)]: m for m in models}
+        added, removed, updated = [], [], []
+
+        for model_id, m in new.items():
+            row = old.get(model_id)
+            if row is None:
+                inserts.append((host_id, model_id, m['modified_at'], m.get('digest')))
+                added.append(m['name'])
+            elif (m.get('digest') != row['digest'] if m.get('digest') or row['digest']
+                  else m['modified_at'] != row['modified_at']):
+                updates.append((m['modified_at'], m.get('digest'), host_id, model_id))
+                updated.append(m['name'])
+        for model_id, row in old.items():
+            if model_id not in new:
+                deletes.append((host_id, model_id))
+                removed.append(row['name'])
+
+        if old and (added or removed or updated):
+            events.append((host_id, now, json.dumps(added), json.dumps(removed), json.dumps(updated)))
+
+    rows = 0
+    cursor.executemany("DELETE FROM host_models WHERE host_id = ? AND model_id = ?", deletes)
+    rows += cursor.rowcount
+    cursor.executemany(
+        "INSERT INTO host_models (host_id, model_id, modified_at, digest) VALUES (?, ?, ?, ?)", inserts)
+    rows += cursor.rowcount
+    cursor.executemany(
+        "UPDATE host_models SET modified_at = ?, digest = ? WHERE host_id = ? AND model_id = ?", updates)
+    rows += cursor.rowcount
+    cursor.executemany('''
+        INSERT INTO model_events (host_id, observed_at, added, removed, updated)
+        VALUES (?, ?, ?, ?, ?)
+    ''', events)
+    rows += cursor.rowcount
+    cursor.executemany("UPDATE hosts SET change_count = change_count + 1 WHERE id = ?",
+                       [(event[0],) for event in events])
+    # The host rows are already counted by the caller's upsert
+    _update_capacity(cursor, {host_id for host_id, *_ in inserts + deletes})
+    return rows
+
+_CAPACITY_SQL = '''
+    UPDATE hosts SET (max_model_gb, capacity_gb) = (
+        SELECT IFNULL(MAX(c.footprint_gb), 0), IFNULL(ROUND(SUM(c.footprint_gb), 2), 0)
+        FROM host_models hm JOIN model_catalog c ON c.id = hm.model_id
+        WHERE hm.host_id = hosts.id
+    )'''
+
+def _update_capacity(cursor, host_ids):
+    """Recomputes the capacity columns of hosts whose model set changed.
+
+    ``max_model_gb`` is the estimated memory for a host's largest model and
+    ``capacity_gb`` for its whole model set, from the catalog footprints.
+    """
+    cursor.executemany(_CAPACITY_SQL + " WHERE id = ?", [(host_id,) for host_id in host_ids])
+    return cursor.rowcount
+
+@_timed
 def add_or_update_host(ip_address, performance, is_alive=1, country=None):
     """Adds a new host or updates the last_seen, performance, and is_alive status of an existing one."""
     conn = get_db_connection()
@@ -78,21 +775,20 @@ def add_or_update_host(ip_address, performance, is_alive=1, country=None):
         ''', (ip_address, now, performance, is_alive, country))
         host_id = cursor.lastrowid
         
+    _bump_data_version(cursor)
     conn.commit()
     return host_id
 
+@_timed
 def add_models(host_id, models):
     """Adds a list of models for a given host."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    for model in models:
-        cursor.execute('''
-            INSERT INTO models (host_id, name, modified_at, parameter_size, quantization_level)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (host_id, model['name'], model['modified_at'], model['parameter_size'], model['quantization_level']))
-    conn.commit()
+    with transaction() as conn:
+        cursor = conn.cursor()
+        _insert_host_models(cursor, [(host_id, model) for model in models])
+        _update_capacity(cursor, [host_id])
+        _bump_data_version(cursor)
 
+@_timed
 def get_all_hosts():
     """Retrieves all hosts from the database."""
     conn = get_db_connection()
@@ -101,6 +797,7 @@ def get_all_hosts():
     hosts = cursor.fetchall()
     return hosts
 
+@_timed
 def get_host_by_ip(ip_address):
     """Retrieves a host by its IP address."""
     conn = get_db_connection()
@@ -109,20 +806,501 @@ def get_host_by_ip(ip_address):
     host = cursor.fetchone()
     return host
 
+@_timed
+def get_host_countries(missing_only=False):
+    """Returns ``(ip_address, country)`` for every host, or only those without a country."""
+    conn = get_db_connection()
+    query = "SELECT ip_address, country FROM hosts"
+    if missing_only:
+        query += " WHERE country IS NULL"
+    return [tuple(row) for row in conn.execute(query)]
+
+@_timed
+def set_host_countries(countries):
+    """Sets the country of each ``(ip_address, country)`` pair in one transaction.
+
+    Returns the number of hosts whose country changed.
+    """
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(
+            "UPDATE hosts SET country = ? WHERE ip_address = ? AND country IS NOT ?",
+            [(country, ip, country) for ip, country in countries],
+        )
+        changed = cursor.rowcount
+        if changed:
+            _bump_data_version(cursor)
+    return changed
+
+@_timed
 def mark_host_as_dead(host_id):
     """Marks a host as not alive."""
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("UPDATE hosts SET is_alive = 0 WHERE id = ?", (host_id,))
+    _bump_data_version(cursor)
     conn.commit()
 
+@_timed
 def clear_models_for_host(host_id):
     """Clears all models for a given host."""
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute("DELETE FROM models WHERE host_id = ?", (host_id,))
+    cursor.execute("DELETE FROM host_models WHERE host_id = ?", (host_id,))
+    _update_capacity(cursor, [host_id])
+    _bump_data_version(cursor)
     conn.commit()
 
+def _select_in(cursor, query, values, chunk_size=500, params=()):
+    """Runs ``query`` (with a ``{seq}`` placeholder list) over ``values`` in chunks.
+
+    ``params`` are bound before the values, for placeholders ahead of ``{seq}``.
+    """
+    rows = []
+    for start in range(0, len(values), chunk_size):
+        chunk = values[start:start + chunk_size]
+        cursor.execute(query.format(seq=','.join(['?' for _ in chunk])), list(params) + chunk)
+        rows.extend(cursor.fetchall())
+    return rows
+
+@_timed
+def write_probe_results(results, discovery_run=None):
+    """Applies a batch of probe results in a single transaction.
+
+    Each result is a dict with ``ip_address``, ``performance``, ``models``
+    and optionally ``country``. Hosts that answered with models are upserted
+    and get their model list replaced; results without models mark an
+    existing host as dead. Returns the number of rows written.
+
+    With ``discovery_run``, every IP in the batch is also recorded as seen
+    by that run, atomically with its result.
+
+    Every result also updates the host's refresh schedule: a live host is
+    due again after RECHECK_INTERVAL, a dead one backs off exponentially up
+    to MAX_RECHECK_BACKOFF, and ``change_count`` counts the probes that found
+    a different model list than the last one.
+    """
+    # If a batch probed the same IP twice, the last result wins.
+    results = list({r['ip_address']: r for r in results}.values())
+    alive = [r for r in results if r['models']]
+    dead = [r for r in results if not r['models']]
+    probed_at = datetime.utcnow()
+    now = probed_at.isoformat()
+    next_probe_at = (probed_at + timedelta(seconds=RECHECK_INTERVAL)).isoformat()
+
+    with transaction() as conn:
+        cursor = conn.cursor()
+        rows = 0
+
+        if alive:
+            cursor.executemany('''
+                INSERT INTO hosts (ip_address, last_seen, performance, is_alive, country,
+                                   last_probed_at, next_probe_at, probe_count)
+                VALUES (?, ?, ?, 1, ?, ?, ?, 1)
+                ON CONFLICT(ip_address) DO UPDATE SET
+                    last_seen = excluded.last_seen,
+                    performance = excluded.performance,
+                    is_alive = 1,
+                    country = COALESCE(excluded.country, hosts.country),
+                    last_probed_at = excluded.last_probed_at,
+                    next_probe_at = excluded.next_probe_at,
+                    fail_count = 0,
+                    probe_count = hosts.probe_count + 1
+            ''', [(r['ip_address'], now, r['performance'], r.get('country'), now, next_probe_at) for r in alive])
+            rows += cursor.rowcount
+
+            host_ids = {row['ip_address']: row['id'] for row in _select_in(
+                cursor, "SELECT id, ip_address FROM hosts WHERE ip_address IN ({seq})",
+                [r['ip_address'] for r in alive])}
+
+            models_by_host = {host_ids[r['ip_address']]: r['models'] for r in alive}
+            rows += _sync_host_models(cursor, models_by_host, now)
+
+        if dead:
+            # SET expressions see the old fail_count, so the first failure
+            # waits one RECHECK_INTERVAL, the next two, then four, ...
+            cursor.executemany('''
+                UPDATE hosts SET
+                    is_alive = 0,
+                    last_probed_at = ?,
+                    next_probe_at = strftime('%Y-%m-%dT%H:%M:%S', ?,
+                        '+' || MIN(? << MIN(fail_count, 30), ?) || ' seconds'),
+                    fail_count = fail_count + 1,
+                    probe_count = probe_count + 1
+                WHERE ip_address = ?
+            ''', [(now, now, RECHECK_INTERVAL, MAX_RECHECK_BACKOFF, r['ip_address']) for r in dead])
+            rows += cursor.rowcount
+
+        rows += _append_observations(cursor, results, int(probed_at.replace(tzinfo=timezone.utc).timestamp()))
+
+        if discovery_run is not None:
+            _mark_discovery_seen(cursor, discovery_run, [r['ip_address'] for r in results], now)
+
+        if rows:
+            _bump_data_version(cursor)
+
+    return rows
+
+def start_discovery_run(query, start_page):
+    """Records the start of a discovery run; returns its id."""
+    now = datetime.utcnow().isoformat()
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO discovery_runs (query, start_page, started_at, updated_at) VALUES (?, ?, ?, ?)
+        ''', (query, start_page, now, now))
+        return cursor.lastrowid
+
+def get_resumable_discovery_run(query):
+    """Returns the latest unfinished discovery run for ``query``, or None."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT * FROM discovery_runs
+        WHERE query = ? AND finished_at IS NULL
+        ORDER BY id DESC LIMIT 1
+    ''', (query,))
+    return cursor.fetchone()
+
+def get_discovery_seen(run_id):
+    """Returns the set of IPs discovery run ``run_id`` has already handled."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT ip_address FROM discovery_seen WHERE run_id = ?", (run_id,))
+    return {row['ip_address'] for row in cursor.fetchall()}
+
+def _mark_discovery_seen(cursor, run_id, ips, now):
+    cursor.executemany("INSERT OR IGNORE INTO discovery_seen (run_id, ip_address, seen_at) VALUES (?, ?, ?)",
+                       [(run_id, ip, now) for ip in ips])
+    cursor.execute('''
+        UPDATE discovery_runs SET seen_count = seen_count + ?, updated_at = ? WHERE id = ?
+    ''', (cursor.rowcount, now, run_id))
+
+def mark_discovery_seen(run_id, ips):
+    """Records ``ips`` as handled by a run without probing them."""
+    with transaction() as conn:
+        _mark_discovery_seen(conn.cursor(), run_id, ips, datetime.utcnow().isoformat())
+
+def checkpoint_discovery_run(run_id, page):
+    """Records that results page ``page`` has been fully processed."""
+    with transaction() as conn:
+        conn.execute("UPDATE discovery_runs SET last_page = ?, updated_at = ? WHERE id = ?",
+                     (page, datetime.utcnow().isoformat(), run_id))
+
+def finish_discovery_run(run_id):
+    """Marks a run as finished and drops its seen IPs, which only resuming needs."""
+    with transaction() as conn:
+        now = datetime.utcnow().isoformat()
+        conn.execute("UPDATE discovery_runs SET finished_at = ?, updated_at = ? WHERE id = ?", (now, now, run_id))
+        conn.execute("DELETE FROM discovery_seen WHERE run_id = ?", (run_id,))
+
+def get_recently_alive(ips, ttl):
+    """Returns the IPs among ``ips`` whose last probe, by any job, succeeded
+    less than ``ttl`` seconds ago."""
+    cutoff = (datetime.utcnow() - timedelta(seconds=ttl)).isoformat()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    rows = _select_in(cursor, """
+        SELECT ip_address FROM hosts
+        WHERE is_alive = 1 AND last_probed_at >= ? AND ip_address IN ({seq})""", list(ips), params=(cutoff,))
+    return {row['ip_address'] for row in rows}
+
+def _model_set_hash(models):
+    """A stable signed 64-bit hash of a model set, ignoring order."""
+    names = sorted(f"{m['name']}@{m.get('digest') or m['modified_at']}" for m in models)
+    digest = hashlib.blake2b("\n".join(names).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True), [m['name'] for m in models]
+
+def _append_observations(cursor, results, observed_at):
+    """Appends one observation per result for hosts we know about."""
+    host_ids = {row['ip_address']: row['id'] for row in _select_in(
+        cursor, "SELECT id, ip_address FROM hosts WHERE ip_address IN ({seq})",
+        [r['ip_address'] for r in results])}
+
+    observations, model_sets = [], {}
+    for r in results:
+        host_id = host_ids.get(r['ip_address'])
+        if host_id is None:
+            continue
+        models_hash = None
+        if r['models']:
+            status = OBS_ALIVE
+            models_hash, names = _model_set_hash(r['models'])
+            model_sets[models_hash] = names
+        else:
+            status = OBS_EMPTY if r['models'] == [] else OBS_UNREACHABLE
+        latency = r.get('latency')
+        latency_ms = round(latency * 1000) if latency is not None else None
+        observations.append((host_id, observed_at, status, latency_ms, models_hash))
+
+    cursor.executemany("INSERT OR IGNORE INTO model_sets (hash, models) VALUES (?, ?)",
+                       [(h, json.dumps(names)) for h, names in model_sets.items()])
+    # Two probes of a host within the same second keep the later one.
+    cursor.executemany('''
+        INSERT OR REPLACE INTO observations (host_id, observed_at, status, latency_ms, models_hash)
+        VALUES (?, ?, ?, ?, ?)
+    ''', observations)
+    return cursor.rowcount
+
+@_timed
+def get_observations(ip_address=None, since=None, until=None, limit=None):
+    """Returns probe observations, oldest first.
+
+    Filter by host with ``ip_address`` and by time with ``since``/``until``
+    (datetimes or epoch seconds, ``until`` exclusive). Each row carries the
+    probe's ``observed_at`` (epoch seconds), ``status``, ``latency_ms``,
+    ``models_hash`` and the JSON list of model names it found.
+    """
+    def epoch(value):
+        if isinstance(value, datetime):
+            return int(value.replace(tzinfo=value.tzinfo or timezone.utc).timestamp())
+        return value
+
+    conditions, params = [], []
+    if ip_address is not None:
+        conditions.append("o.host_id = (SELECT id FROM hosts WHERE ip_address = ?)")
+        params.append(ip_address)
+    if since is not None:
+        conditions.append("o.observed_at >= ?")
+        params.append(epoch(since))
+    if until is not None:
+        conditions.append("o.observed_at < ?")
+        params.append(epoch(until))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    # By host, the primary key already returns rows in time order; across
+    # hosts, the time index does.
+    order = "o.host_id, o.observed_at" if ip_address is not None else "o.observed_at"
+
+    conn = get_db_connection()
+    return conn.execute(f'''
+        SELECT h.ip_address, o.observed_at, o.status, o.latency_ms, o.models_hash, s.models
+        FROM observations o
+        JOIN hosts h ON h.id = o.host_id
+        LEFT JOIN model_sets s ON s.hash = o.models_hash
+        {where}
+        ORDER BY {order}
+        LIMIT ?
+    ''', params + [-1 if limit is None else limit]).fetchall()
+
+@_timed
+def compact_observations(raw_days=OBSERVATION_RAW_DAYS, retention_days=OBSERVATION_RETENTION_DAYS, now=None):
+    """Applies retention and downsampling to the observation history.
+
+    Observations older than ``retention_days`` are dropped. Between that and
+    ``raw_days`` ago, a host keeps the first observation of each UTC day plus
+    every observation whose status or model set differs from the one before
+    it, so the history still says when a host changed. Only whole days are
+    compacted, and only those not compacted by an earlier call are scanned.
+    Returns the rows deleted.
+    """
+    now = int(now if now is not None else datetime.now(timezone.utc).timestamp())
+    drop_before = now - retention_days * 86400
+    # A day split across two calls would keep a "first of the day" in each
+    raw_before = now - raw_days * 86400
+    raw_before -= raw_before % 86400
+
+    with transaction() as conn:
+        cursor = conn.cursor()
+        compacted_before = cursor.execute(
+            "SELECT value FROM meta WHERE key = 'observations_compacted_before'").fetchone()[0]
+
+        cursor.execute("DELETE FROM observations WHERE observed_at < ?", (drop_before,))
+        deleted = cursor.rowcount
+
+        cursor.execute('''
+            DELETE FROM observations WHERE (host_id, observed_at) IN (
+                SELECT host_id, observed_at FROM (
+                    SELECT host_id, observed_at,
+                           status = LAG(status) OVER w
+                               AND models_hash IS LAG(models_hash) OVER w AS unchanged,
+                           ROW_NUMBER() OVER (PARTITION BY host_id, observed_at / 86400
+                                              ORDER BY observed_at) AS nth_of_day
+                    FROM observations
+                    WHERE observed_at >= ? AND observed_at < ?
+                    WINDOW w AS (PARTITION BY host_id ORDER BY observed_at)
+                )
+                WHERE unchanged AND nth_of_day > 1
+            )
+        ''', (max(compacted_before, drop_before), raw_before))
+        deleted += cursor.rowcount
+
+        cursor.execute("UPDATE meta SET value = ? WHERE key = 'observations_compacted_before'",
+                       (max(compacted_before, raw_before),))
+        if deleted:
+            # Cached history responses may include the rows just removed
+            _bump_data_version(cursor)
+    return deleted
+
+def _fleet_tiers_sql():
+    """SQL (and parameters) computing every host's performance tier at once.
+
+    Mirrors ``classifier.estimate_host_performance`` over the cached
+    numeric sizes: one GROUP BY pass aggregates each host's largest model
+    and quantization flags, and a CASE applies the tier thresholds.
+    """
+    high = sorted(classifier.HIGH_QUALITY_QUANTS)
+    low = sorted(classifier.LOW_QUALITY_QUANTS)
+    sql = f'''
+        WITH fleet AS (
+            SELECT hm.host_id,
+                   MAX(IFNULL(c.parameter_size_b, 0)) AS max_b,
+                   MAX(IFNULL(c.parameter_size_b, 0) > ?
+                       AND IFNULL(c.quantization_level, 'unknown') IN ({', '.join('?' * len(high))})) AS large_high_quality,
+                   MIN(IFNULL(c.quantization_level, 'unknown') IN ({', '.join('?' * len(low))})
+                       OR IFNULL(c.quantization_level, '') GLOB 'IQ*') AS all_heavily_quantized
+            FROM host_models hm JOIN model_catalog c ON c.id = hm.model_id
+            GROUP BY hm.host_id
+        ), tiers AS (
+            SELECT host_id, CASE
+                WHEN large_high_quality OR max_b > ? THEN 'High-Performance'
+                WHEN max_b > ? THEN 'Mid-Range'
+                WHEN max_b > ? AND all_heavily_quantized THEN 'CPU-Only / Low-RAM'
+                WHEN max_b < ? THEN 'Small-Model / Hobbyist'
+                ELSE 'Mid-Range'
+            END AS performance
+            FROM fleet
+        )'''
+    params = [classifier.LARGE_MODEL_MIN_B, *high, *low, classifier.HIGH_PERFORMANCE_MIN_B,
+              classifier.MID_RANGE_MIN_B, classifier.CPU_ONLY_MIN_B, classifier.SMALL_MODEL_MAX_B]
+    return sql, params
+
+@_timed
+def reclassify_hosts(dry_run=False):
+    """Recomputes every host's performance tier from its stored models.
+
+    Runs the heuristic for the whole fleet in SQL, so new thresholds apply
+    to every host without re-probing. Hosts whose tier is unchanged are not
+    written. Returns the number of hosts whose tier changed (or would
+    change, with ``dry_run``).
+    """
+    tiers, params = _fleet_tiers_sql()
+    with transaction() as conn:
+        cursor = conn.cursor()
+        if dry_run:
+            return cursor.execute(tiers + '''
+                SELECT COUNT(*) FROM hosts JOIN tiers ON tiers.host_id = hosts.id
+                WHERE hosts.performance IS NOT tiers.performance
+            ''', params).fetchone()[0]
+
+        cursor.execute(tiers + '''
+            UPDATE hosts SET performance = tiers.performance
+            FROM tiers
+            WHERE hosts.id = tiers.host_id AND hosts.performance IS NOT tiers.performance
+        ''', params)
+        # rowcount is not reported for statements that start with WITH
+        changed = cursor.execute("SELECT changes()").fetchone()[0]
+        if changed:
+            _bump_data_version(cursor)
+    return changed
+
+@_timed
+def get_fleet_stats(limit=None):
+    """Returns ``{dimension: [(key, hosts), ...]}`` from the summary table.
+
+    Keys are ordered by host count, largest first, with at most ``limit``
+    per dimension. Unknown countries and tiers have the key ''.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    stats = {}
+    for dimension in STATS_DIMENSIONS:
+        cursor.execute('''
+            SELECT key, hosts FROM fleet_stats
+            WHERE dimension = ? AND hosts > 0
+            ORDER BY hosts DESC, key
+            LIMIT ?
+        ''', (dimension, -1 if limit is None else limit))
+        stats[dimension] = [tuple(row) for row in cursor.fetchall()]
+    return stats
+
+def verify_summaries():
+    """Compares the trigger-maintained summaries with a full recompute.
+
+    Returns ``(table, dimension, key, stored, expected)`` for every count
+    that has drifted, covering ``fleet_stats`` and the per-name counts in
+    ``model_names`` (dimension 'name'); an empty list means they agree.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        WITH expected (dimension, key, hosts) AS ({fleet_stats})
+        SELECT 'fleet_stats', dimension, key, SUM(stored), SUM(expected)
+        FROM (
+            SELECT dimension, key, hosts AS stored, 0 AS expected FROM fleet_stats
+            UNION ALL
+            SELECT dimension, key, 0, hosts FROM expected
+        )
+        GROUP BY dimension, key
+        HAVING SUM(stored) != SUM(expected)
+    '''.format(fleet_stats=_FLEET_STATS_SQL))
+    drift = [tuple(row) for row in cursor.fetchall()]
+    cursor.execute('''
+        WITH expected (name, hosts) AS ({counts})
+        SELECT 'model_names', 'name', n.name, n.host_count, IFNULL(e.hosts, 0)
+        FROM model_names n LEFT JOIN expected e ON e.name = n.name
+        WHERE n.host_count != IFNULL(e.hosts, 0)
+    '''.format(counts=_MODEL_NAME_COUNTS_SQL))
+    return drift + [tuple(row) for row in cursor.fetchall()]
+
+def rebuild_summaries():
+    """Recomputes ``fleet_stats`` and the ``model_names`` counts from scratch."""
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM fleet_stats")
+        cursor.execute(f"INSERT INTO fleet_stats (dimension, key, hosts) {_FLEET_STATS_SQL}")
+        _rebuild_model_names(cursor)
+        _bump_data_version(cursor)
+
+@_timed
+def search_models(query, limit=20):
+    """Returns distinct model names matching ``query``, most-served first.
+
+    Queries of three or more characters match anywhere in a name or family
+    through the trigram index, ignoring case; shorter ones match name
+    prefixes. Names that start with the query rank first. Each row has
+    ``name``, ``family`` and ``hosts``, the number of live hosts serving
+    the model; names no live host serves are left out.
+    """
+    if len(query) >= 3:
+        matches = "SELECT rowid FROM model_search WHERE model_search MATCH ?"
+        params = ['"' + query.replace('"', '""') + '"']
+    else:
+        matches = "SELECT id FROM model_names WHERE name >= ? AND name < ?"
+        params = [query, query + '\U0010ffff']
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT name, family, host_count AS hosts FROM model_names
+        WHERE id IN ({matches}) AND host_count > 0
+        ORDER BY instr(lower(name), lower(?)) = 1 DESC, host_count DESC, name
+        LIMIT ?
+    '''.format(matches=matches), params + [query, limit])
+    return cursor.fetchall()
+
+@_timed
+def get_hosts_due(limit=None, change_weight=1.0):
+    """Returns hosts whose next probe is due, highest priority first.
+
+    Priority is the hours since the host was last probed (or last seen, if
+    it never was), scaled up by how often its model list has changed
+    (``1 + change_weight * changes / probes``) and halved for every
+    consecutive failure. Hosts that were never scheduled are always due.
+    """
+    now = datetime.utcnow().isoformat()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT *,
+               (julianday(?) - julianday(COALESCE(last_probed_at, last_seen))) * 24.0
+                   * (1.0 + ? * change_count / (probe_count + 1.0))
+                   / (1 << MIN(fail_count, 30)) AS priority
+        FROM hosts
+        WHERE next_probe_at IS NULL OR next_probe_at <= ?
+        ORDER BY priority DESC
+        LIMIT ?
+    ''', (now, change_weight, now, -1 if limit is None else limit))
+    return cursor.fetchall()
+
 if __name__ == '__main__':
     print("[+] Initializing database...")
     create_database()
@@ -0,0 +1,16 @@
+"""Shared core for the Thanks Ollama scripts and web service.
+
+The command-line scripts in the repository root are thin entry points around
+this package, and ``provider-service.py`` runs the same code in-process
+through :mod:`ollama_hunter.jobs` instead of forking a new interpreter.
+"""
+
+from .classifier import estimate_host_performance, parse_size_to_gb
+from .probe import ModelRecord, fetch_models_from_ip
+
+__all__ = [
+    "ModelRecord",
+    "estimate_host_performance",
+    "fetch_models_from_ip",
+    "parse_size_to_gb",
+]
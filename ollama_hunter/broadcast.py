@@ -0,0 +1,87 @@
+"""Fan-out of structured job events to any number of subscribers.
+
+A job publishes events into one bounded ring buffer; every subscriber reads
+the same buffer at its own position. Publishing never waits for readers, so
+a slow or stalled client cannot hold back the job. A subscriber that falls
+more than the buffer behind skips ahead and is told how much it missed.
+"""
+
+import itertools
+import json
+import threading
+from collections import deque
+
+# === SETTINGS ===
+REPLAY_EVENTS = 2000  # events kept for late joiners and reconnects
+
+class Broadcaster:
+    """A bounded, replayable stream of ``(id, kind, data)`` events.
+
+    Event ids start at 1 and increase by one, so a subscriber can resume
+    after the last id it saw (e.g. an SSE ``Last-Event-ID``). Each event's
+    data is JSON-encoded once at publish time and shared by all readers.
+    """
+
+    def __init__(self, replay=REPLAY_EVENTS):
+        self._events = deque(maxlen=replay)
+        self._next_id = 1
+        self._closed = False
+        self._changed = threading.Condition()
+
+    @property
+    def last_id(self):
+        return self._next_id - 1
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def publish(self, kind, data):
+        """Appends an event and wakes subscribers; returns its id.
+
+        Events published after ``close()`` are dropped and return None.
+        """
+        encoded = json.dumps(data, separators=(',', ':'))
+        with self._changed:
+            if self._closed:
+                return None
+            event_id = self._next_id
+            self._next_id += 1
+            self._events.append((event_id, kind, data, encoded))
+            self._changed.notify_all()
+        return event_id
+
+    def close(self):
+        """Ends the stream; subscribers finish once they have read the rest."""
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+
+    def subscribe(self, after=0, timeout=None):
+        """Yields ``(id, kind, data, encoded)`` for events after id ``after``.
+
+        Starts with the oldest event still buffered. A reader that has been
+        overtaken first gets a synthetic ``lagged`` event (id None) saying how
+        many events it missed. With a ``timeout``, None is yielded whenever
+        nothing arrived for that long, so callers can send keep-alives.
+        Returns once the broadcaster is closed and drained.
+        """
+        position = after
+        while True:
+            with self._changed:
+                ready = self._changed.wait_for(lambda: self._next_id - 1 > position or self._closed, timeout)
+                oldest = self._next_id - len(self._events)
+                skipped = max(oldest - 1 - position, 0)
+                events = list(itertools.islice(self._events, max(position + 1 - oldest, 0), None))
+                position = self._next_id - 1
+                closed = self._closed
+
+            if skipped:
+                lagged = {'skipped': skipped}
+                yield None, 'lagged', lagged, json.dumps(lagged)
+            if not ready:
+                yield None
+                continue
+            yield from events
+            if closed:
+                return
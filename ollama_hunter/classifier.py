@@ -0,0 +1,116 @@
+import functools
+import re
+
+# === SETTINGS ===
+# Tier thresholds, in billions of parameters. The same values drive the
+# per-host heuristic below and the whole-fleet pass in
+# ``database.reclassify_hosts``, so after changing them a reclassify brings
+# every stored host in line without re-probing.
+HIGH_PERFORMANCE_MIN_B = 60  # any model above this makes a host high-performance
+LARGE_MODEL_MIN_B = 25  # above this, a high-quality quant is high-performance
+MID_RANGE_MIN_B = 25
+CPU_ONLY_MIN_B = 10  # heavily quantized models above this suggest CPU inference
+SMALL_MODEL_MAX_B = 10
+
+# Quantization levels from best to worst
+HIGH_QUALITY_QUANTS = frozenset({'F16', 'BF16', 'Q8_0', 'Q6_K'})
+LOW_QUALITY_QUANTS = frozenset({'Q4_0', 'Q4_K_M', 'Q3_K_S', 'Q2_K'})
+
+# Approximate bits per weight of Ollama/llama.cpp quantization formats,
+# including per-block scales
+QUANTIZATIONS = {
+    'F32': 32.0, 'F16': 16.0, 'BF16': 16.0,
+    'Q8_0': 8.5, 'Q6_K': 6.56,
+    'Q5_K_M': 5.69, 'Q5_K_S': 5.54, 'Q5_1': 6.0, 'Q5_0': 5.5,
+    'Q4_K_M': 4.85, 'Q4_K_S': 4.58, 'Q4_1': 5.0, 'Q4_0': 4.55,
+    'Q3_K_L': 4.27, 'Q3_K_M': 3.91, 'Q3_K_S': 3.5, 'Q2_K': 3.0,
+    'IQ4_XS': 4.25, 'IQ4_NL': 4.5, 'IQ3_M': 3.66, 'IQ3_S': 3.44, 'IQ3_XS': 3.3, 'IQ3_XXS': 3.06,
+    'IQ2_M': 2.7, 'IQ2_S': 2.5, 'IQ2_XS': 2.31, 'IQ2_XXS': 2.06, 'IQ1_M': 1.75, 'IQ1_S': 1.56,
+}
+# Runtime memory on top of the weights (KV cache, activations, buffers)
+VRAM_OVERHEAD = 1.2
+
+# e.g. '7B', '750M', '8.0b', and mixture-of-experts sizes like '8x7B'
+_SIZE_PATTERN = re.compile(r'^(?:(\d+)\s*[x×]\s*)?(\d+(?:\.\d+)?)\s*([kmbt])$', re.IGNORECASE)
+_SIZE_UNITS = {'k': 1e-6, 'm': 1e-3, 'b': 1.0, 't': 1e3}
+_QUANT_BITS_PATTERN = re.compile(r'^I?Q(\d)', re.IGNORECASE)
+
+def parse_size_to_gb(size_str):
+    """Converts a model size string (e.g., '7B', '750M', '8x7B') to billions of parameters.
+
+    Returns 0.0 for missing or unrecognised sizes.
+    """
+    # Checked before the cache, which cannot hash whatever a host sent
+    if not isinstance(size_str, str):
+        return 0.0
+    return _parse_size_to_gb(size_str)
+
+@functools.lru_cache(maxsize=4096)
+def _parse_size_to_gb(size_str):
+    match = _SIZE_PATTERN.match(size_str.strip())
+    if not match:
+        return 0.0
+    experts, value, unit = match.groups()
+    return int(experts or 1) * float(value) * _SIZE_UNITS[unit.lower()]
+
+def quantization_info(quant_level):
+    """Returns ``(bits_per_weight, vram_gb_per_billion)`` for a quantization level.
+
+    Known formats come from QUANTIZATIONS; other ``Q<n>``/``IQ<n>`` names
+    are estimated from their bit count. Returns ``(None, None)`` when the
+    level is missing or unrecognised.
+    """
+    if not quant_level or not isinstance(quant_level, str):
+        return None, None
+    return _quantization_info(quant_level)
+
+@functools.lru_cache(maxsize=256)
+def _quantization_info(quant_level):
+    bits = QUANTIZATIONS.get(quant_level.upper())
+    if bits is None:
+        match = _QUANT_BITS_PATTERN.match(quant_level)
+        if not match:
+            return None, None
+        bits = int(match.group(1)) + 0.5
+    # One billion weights at ``bits`` each is bits / 8 GB
+    return bits, round(bits / 8 * VRAM_OVERHEAD, 4)
+
+def estimate_host_performance(detailed_models):
+    """Analyzes model details to make an educated guess about host performance."""
+    if not detailed_models:
+        return "Unknown"
+
+    max_param_size_gb = 0
+    has_unquantized_large_model = False
+    all_heavily_quantized = True
+
+    for model in detailed_models:
+        param_size_gb = parse_size_to_gb(model.get("parameter_size"))
+        if param_size_gb > max_param_size_gb:
+            max_param_size_gb = param_size_gb
+
+        quant_level = model.get("quantization_level")
+        if not quant_level or not isinstance(quant_level, str):
+            quant_level = "unknown"
+
+        # Check for unquantized large models
+        if param_size_gb > LARGE_MODEL_MIN_B and quant_level in HIGH_QUALITY_QUANTS:
+            has_unquantized_large_model = True
+
+        # Check if any model is NOT heavily quantized
+        if quant_level not in LOW_QUALITY_QUANTS and not quant_level.startswith('IQ'):
+            all_heavily_quantized = False
+
+    if has_unquantized_large_model or max_param_size_gb > HIGH_PERFORMANCE_MIN_B:
+        return "High-Performance"
+
+    if max_param_size_gb > MID_RANGE_MIN_B:
+        return "Mid-Range"
+
+    if max_param_size_gb > CPU_ONLY_MIN_B and all_heavily_quantized:
+        return "CPU-Only / Low-RAM"
+
+    if max_param_size_gb < SMALL_MODEL_MAX_B:
+        return "Small-Model / Hobbyist"
+
+    return "Mid-Range" # Default for intermediate cases
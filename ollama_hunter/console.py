@@ -0,0 +1,3 @@
+def log_stdout(message):
+    """Default log sink: prints and flushes so piped output stays live."""
+    print(message, flush=True)
@@ -0,0 +1,320 @@
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+
+import database
+
+from . import geo
+from .console import log_stdout
+from .persistence import CHUNK_SIZE, ResultWriter
+from .probe import DETAIL_TIMEOUT, probe_host
+from .shodan import parse_results
+
+# === SETTINGS ===
+BASE_URL = "https://www.shodan.io/search"
+QUERY = 'port:11434 product:"Ollama" country:"US"'
+START_PAGE = 1
+DELAY = 2  # seconds between page fetches
+PAGE_TIMEOUT = 30  # seconds to connect to Shodan, and between bytes of a page
+CONCURRENCY = 16  # probe workers
+QUEUE_SIZE = 64  # hosts waiting for a probe worker; page fetching pauses when full
+SKIP_TTL = 6 * 3600  # seconds; skip IPs successfully probed this recently, by any job
+
+def build_headers(polito_cookie):
+    """Browser-like headers carrying the Shodan 'polito' session cookie."""
+    return {
+        "Host": "www.shodan.io",
+        "Cookie": f'polito="{polito_cookie}"',
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.6533.100 Safari/537.36",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.5",
+        "Referer": "https://www.shodan.io/",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+    }
+
+def scrape_hosts_from_page(page, headers, query=QUERY, log=log_stdout):
+    """Fetches one Shodan results page; returns its hosts as parsed by ``shodan.parse_results``."""
+    params = {
+        "query": query,
+        "page": page
+    }
+
+    log(f"[+] Fetching Shodan page {page}...")
+    response = requests.get(BASE_URL, headers=headers, params=params, timeout=PAGE_TIMEOUT)
+
+    if response.status_code != 200:
+        log(f"[!] Error: Status code {response.status_code}")
+        return []
+
+    return parse_results(response.text)
+
+def discover_hosts(polito_cookie, query=QUERY, start_page=START_PAGE, log=log_stdout,
+                   chunk_size=CHUNK_SIZE, resume=False, skip_ttl=SKIP_TTL,
+                   concurrency=CONCURRENCY, timeout=DETAIL_TIMEOUT,
+                   progress=None, publish=None, cancel=None):
+    """Walks Shodan result pages, probing and saving every host found.
+
+    Discovery runs as a pipeline. A page thread fetches a results page at
+    most every DELAY seconds and queues its hosts. ``concurrency`` probe
+    workers drain that queue. The calling thread batches their results
+    into the database. Both queues are bounded, so a slow stage holds back
+    the ones before it instead of letting memory grow. Each stage's
+    throughput is logged at the end.
+
+    The run is checkpointed in the database as it goes: the last page fully
+    processed and every IP handled so far. With ``resume=True`` the latest
+    unfinished run for ``query`` continues after its last checkpointed page,
+    skipping the IPs it already handled; ``start_page`` only applies when
+    there is nothing to resume. IPs whose last probe, by any job, succeeded
+    less than ``skip_ttl`` seconds ago are not probed again (0 probes all).
+
+    ``progress(done)`` is called with the number of hosts handled so far and
+    ``publish('host', data)`` with each host's outcome. Setting the
+    ``cancel`` event stops fetching pages and drops queued probes; the run
+    can then be resumed.
+    """
+    database.create_database() # Ensure db is created
+    headers = build_headers(polito_cookie)
+    cancel = cancel or threading.Event()
+
+    run = database.get_resumable_discovery_run(query) if resume else None
+    if run:
+        run_id = run['id']
+        page = run['start_page'] if run['last_page'] is None else run['last_page'] + 1
+        processed_ips = database.get_discovery_seen(run_id)
+        log(f"[i] Resuming discovery run {run_id} at page {page} ({len(processed_ips)} IPs already handled).")
+    else:
+        if resume:
+            log("[i] No unfinished discovery run to resume, starting a new one.")
+        run_id = database.start_discovery_run(query, start_page)
+        page = start_page
+        processed_ips = set()
+
+    handled = len(processed_ips)  # the page stage adds to processed_ips from here on
+    pages = _PageStage(headers, query, page, processed_ips, skip_ttl, concurrency, log, cancel)
+    probes = _ProbeStage(pages.hosts, pages.results, concurrency, timeout, cancel)
+    started = time.perf_counter()
+    pages.start()
+    probes.start()
+
+    try:
+        with ResultWriter(chunk_size=chunk_size, log=log, discovery_run=run_id) as writer:
+            handled, probed, probe_seconds, last_page = _write_results(
+                pages.results, concurrency, run_id, handled, writer, log, progress, publish, cancel)
+    except BaseException:
+        # Without a writer the stages would block on their full queues forever
+        cancel.set()
+        _drain(pages, probes)
+        raise
+    if last_page is not None:
+        database.checkpoint_discovery_run(run_id, last_page)
+    pages.join()
+    probes.join()
+    elapsed = time.perf_counter() - started
+
+    log(f"[i] Pages: {pages.fetched} fetched ({pages.fetched / elapsed:.2f} pages/s), "
+        f"{pages.queued} hosts queued, {pages.blocked:.1f}s waiting for probe workers")
+    log(f"[i] Probes: {probed} in {elapsed:.1f}s ({probed / elapsed:.1f} hosts/s), "
+        f"workers {probe_seconds / (elapsed * concurrency):.0%} busy")
+
+    if pages.finished and not cancel.is_set():
+        database.finish_discovery_run(run_id)
+        log(f"\n[✓] Done. {handled} hosts handled. Database is up to date.")
+    else:
+        log(f"\n[i] Discovery run {run_id} stopped. Resume it to continue where it left off.")
+
+class _PageStage(threading.Thread):
+    """Fetches results pages and queues their new hosts for probing.
+
+    Before a page's hosts are queued, a ``('page', page, count, skipped)``
+    message tells the writer how many results to expect for it. When the
+    walk ends, one None per probe worker is queued to stop them.
+    """
+
+    def __init__(self, headers, query, page, processed_ips, skip_ttl, workers, log, cancel):
+        super().__init__(name="discovery-pages", daemon=True)
+        self.headers = headers
+        self.query = query
+        self.page = page
+        self.processed_ips = processed_ips
+        self.skip_ttl = skip_ttl
+        self.workers = workers
+        self.log = log
+        self.cancel = cancel
+        self.hosts = queue.Queue(maxsize=QUEUE_SIZE)
+        self.results = queue.Queue(maxsize=QUEUE_SIZE)
+        self.finished = False
+        self.fetched = self.queued = 0
+        self.blocked = 0.0  # seconds spent waiting on a full host queue
+
+    def run(self):
+        try:
+            self._walk()
+        except Exception as e:
+            self.log(f"[!] Fetching Shodan page {self.page} failed: {e}")
+        finally:
+            database.close_db_connection()
+            for _ in range(self.workers):
+                self.hosts.put(None)
+
+    def _walk(self):
+        next_fetch = time.monotonic()
+        while not self.cancel.wait(max(next_fetch - time.monotonic(), 0)):
+            next_fetch = time.monotonic() + DELAY
+            hosts = scrape_hosts_from_page(self.page, self.headers, query=self.query, log=self.log)
+            self.fetched += 1
+            if not hosts:
+                self.log("[*] No more results found. Stopping.")
+                self.finished = True
+                return
+
+            fresh = list({h['ip']: h for h in hosts if h['ip'] not in self.processed_ips}.values())
+            recent = (database.get_recently_alive([h['ip'] for h in fresh], self.skip_ttl)
+                      if self.skip_ttl and fresh else set())
+            self.processed_ips.update(h['ip'] for h in fresh)
+            fresh = [h for h in fresh if h['ip'] not in recent]
+            _fill_countries(fresh)
+
+            self.results.put(('page', self.page, len(fresh), recent))
+            for host_data in fresh:
+                waited = time.perf_counter()
+                self.hosts.put((self.page, host_data))
+                self.blocked += time.perf_counter() - waited
+                self.queued += 1
+            self.page += 1
+
+def _fill_countries(hosts):
+    """Sets a country from the offline index on hosts Shodan showed none for."""
+    missing = [h['ip'] for h in hosts if not h['country']]
+    if missing:
+        countries = geo.get_countries(missing)
+        for host_data in hosts:
+            host_data['country'] = host_data['country'] or countries.get(host_data['ip'])
+
+class _ProbeStage:
+    """A pool of threads probing queued hosts until each gets a None."""
+
+    def __init__(self, hosts, results, workers, timeout, cancel):
+        self.hosts = hosts
+        self.results = results
+        self.timeout = timeout
+        self.cancel = cancel
+        self._threads = [threading.Thread(target=self._work, name=f"discovery-probe-{i}", daemon=True)
+                         for i in range(workers)]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _work(self):
+        try:
+            while True:
+                item = self.hosts.get()
+                if item is None:
+                    return
+                if self.cancel.is_set():
+                    continue  # drop it; the page stays unfinished and resumes later
+                page, host_data = item
+                try:
+                    result = probe_host(host_data['ip'], timeout=self.timeout)
+                except Exception as e:
+                    # Still report the host, or its page would never be checkpointed
+                    result = {'models': None, 'error': 'internal', 'message': f"probe failed: {e!r}",
+                              'timings': {}, 'elapsed': 0.0}
+                self.results.put(('host', page, host_data, result))
+        finally:
+            self.results.put(('exit',))
+
+    def is_alive(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+def _drain(pages, probes):
+    """Discards results until the page and probe stages have exited.
+
+    The probe workers empty the host queue themselves, dropping what is
+    left once ``cancel`` is set.
+    """
+    while pages.is_alive() or probes.is_alive():
+        try:
+            pages.results.get(timeout=0.1)
+        except queue.Empty:
+            pass
+
+def _write_results(results, workers, run_id, handled, writer, log, progress, publish, cancel):
+    """Consumes probe results on the calling thread until every worker exits.
+
+    Pages are checkpointed in order, once all their hosts have been written.
+    Returns ``(hosts handled, hosts probed, probe seconds, last finished page
+    not yet checkpointed)``.
+    """
+    pending = OrderedDict()  # page -> results still expected, in page order
+    finished_page = None
+    exits = probed = 0
+    probe_seconds = 0.0
+    while exits < workers:
+        try:
+            message = results.get()
+        except KeyboardInterrupt:
+            log("\n[!] Interrupted by user.")
+            cancel.set()
+            continue
+
+        kind = message[0]
+        if kind == 'exit':
+            exits += 1
+        elif kind == 'page':
+            _, page, count, skipped = message
+            pending[page] = count
+            if skipped:
+                log(f"[i] Skipping {len(skipped)} hosts probed successfully recently.")
+                database.mark_discovery_seen(run_id, skipped)
+                handled += len(skipped)
+        else:
+            _, page, host_data, result = message
+            pending[page] -= 1
+            probed += 1
+            handled += 1
+            probe_seconds += result['elapsed']
+            _record(host_data, result, writer, log, publish)
+            if progress:
+                progress(handled)
+
+        while pending and next(iter(pending.values())) == 0:
+            finished_page, _ = pending.popitem(last=False)
+        # A page counts as done once its results have left the writer's buffer
+        if finished_page is not None and not writer.pending:
+            database.checkpoint_discovery_run(run_id, finished_page)
+            finished_page = None
+    return handled, probed, probe_seconds, finished_page
+
+def _record(host_data, result, writer, log, publish):
+    ip, country = host_data['ip'], host_data['country']
+    detailed_models, latency = result['models'], result['elapsed']
+    performance_guess = writer.add(ip, detailed_models, country=country, latency=latency)
+    if publish:
+        publish('host', {
+            'host': ip,
+            'country': country,
+            'city': host_data['city'],
+            'org': host_data['org'],
+            'status': 'alive' if performance_guess else result['error'] or 'empty',
+            'models': len(detailed_models or ()),
+            'performance': performance_guess,
+            'latency_ms': round(latency * 1000, 1),
+        })
+
+    where = f"{country or 'Unknown Country'}, {host_data['org'] or 'unknown org'}"
+    if performance_guess:
+        log(f"[+] {ip} ({where}): {len(detailed_models)} models, probable performance: {performance_guess} ({latency:.2f}s)")
+    elif result['error']:
+        log(f" [-] {ip} ({where}) is unreachable ({result['error']}: {result['message']}).")
+    else:
+        log(f" [-] {ip} ({where}) has no models.")
@@ -0,0 +1,204 @@
+"""Offline IP-to-country lookups from a file of address ranges.
+
+The ranges file is a CSV, optionally gzipped, in any of these layouts:
+
+- ``cidr,country``, e.g. ``192.0.2.0/24,Germany``
+- ``start,end,country`` with dotted addresses or integers (DB-IP and
+  IP2Location LITE style)
+- ``start,end,code,country``, e.g. IP2Location LITE DB1, where the last
+  column is used
+
+Blank lines, ``#`` comments and a header row are skipped, and a country of
+``-`` marks an unassigned range. The country is stored exactly as the file
+spells it. Use a file with full names to match what Shodan reports.
+
+The ranges are loaded once into sorted arrays, one per IP version, and
+looked up by binary search. Nothing here touches the network.
+"""
+
+import csv
+import gzip
+import ipaddress
+import os
+import socket
+import threading
+from array import array
+from bisect import bisect_right
+
+import database
+
+# === SETTINGS ===
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RANGES_FILE = os.environ.get('GEO_RANGES', os.path.join(ROOT, "data", "ip-country.csv"))
+BACKFILL_CHUNK = 5000  # hosts looked up and updated per transaction
+
+def _address(ip):
+    """``(version, integer)`` for an IP address string, or None if it is not one."""
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big')
+    except (OSError, TypeError):
+        pass
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return None
+    return address.version, int(address)
+
+def _bound(text):
+    text = text.strip()
+    if text.isdigit():
+        number = int(text)
+        return (4 if number < 2 ** 32 else 6), number
+    found = _address(text)
+    if found is None:
+        raise ValueError(f"not an IP address: {text!r}")
+    return found
+
+def _parse_row(row):
+    """``(version, start, end, country)`` for one row of a ranges file."""
+    country = row[-1].strip()
+    if len(row) == 2:
+        network = ipaddress.ip_network(row[0].strip(), strict=False)
+        version, start, end = network.version, int(network.network_address), int(network.broadcast_address)
+    else:
+        (version, start), (end_version, end) = _bound(row[0]), _bound(row[1])
+        if version != end_version:
+            version = 6  # IP2Location's IPv6 file starts with IPv4-mapped integers
+    if end < start:
+        raise ValueError(f"range ends before it starts: {row[0]} - {row[1]}")
+    return version, start, end, (None if country in ('', '-') else country)
+
+def read_ranges(path):
+    """Yields ``(version, start, end, country)`` for each range in ``path``."""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', newline='') as f:
+        for line, row in enumerate(csv.reader(f), 1):
+            if not row or not row[0].strip() or row[0].lstrip().startswith('#'):
+                continue
+            try:
+                yield _parse_row(row)
+            except ValueError as e:
+                if line == 1:
+                    continue  # header
+                raise ValueError(f"{path}:{line}: {e}") from e
+
+class _Table:
+    """Sorted, non-overlapping ranges for one IP version."""
+
+    def __init__(self, typecode):
+        # 128-bit IPv6 bounds do not fit an array, so they stay in lists
+        self.starts = array(typecode) if typecode else []
+        self.ends = array(typecode) if typecode else []
+        self.countries = array('H')
+
+    def __len__(self):
+        return len(self.starts)
+
+    def add(self, start, end, country_id):
+        if self.starts:
+            last_end = self.ends[-1]
+            if end <= last_end:
+                return  # inside the previous range, which wins
+            if start <= last_end + 1 and self.countries[-1] == country_id:
+                self.ends[-1] = end
+                return
+            start = max(start, last_end + 1)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.countries.append(country_id)
+
+    def find(self, number):
+        i = bisect_right(self.starts, number) - 1
+        if i >= 0 and number <= self.ends[i]:
+            return self.countries[i]
+        return None
+
+class CountryIndex:
+    """Country for an IP address by binary search over sorted ranges.
+
+    Where ranges overlap, the one that starts first wins. Adjacent ranges
+    for the same country are merged, so the arrays stay compact.
+    """
+
+    def __init__(self, ranges):
+        self.names = []
+        ids = {}
+        self._tables = {4: _Table('I' if array('I').itemsize >= 4 else 'L'), 6: _Table(None)}
+        for version, start, end, country in sorted(r for r in ranges if r[3] is not None):
+            country_id = ids.get(country)
+            if country_id is None:
+                country_id = ids[country] = len(self.names)
+                self.names.append(country)
+            self._tables[version].add(start, end, country_id)
+
+    @classmethod
+    def from_file(cls, path=RANGES_FILE):
+        return cls(read_ranges(path))
+
+    def __len__(self):
+        return sum(len(table) for table in self._tables.values())
+
+    def lookup(self, ip):
+        """The country of ``ip``, or None if it is in no range or is not an IP."""
+        found = _address(ip)
+        if found is None:
+            return None
+        country_id = self._tables[found[0]].find(found[1])
+        return None if country_id is None else self.names[country_id]
+
+    def lookup_many(self, ips):
+        """``{ip: country}`` for the IPs in ``ips`` that fall in a known range."""
+        countries = {}
+        for ip in ips:
+            country = self.lookup(ip)
+            if country is not None:
+                countries[ip] = country
+        return countries
+
+_index = None
+_index_path = None
+_index_lock = threading.Lock()
+
+def get_index(path=None):
+    """The CountryIndex for ``path`` (default RANGES_FILE), loaded once per process.
+
+    Returns None when the file does not exist, so lookups quietly find
+    nothing on installs without one.
+    """
+    global _index, _index_path
+    path = path or RANGES_FILE
+    with _index_lock:
+        if _index_path != path:
+            _index = CountryIndex.from_file(path) if os.path.exists(path) else None
+            _index_path = path
+        return _index
+
+def get_country_from_ip(ip):
+    """Gets the country of an IP address from the offline ranges file."""
+    index = get_index()
+    return index.lookup(ip) if index else None
+
+def get_countries(ips):
+    """``{ip: country}`` for the IPs the offline ranges file places."""
+    index = get_index()
+    return index.lookup_many(ips) if index else {}
+
+def backfill_countries(index, overwrite=False, chunk_size=BACKFILL_CHUNK, dry_run=False):
+    """Sets hosts' countries from ``index``.
+
+    Only hosts without a country are filled in unless ``overwrite`` is set.
+    Hosts the index does not place are left alone. Returns
+    ``(hosts looked up, hosts changed)``; with ``dry_run`` nothing is
+    written and the second number counts the hosts that would change.
+    """
+    hosts = database.get_host_countries(missing_only=not overwrite)
+    changed = 0
+    for start in range(0, len(hosts), chunk_size):
+        chunk = hosts[start:start + chunk_size]
+        found = index.lookup_many(ip for ip, _ in chunk)
+        updates = [(ip, found[ip]) for ip, country in chunk if ip in found and found[ip] != country]
+        if dry_run:
+            changed += len(updates)
+        elif updates:
+            changed += database.set_host_countries(updates)
+    return len(hosts), changed
@@ -0,0 +1,218 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+
+from . import metrics
+from .broadcast import Broadcaster
+from .console import log_stdout
+
+# === SETTINGS ===
+MAX_WORKERS = 2  # jobs running at once; later submissions queue
+KEEP_FINISHED = 50  # finished jobs listed by /api/jobs
+PROGRESS_INTERVAL = 0.5  # seconds between progress events
+
+JOB_SECONDS = metrics.histogram(
+    "ollama_job_seconds", "Duration of background jobs by name and outcome.", ["job", "outcome"])
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = 'queued', 'running', 'succeeded', 'failed', 'cancelled'
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+class Job:
+    """One background job: its state, progress counters and event stream.
+
+    The target receives the job's ``log``, ``progress``, ``publish`` and
+    ``cancel`` hooks as keyword arguments. ``cancel`` is a
+    ``threading.Event`` the target should check between units of work.
+
+    Everything the job reports goes out on ``events`` as ``log``,
+    ``progress``, ``state`` and target-specific (e.g. ``host``) events.
+    The stream is closed once the job has finished.
+    """
+
+    def __init__(self, job_id, name, key, echo=None):
+        self.id = job_id
+        self.name = name
+        self.key = key
+        self.state = QUEUED
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = 0
+        self.total = None
+        self.cancel = threading.Event()
+        self.future = None
+        self.events = Broadcaster()
+        self._echo = echo
+        self._last_progress = 0.0
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.state in FINISHED_STATES
+
+    def log(self, line):
+        self.events.publish('log', {'message': line})
+        if self._echo:
+            self._echo(line)
+
+    def publish(self, kind, data):
+        """Sends a target-specific event to the job's subscribers."""
+        self.events.publish(kind, data)
+
+    def progress(self, done, total=None):
+        """Records ``done`` units of work out of ``total`` (None if unknown).
+
+        Subscribers get a ``progress`` event at most every PROGRESS_INTERVAL
+        seconds, and always when the work is complete.
+        """
+        self.done = done
+        if total is not None:
+            self.total = total
+        now = time.monotonic()
+        if now - self._last_progress >= PROGRESS_INTERVAL or done == self.total:
+            self._last_progress = now
+            self.events.publish('progress', self._progress_dict())
+
+    def _progress_dict(self):
+        return {'done': self.done, 'total': self.total, 'rate': round(self.rate, 2)}
+
+    @property
+    def rate(self):
+        """Units of work per second since the job started."""
+        if not self.started_at:
+            return 0.0
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def _set_state(self, state, error=None):
+        with self._changed:
+            self.state = state
+            self.error = error
+            if state == RUNNING:
+                self.started_at = time.time()
+            elif state in FINISHED_STATES:
+                self.finished_at = time.time()
+            self._changed.notify_all()
+        self.events.publish('state', self.to_dict())
+        if state in FINISHED_STATES:
+            self.events.close()
+
+    def wait(self, timeout=None):
+        """Blocks until the job has finished; returns whether it has."""
+        with self._changed:
+            return self._changed.wait_for(lambda: self.finished, timeout)
+
+    def follow(self):
+        """Yields the job's log lines, from the oldest kept, until it finishes."""
+        for _, kind, data, _ in self.events.subscribe():
+            if kind == 'log':
+                yield data['message']
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'state': self.state,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            **self._progress_dict(),
+        }
+
+class JobManager:
+    """Runs jobs on a bounded pool, deduplicating identical submissions.
+
+    Jobs run on the web process's threads rather than a forked interpreter:
+    the probe and database code is already imported, so a job starts in
+    microseconds. At most ``max_workers`` run at once, so repeated clicks
+    cannot start overlapping refreshes that fight over SQLite.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, keep_finished=KEEP_FINISHED, echo=log_stdout):
+        self.keep_finished = keep_finished
+        self.echo = echo
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._ids = itertools.count(1)
+
+    def submit(self, name, target, *args, **kwargs):
+        """Queues ``target(*args, **kwargs)`` as job ``name``.
+
+        If a job with the same name and arguments is still queued or
+        running, that job is returned instead. Returns ``(job, created)``.
+        """
+        key = (name, args, tuple(sorted(kwargs.items())))
+        with self._lock:
+            for job in self._jobs.values():
+                if job.key == key and not job.finished:
+                    return job, False
+            job = Job(next(self._ids), name, key, echo=self.echo)
+            self._jobs[job.id] = job
+            self._prune()
+            job.future = self._pool.submit(self._run, job, target, args, kwargs)
+        return job, True
+
+    def _run(self, job, target, args, kwargs):
+        if job.cancel.is_set():
+            job._set_state(CANCELLED)
+            return
+        job._set_state(RUNNING)
+        started = time.perf_counter()
+        state, error = SUCCEEDED, None
+        try:
+            target(*args, log=job.log, progress=job.progress, publish=job.publish, cancel=job.cancel, **kwargs)
+            if job.cancel.is_set():
+                state = CANCELLED
+        except Exception as e:
+            state, error = FAILED, str(e)
+            job.log(f"[!] Job '{job.name}' failed: {e}")
+        finally:
+            database.close_db_connection()
+            elapsed = time.perf_counter() - started
+            JOB_SECONDS.observe(elapsed, job=job.name, outcome=state)
+            job.log(f"[i] Job '{job.name}' {state} in {elapsed:.2f}s")
+            job._set_state(state, error)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(len(finished) - self.keep_finished, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        """Returns every tracked job, newest first."""
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def latest(self, name):
+        """Returns the most recently submitted job called ``name``, if any."""
+        with self._lock:
+            return next((job for job in reversed(self._jobs.values()) if job.name == name), None)
+
+    def cancel(self, job_id):
+        """Asks a job to stop; returns False if it is unknown or already finished."""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.cancel.set()
+        if job.future.cancel():  # still queued, so it never runs
+            job._set_state(CANCELLED)
+        else:
+            job.log(f"[i] Cancelling job '{job.name}'...")
+        return True
+
+manager = JobManager()
+
+def start_job(name, target, *args, **kwargs):
+    """Submits a job to the shared manager; returns ``(job, created)``."""
+    return manager.submit(name, target, *args, **kwargs)
@@ -0,0 +1,148 @@
+"""In-process metrics in the Prometheus text exposition format.
+
+A deliberately small stand-in for ``prometheus_client``: counters and
+histograms with labels, kept in one process-wide registry that
+``provider-service.py`` renders at ``/metrics``. Jobs run in the web
+process, so probe, database and job timings all land in the same registry.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# === SETTINGS ===
+# Upper bounds, in seconds, from sub-millisecond queries to probe timeouts
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(list(zip(self.labelnames, key)), value))
+        return lines
+
+class Counter(_Metric):
+    """A monotonically increasing count."""
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self, pairs, value):
+        return [f"{self.name}_total{_format_labels(pairs)} {_format_value(value)}"]
+
+class Histogram(_Metric):
+    """Counts observations into cumulative buckets and tracks their sum."""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # [per-bucket counts..., sum, count]
+                series = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes the wall-clock duration of the ``with`` block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        series = self._values.get(self._key(labels))
+        return series[-1] if series else 0
+
+    def total(self, **labels):
+        series = self._values.get(self._key(labels))
+        return series[-2] if series else 0.0
+
+    def _samples(self, pairs, series):
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets, series):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{_format_labels(pairs + [('le', _format_value(bound))])} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(pairs)} {_format_value(series[-2])}")
+        lines.append(f"{self.name}_count{_format_labels(pairs)} {series[-1]}")
+        return lines
+
+def _register(cls, name, *args, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"metric {name} is already registered as a {metric.kind}")
+        return metric
+
+def counter(name, documentation, labelnames=()):
+    """Returns the registered counter ``name``, creating it on first use.
+
+    Counter names are given without the ``_total`` suffix, which is added
+    when rendering.
+    """
+    return _register(Counter, name, documentation, labelnames)
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    """Returns the registered histogram ``name``, creating it on first use."""
+    return _register(Histogram, name, documentation, labelnames, buckets)
+
+def render():
+    """Renders every registered metric in the Prometheus text format."""
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda m: m.name)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
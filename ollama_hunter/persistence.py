@@ -0,0 +1,94 @@
+import time
+
+import database
+
+from .classifier import estimate_host_performance
+
+# === SETTINGS ===
+CHUNK_SIZE = 500  # probe results per write transaction
+FLUSH_INTERVAL = 2.0  # seconds a result may wait in the buffer
+
+def _probe_result(ip, detailed_models, country=None, latency=None):
+    performance_guess = estimate_host_performance(detailed_models) if detailed_models else None
+    return {
+        'ip_address': ip,
+        'models': detailed_models,
+        'performance': performance_guess,
+        'country': country,
+        'latency': latency,
+    }
+
+def record_probe_result(ip, detailed_models, country=None):
+    """Saves the outcome of probing a single ``ip`` in one transaction.
+
+    A host that answered with models is upserted with a fresh performance
+    guess and its model list is replaced. A host that did not answer is
+    marked as dead if we already know it; unknown dead hosts are not stored.
+    Returns the performance guess, or None for a dead host.
+    """
+    result = _probe_result(ip, detailed_models, country)
+    database.write_probe_results([result])
+    return result['performance']
+
+class ResultWriter:
+    """Buffers probe results and writes them in batched transactions.
+
+    The buffer is flushed once it holds ``chunk_size`` results or its oldest
+    result has waited ``flush_interval`` seconds, and on ``close()``. Use it
+    as a context manager so the tail of a run is never lost. With
+    ``discovery_run``, each flush also checkpoints its IPs as seen by that run.
+    """
+
+    def __init__(self, chunk_size=CHUNK_SIZE, flush_interval=FLUSH_INTERVAL, log=None, discovery_run=None):
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        self.log = log
+        self.discovery_run = discovery_run
+        self.rows_written = 0
+        self.write_seconds = 0.0
+        self._buffer = []
+        self._oldest = None
+
+    def add(self, ip, detailed_models, country=None, latency=None):
+        """Queues one probe result and returns its performance guess.
+
+        ``latency`` is how long the probe took, in seconds, for the
+        observation history.
+        """
+        result = _probe_result(ip, detailed_models, country, latency)
+        if not self._buffer:
+            self._oldest = time.monotonic()
+        self._buffer.append(result)
+
+        if (len(self._buffer) >= self.chunk_size
+                or time.monotonic() - self._oldest >= self.flush_interval):
+            self.flush()
+        return result['performance']
+
+    def flush(self):
+        if not self._buffer:
+            return
+        started = time.perf_counter()
+        self.rows_written += database.write_probe_results(self._buffer, discovery_run=self.discovery_run)
+        self.write_seconds += time.perf_counter() - started
+        self._buffer = []
+
+    @property
+    def pending(self):
+        """Results waiting in the buffer for the next flush."""
+        return len(self._buffer)
+
+    @property
+    def rows_per_second(self):
+        return self.rows_written / self.write_seconds if self.write_seconds else 0.0
+
+    def close(self):
+        self.flush()
+        if self.log:
+            self.log(f"[i] Wrote {self.rows_written} rows in {self.write_seconds:.2f}s ({self.rows_per_second:.0f} rows/s)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,263 @@
+import http.client
+import json
+import os
+import socket
+import time
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library parser is the fallback
+    orjson = None
+
+from . import metrics
+
+# === SETTINGS ===
+OLLAMA_PORT = int(os.environ.get('OLLAMA_PORT', 11434))
+DETAIL_TIMEOUT = 10  # seconds for a whole /api/tags probe, connect to last byte
+MAX_TAGS_BYTES = 4 * 1024 * 1024  # larger /api/tags replies are abandoned
+READ_CHUNK = 64 * 1024
+
+# Probe phases, in the order they happen
+PHASES = ('dns', 'connect', 'ttfb', 'body')
+
+# Error kinds reported by probe_host
+ERROR_KINDS = ('dns', 'timeout', 'refused', 'connect', 'protocol', 'http', 'json', 'size')
+
+# Fields kept from each entry of an /api/tags reply
+MODEL_FIELDS = ('name', 'modified_at', 'digest', 'size', 'parameter_size', 'quantization_level')
+
+PROBE_PHASE_SECONDS = metrics.histogram(
+    "ollama_probe_phase_seconds", "Time spent in each phase of an /api/tags probe.", ["phase"])
+PROBE_SECONDS = metrics.histogram(
+    "ollama_probe_seconds", "Total duration of /api/tags probes by outcome.", ["outcome"])
+PROBE_ERRORS = metrics.counter(
+    "ollama_probe_errors", "Failed /api/tags probes by error kind.", ["kind"])
+
+class ProbeError(Exception):
+    """A failed probe; ``kind`` is one of ERROR_KINDS."""
+
+    def __init__(self, kind, message):
+        super().__init__(message)
+        self.kind = kind
+
+class ModelRecord:
+    """One model from a host's tag list, holding MODEL_FIELDS.
+
+    Reads like the dict it replaces, so ``record['name']`` and
+    ``record.get('digest')`` work, without a dict per model.
+    """
+
+    __slots__ = MODEL_FIELDS
+
+    def __init__(self, name, modified_at=None, digest=None, size=None,
+                 parameter_size=None, quantization_level=None):
+        self.name = name
+        self.modified_at = modified_at
+        self.digest = digest
+        self.size = size
+        self.parameter_size = parameter_size
+        self.quantization_level = quantization_level
+
+    def __getitem__(self, key):
+        if key not in MODEL_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in MODEL_FIELDS else default
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in MODEL_FIELDS}
+
+    def __eq__(self, other):
+        if not isinstance(other, ModelRecord):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    def __repr__(self):
+        return f"ModelRecord({', '.join(f'{field}={getattr(self, field)!r}' for field in MODEL_FIELDS)})"
+
+_loads = orjson.loads if orjson else json.loads
+
+def _parse_tags(body):
+    """ModelRecords for a raw ``/api/tags`` body."""
+    try:
+        data = _loads(body)
+    except ValueError as e:  # JSONDecodeError and UnicodeDecodeError
+        raise ProbeError('json', f"invalid JSON: {e}") from e
+    models = data.get("models", []) if isinstance(data, dict) else None
+    if not isinstance(models, list):
+        raise ProbeError('json', "response is not an Ollama tag list")
+
+    detailed_models = []
+    for m in models:
+        if not isinstance(m, dict):
+            raise ProbeError('json', "response is not an Ollama tag list")
+        name = m.get("name")
+        if not isinstance(name, str) or not name:
+            raise ProbeError('json', "model entry without a name")
+        details = m.get("details")
+        if not isinstance(details, dict):
+            details = {}
+        if not all(field is None or isinstance(field, str) for field in (
+                m.get("modified_at"), m.get("digest"),
+                details.get("parameter_size"), details.get("quantization_level"))):
+            raise ProbeError('json', f"model {name!r} has a non-string field")
+        detailed_models.append(ModelRecord(
+            name,
+            m.get("modified_at"),
+            m.get("digest"),
+            m.get("size"),
+            details.get("parameter_size"),
+            details.get("quantization_level"),
+        ))
+    return detailed_models
+
+def _read_capped(res, limit):
+    """Reads a response body, giving up as soon as it is known to exceed ``limit`` bytes."""
+    length = res.getheader("Content-Length", "")
+    if length.isdigit() and int(length) > limit:
+        raise ProbeError('size', f"body of {length} bytes exceeds the {limit} byte cap")
+    body = bytearray()
+    while True:
+        chunk = res.read(READ_CHUNK)
+        if not chunk:
+            return bytes(body)
+        body += chunk
+        if len(body) > limit:
+            raise ProbeError('size', f"body exceeds the {limit} byte cap")
+
+class _DeadlineSocket(socket.socket):
+    """A socket whose blocking calls all share one monotonic ``deadline``.
+
+    A per-call timeout alone lets a server that trickles bytes keep a probe
+    going indefinitely; here every call only gets the time that is left.
+    """
+
+    deadline = None
+
+    def _arm(self):
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            raise socket.timeout("probe deadline exceeded")
+        self.settimeout(remaining)
+
+    def connect(self, address):
+        self._arm()
+        return super().connect(address)
+
+    def sendall(self, data, *args):
+        self._arm()
+        return super().sendall(data, *args)
+
+    def recv_into(self, buffer, *args):
+        self._arm()
+        return super().recv_into(buffer, *args)
+
+def _fetch_tags(ip, timeout, timings):
+    """Fetches and parses ``/api/tags``, recording each phase in ``timings``.
+
+    ``timeout`` bounds the whole exchange, from connecting to the last byte
+    of the body.
+    """
+    deadline = time.monotonic() + timeout
+    mark = time.perf_counter()
+
+    def phase(name):
+        nonlocal mark
+        now = time.perf_counter()
+        timings[name] = now - mark
+        mark = now
+
+    try:
+        family, socktype, proto, _, sockaddr = socket.getaddrinfo(ip, OLLAMA_PORT, type=socket.SOCK_STREAM)[0]
+    except (socket.gaierror, UnicodeError) as e:
+        raise ProbeError('dns', f"cannot resolve {ip}: {e}") from e
+    phase('dns')
+
+    sock = _DeadlineSocket(family, socktype, proto)
+    sock.deadline = deadline
+    conn = None
+    try:
+        try:
+            sock.connect(sockaddr)
+        except ConnectionRefusedError as e:
+            raise ProbeError('refused', f"connection refused: {e}") from e
+        except socket.timeout as e:
+            raise ProbeError('timeout', f"connect timed out after {timeout}s") from e
+        except OSError as e:
+            raise ProbeError('connect', f"cannot connect: {e}") from e
+        phase('connect')
+
+        conn = http.client.HTTPConnection(ip, OLLAMA_PORT, timeout=timeout)
+        conn.sock = sock
+        try:
+            conn.request("GET", "/api/tags", headers={"Accept": "application/json"})
+            res = conn.getresponse()
+            phase('ttfb')
+            if res.status >= 400:
+                raise ProbeError('http', f"HTTP {res.status} {res.reason}")
+            if res.status != 200:
+                raise ProbeError('http', f"unexpected HTTP {res.status} {res.reason}")
+            content_type = res.getheader("Content-Type", "")
+            if content_type and "json" not in content_type.lower():
+                raise ProbeError('json', f"unexpected content type {content_type}")
+            body = _read_capped(res, MAX_TAGS_BYTES)
+            phase('body')
+        except socket.timeout as e:
+            raise ProbeError('timeout', f"no complete reply within {timeout}s") from e
+        except http.client.HTTPException as e:
+            raise ProbeError('protocol', f"invalid HTTP response: {e!r}") from e
+        except OSError as e:
+            raise ProbeError('connect', f"connection failed: {e}") from e
+    finally:
+        if conn is not None:
+            conn.close()
+        else:
+            sock.close()
+
+    return _parse_tags(body)
+
+def probe_host(ip, timeout=DETAIL_TIMEOUT):
+    """Probes ``ip``'s ``/api/tags`` and reports how it went.
+
+    Returns a dict with ``models`` (the model list, or None on failure),
+    ``error`` (None, or one of ERROR_KINDS), ``message`` describing the
+    failure, ``timings`` (seconds spent in each of PHASES that was reached)
+    and ``elapsed``. Every probe is also recorded in the metrics registry.
+    """
+    timings = {}
+    started = time.perf_counter()
+    models, error, message = None, None, None
+    try:
+        models = _fetch_tags(ip, timeout, timings)
+    except ProbeError as e:
+        error, message = e.kind, str(e)
+    elapsed = time.perf_counter() - started
+
+    for name, seconds in timings.items():
+        PROBE_PHASE_SECONDS.observe(seconds, phase=name)
+    PROBE_SECONDS.observe(elapsed, outcome=error or 'ok')
+    if error:
+        PROBE_ERRORS.inc(kind=error)
+
+    return {
+        'models': models,
+        'error': error,
+        'message': message,
+        'timings': timings,
+        'elapsed': elapsed,
+    }
+
+def fetch_models_from_ip(ip, timeout=DETAIL_TIMEOUT, log=None):
+    """Queries a single IP for its Ollama models.
+
+    Returns a list of model dicts, or None if the host is unreachable or
+    answered with something that is not an Ollama tag list. When ``log`` is
+    given, the reason for a failure is passed to it. Use ``probe_host`` for
+    the timing and error kind as well.
+    """
+    result = probe_host(ip, timeout=timeout)
+    if result['error'] and log:
+        log(f"[!] Error querying {ip} ({result['error']}): {result['message']}")
+    return result['models']
@@ -0,0 +1,180 @@
+import ipaddress
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import database
+
+from . import geo, metrics
+from .console import log_stdout
+from .persistence import CHUNK_SIZE, ResultWriter
+from .probe import DETAIL_TIMEOUT, PHASES, probe_host
+from .scheduler import PROBE_BUDGET, select_hosts
+
+# === SETTINGS ===
+CONCURRENCY = 32  # probes in flight across the whole refresh
+PER_SUBNET = 2  # probes in flight against any single /24
+MAX_RATE = 0  # new probes started per second, 0 for unlimited
+
+SUBNET_WAIT_SECONDS = metrics.histogram(
+    "ollama_refresh_subnet_wait_seconds", "Time probes waited for their subnet's concurrency limit.")
+
+def subnet_key(ip):
+    """Groups hosts for politeness limits: the /24 for IPv4, the /64 for IPv6."""
+    try:
+        addr = ipaddress.ip_address(ip)
+    except ValueError:
+        return ip  # a hostname, limit it on its own
+    prefix = 24 if addr.version == 4 else 64
+    return str(ipaddress.ip_network(f"{addr}/{prefix}", strict=False))
+
+def interleave_by_subnet(hosts):
+    """Orders hosts round-robin across subnets.
+
+    Workers block on a subnet's limit when they pick up a host from a busy
+    /24, so spreading each subnet out keeps the pool from stalling behind one
+    large network.
+    """
+    by_subnet = defaultdict(list)
+    for host in hosts:
+        by_subnet[subnet_key(host['ip_address'])].append(host)
+
+    ordered = []
+    queues = list(by_subnet.values())
+    for rank in range(max((len(q) for q in queues), default=0)):
+        ordered.extend(q[rank] for q in queues if rank < len(q))
+    return ordered
+
+class _SubnetLimiter:
+    """Caps the number of concurrent probes per subnet."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    def get(self, key):
+        with self._lock:
+            semaphore = self._semaphores.get(key)
+            if semaphore is None:
+                semaphore = self._semaphores[key] = threading.BoundedSemaphore(self.limit)
+            return semaphore
+
+def _probe(host, limiter, timeout):
+    ip = host['ip_address']
+    queued = time.perf_counter()
+    with limiter.get(subnet_key(ip)):
+        waited = time.perf_counter() - queued
+        SUBNET_WAIT_SECONDS.observe(waited)
+        result = probe_host(ip, timeout=timeout)
+    result['waited'] = waited
+    return host, result
+
+def refresh_hosts(log=log_stdout, concurrency=CONCURRENCY, per_subnet=PER_SUBNET,
+                  max_rate=MAX_RATE, timeout=DETAIL_TIMEOUT, chunk_size=CHUNK_SIZE,
+                  budget=PROBE_BUDGET, full=False, progress=None, publish=None, cancel=None):
+    """Re-probes the hosts that are due and records the results.
+
+    Up to ``budget`` hosts are chosen by the scheduler in priority order;
+    ``full=True`` sweeps every host in the database instead.
+
+    Probes run on a pool of ``concurrency`` threads with at most
+    ``per_subnet`` in flight against any /24, and at most ``max_rate`` new
+    probes started per second when it is set. Results are collected on the calling thread as each
+    probe finishes and written in transactions of up to ``chunk_size``, so
+    the database only ever has one writer.
+
+    ``progress(done, total)`` is called as probes finish, and
+    ``publish('host', data)`` with each host's outcome. Setting the
+    ``cancel`` event stops new probes from starting; results already in
+    flight are still written.
+    """
+    database.create_database() # Ensure db is created
+
+    hosts = select_hosts(budget=budget, full=full)
+    log(f"[+] Starting {'full' if full else 'scheduled'} host refresh of {len(hosts)} hosts...")
+    hosts = interleave_by_subnet(hosts)
+    # Hosts with no country get one from the offline index when they are written
+    countries = geo.get_countries([host['ip_address'] for host in hosts if not host['country']])
+    limiter = _SubnetLimiter(per_subnet)
+    interval = 1.0 / max_rate if max_rate else 0.0
+    started = time.perf_counter()
+    alive = probed = 0
+    # Seconds summed over all probes, to show where the time went
+    spent = dict.fromkeys(PHASES + ('subnet wait',), 0.0)
+    errors = defaultdict(int)
+
+    def record(future):
+        nonlocal alive, probed
+        if future.cancelled():
+            return
+        host, result = future.result()
+        probed += 1
+        if progress:
+            progress(probed, len(hosts))
+        ip = host['ip_address']
+        detailed_models, elapsed = result['models'], result['elapsed']
+        performance_guess = writer.add(ip, detailed_models, country=countries.get(ip), latency=elapsed)
+        if publish:
+            publish('host', {
+                'host': ip,
+                'status': 'alive' if performance_guess else result['error'] or 'empty',
+                'models': len(detailed_models or ()),
+                'performance': performance_guess,
+                'latency_ms': round(elapsed * 1000, 1),
+            })
+        for phase, seconds in result['timings'].items():
+            spent[phase] += seconds
+        spent['subnet wait'] += result['waited']
+
+        if performance_guess:
+            alive += 1
+            log(f"[+] {ip}: {len(detailed_models)} models, probable performance: {performance_guess} ({elapsed:.2f}s)")
+        elif result['error']:
+            errors[result['error']] += 1
+            log(f" [-] {ip} is unreachable ({result['error']}: {result['message']}). Marking as dead.")
+        else:
+            log(f" [-] {ip} has no models. Marking as dead.")
+
+    with ResultWriter(chunk_size=chunk_size, log=log) as writer, \
+            ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="probe") as pool:
+        pending = set()
+        next_start = time.monotonic()
+        for host in hosts:
+            if cancel is not None and cancel.is_set():
+                log("[!] Refresh cancelled, waiting for probes in flight...")
+                for future in pending:
+                    future.cancel()
+                break
+
+            # Keep a bounded window of queued probes instead of submitting
+            # every host up front.
+            while len(pending) >= concurrency * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record(future)
+
+            if interval:
+                delay = next_start - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                next_start = max(next_start, time.monotonic()) + interval
+
+            pending.add(pool.submit(_probe, host, limiter, timeout))
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                record(future)
+
+    elapsed = time.perf_counter() - started
+    spent['db writes'] = writer.write_seconds
+    log("[i] Time spent across probes: " + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in spent.items()))
+    if errors:
+        log("[i] Probe errors: " + ", ".join(f"{kind} {count}" for kind, count in sorted(errors.items())))
+    compacted = database.compact_observations()
+    if compacted:
+        log(f"[i] Compacted {compacted} old observations")
+    rate = probed / elapsed if elapsed else 0.0
+    log(f"\n[✓] Host refresh complete: {alive}/{probed} hosts alive in {elapsed:.1f}s ({rate:.1f} hosts/s). Database is up to date.")
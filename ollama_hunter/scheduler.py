@@ -0,0 +1,17 @@
+import database
+
+# === SETTINGS ===
+PROBE_BUDGET = 2000  # most hosts probed by one scheduled refresh
+CHANGE_WEIGHT = 4.0  # how much a history of model-list changes raises priority
+
+def select_hosts(budget=PROBE_BUDGET, full=False, change_weight=CHANGE_WEIGHT):
+    """Picks the hosts a refresh should probe.
+
+    By default this is the ``budget`` highest-priority hosts that are due,
+    per database.get_hosts_due(): stale hosts and hosts whose model list
+    changes often come first, and dead hosts wait out an exponential
+    backoff. ``full=True`` returns every host, for a complete sweep.
+    """
+    if full:
+        return database.get_all_hosts()
+    return database.get_hosts_due(limit=budget, change_weight=change_weight)
@@ -0,0 +1,151 @@
+"""Extracts hosts from Shodan search result pages.
+
+Each ``div.result`` card yields a dict with:
+
+- ``ip``: from the ``a.title`` link to ``.../host/<ip>``
+- ``country``: the text of ``span.country_name``
+- ``city`` and ``org``: the text of the card's ``city:`` and ``org:`` filter links
+- ``timestamp``: the text of ``div.timestamp``, as Shodan prints it
+
+A field the card does not show is None, and a card without a host link is
+skipped. Several backends implement the same extraction. ``regex`` scans
+the raw markup card by card without building a tree. ``lxml`` is used
+when it is installed. ``bs4`` is the original BeautifulSoup
+``html.parser`` path.
+"""
+
+import html
+import importlib.util
+import re
+
+# === SETTINGS ===
+# Backends tried in order by parse_results(); later ones are fallbacks
+PARSER_BACKENDS = ('regex', 'lxml', 'bs4')
+
+FIELDS = ('ip', 'country', 'city', 'org', 'timestamp')
+
+def _has_class(name):
+    """Regex for a ``class`` attribute containing the class ``name``."""
+    return rf'class="(?:[^"]*\s)?{name}(?:\s[^"]*)?"'
+
+_CARD = re.compile(rf'<div\s[^>]*{_has_class("result")}')
+_IP = re.compile(rf'<a\s(?=[^>]*{_has_class("title")})[^>]*\bhref="[^"]*/host/([^"?#]+)"')
+_TEXT = {
+    'country': re.compile(rf'<span\s[^>]*{_has_class("country_name")}[^>]*>(.*?)</span>', re.S),
+    'city': re.compile(r'<a\s[^>]*\bhref="[^"]*\bcity%3A[^"]*"[^>]*>(.*?)</a>', re.S),
+    'org': re.compile(r'<a\s[^>]*\bhref="[^"]*\borg%3A[^"]*"[^>]*>(.*?)</a>', re.S),
+    'timestamp': re.compile(rf'<div\s[^>]*{_has_class("timestamp")}[^>]*>(.*?)</div>', re.S),
+}
+_TAG = re.compile(r'<[^>]+>')
+_DIV = re.compile(r'<(/?)div\b', re.I)
+
+def _clean(text):
+    text = " ".join(text.split()) if text else ""
+    return text or None
+
+def _host(ip, **fields):
+    return {'ip': ip, **{name: _clean(fields.get(name)) for name in FIELDS[1:]}}
+
+def _card_end(page, start):
+    """Position just past the ``</div>`` closing the card that opens at ``start``."""
+    depth = 0
+    for match in _DIV.finditer(page, start):
+        depth += -1 if match.group(1) else 1
+        if depth == 0:
+            return match.end()
+    return len(page)
+
+def _parse_regex(page):
+    hosts = []
+    position = 0
+    while True:
+        found = _CARD.search(page, position)
+        if not found:
+            break
+        position = _card_end(page, found.start())
+        card = page[found.start():position]
+        ip = _IP.search(card)
+        if not ip:
+            continue
+        fields = {}
+        for name, pattern in _TEXT.items():
+            match = pattern.search(card)
+            if match:
+                fields[name] = html.unescape(_TAG.sub('', match.group(1)))
+        hosts.append(_host(html.unescape(ip.group(1)), **fields))
+    return hosts
+
+def _xpath_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+def _parse_lxml(page):
+    import lxml.html
+
+    if not page.strip():
+        return []  # lxml refuses empty documents
+    hosts = []
+    for card in lxml.html.fromstring(page).xpath(f"//div[{_xpath_class('result')}]"):
+        links = card.xpath(f".//a[{_xpath_class('title')} and contains(@href, '/host/')]/@href")
+        if not links:
+            continue
+        fields = {}
+        for name, xpath in (('country', f".//span[{_xpath_class('country_name')}]"),
+                            ('city', ".//a[contains(@href, 'city%3A')]"),
+                            ('org', ".//a[contains(@href, 'org%3A')]"),
+                            ('timestamp', f".//div[{_xpath_class('timestamp')}]")):
+            found = card.xpath(xpath)
+            if found:
+                fields[name] = found[0].text_content()
+        hosts.append(_host(links[0].split('/host/')[1], **fields))
+    return hosts
+
+def _parse_bs4(page):
+    # bs4 is only needed for discovery, so keep it out of the refresh path.
+    from bs4 import BeautifulSoup
+
+    hosts = []
+    for card in BeautifulSoup(page, "html.parser").find_all("div", class_="result"):
+        a_tag = card.find("a", class_="title", href=True)
+        if not a_tag or "/host/" not in a_tag["href"]:
+            continue
+        fields = {}
+        for name, found in (('country', card.find("span", class_="country_name")),
+                            ('city', card.find("a", href=re.compile(r"city%3A"))),
+                            ('org', card.find("a", href=re.compile(r"org%3A"))),
+                            ('timestamp', card.find("div", class_="timestamp"))):
+            if found:
+                fields[name] = found.get_text()
+        hosts.append(_host(a_tag["href"].split("/host/")[1], **fields))
+    return hosts
+
+BACKENDS = {
+    'regex': _parse_regex,
+    'lxml': _parse_lxml,
+    'bs4': _parse_bs4,
+}
+
+# Optional packages each backend imports
+_REQUIRES = {'lxml': 'lxml', 'bs4': 'bs4'}
+
+def available_backends():
+    """Names of the backends whose dependencies are installed, in PARSER_BACKENDS order."""
+    return [name for name in PARSER_BACKENDS
+            if name not in _REQUIRES or importlib.util.find_spec(_REQUIRES[name]) is not None]
+
+def parse_results(page, backend=None):
+    """Returns a dict of FIELDS for each host on a Shodan results page.
+
+    With ``backend`` None, the backends in PARSER_BACKENDS are tried in
+    order, skipping any that are not installed. A backend that finds no
+    hosts on a page that links to some is treated as having missed changed
+    markup, and the next one is tried.
+    """
+    if backend is not None:
+        return BACKENDS[backend](page)
+
+    hosts = []
+    for name in available_backends():
+        hosts = BACKENDS[name](page)
+        if hosts or '/host/' not in page:
+            break
+    return hosts
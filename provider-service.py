@@ -1,26 +1,52 @@
 
-from flask import Flask, jsonify, render_template, redirect, url_for, request, flash, Response
+from flask import Flask, jsonify, render_template, redirect, url_for, request, flash, Response, session, stream_with_context, g, message_flashed
+import base64
+from collections import OrderedDict
+import csv
+from datetime import datetime, timezone
+import functools
+import io
+import threading
+import time
 import database
-import subprocess
-import sys
+import json
+from ollama_hunter import jobs, metrics
+from ollama_hunter.discovery import discover_hosts
+from ollama_hunter.refresh import refresh_hosts
 
 app = Flask(__name__)
 app.secret_key = 'supersecretkey' # Needed for flashing messages
 
+REQUEST_SECONDS = metrics.histogram(
+    "ollama_http_request_seconds", "Time to produce a response, by endpoint and status.", ["endpoint", "status"])
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    """Times each request; for streamed responses this is time to first byte."""
+    started = g.get('request_started')
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started,
+                                endpoint=request.endpoint or 'unmatched', status=response.status_code)
+    return response
+
 @app.route("/run-compass", methods=["POST"])
 def run_compass():
-    """Triggers the thanks-ollama.py script as a background process."""
+    """Starts a Shodan discovery run as a background job."""
     cookie = request.form.get('shodan-cookie')
     if not cookie:
         flash("Shodan cookie is required!", "error")
         return redirect(url_for('index'))
 
     try:
-        # Use Popen to run the script in the background
-        # We pass the python executable from the current environment
-        python_executable = sys.executable
-        subprocess.Popen([python_executable, "thanks-ollama.py", "--cookie", cookie])
-        flash("Thanks Ollama process started in the background. Refresh the page in a few moments to see results.", "success")
+        job, created = jobs.start_job("discovery", discover_hosts, cookie, resume=bool(request.form.get('resume')))
+        if created:
+            flash("Thanks Ollama process started in the background. Refresh the page in a few moments to see results.", "success")
+        else:
+            flash(f"Thanks Ollama is already {job.state} with this cookie.", "success")
     except Exception as e:
         flash(f"Failed to start Thanks Ollama: {e}", "error")
     
@@ -28,36 +54,227 @@ def run_compass():
 
 @app.route("/run-refresh", methods=["POST"])
 def run_refresh():
-    """Triggers the refresh-hosts.py script as a background process."""
+    """Starts a host refresh as a background job, unless one is already going."""
     try:
-        python_executable = sys.executable
-        subprocess.Popen([python_executable, "refresh-hosts.py"])
+        job, created = jobs.start_job("refresh", refresh_hosts)
+        if not created:
+            flash(f"A host refresh is already {job.state}.", "success")
     except Exception as e:
         flash(f"Failed to start host refresh: {e}", "error")
 
     return redirect(url_for('index'))
 
 
+SSE_KEEPALIVE = 15  # seconds of silence before a keep-alive comment
+
+def sse_event(event_id, kind, encoded):
+    """Formats one SSE frame carrying a JSON-encoded event."""
+    frame = f"event: {kind}\ndata: {encoded}\n\n"
+    return f"id: {event_id}\n{frame}" if event_id is not None else frame
+
+def last_event_id():
+    """``(job id, event id)`` from the ``Last-Event-ID`` header, or None.
+
+    Event ids are sent as ``<job id>:<event id>``, so a client's position
+    is only ever resumed in the job it was read from.
+    """
+    job_id, _, event_id = request.headers.get('Last-Event-ID', '').partition(':')
+    try:
+        return int(job_id), int(event_id)
+    except ValueError:
+        return None
+
+def event_stream(job):
+    """Streams ``job``'s events as SSE, resuming after ``Last-Event-ID``.
+
+    Each client reads the job's shared replay buffer at its own pace on its
+    own request thread, so a slow client never holds back the job. The
+    stream ends with an ``end`` event once the job has finished. A
+    ``Last-Event-ID`` from another job replays this one from the start.
+    """
+    resume = last_event_id()
+    after = resume[1] if resume and resume[0] == job.id else 0
+
+    def generate():
+        for event in job.events.subscribe(after=after, timeout=SSE_KEEPALIVE):
+            if event is None:
+                yield ": keep-alive\n\n"
+            else:
+                event_id, kind, _, encoded = event
+                yield sse_event(f"{job.id}:{event_id}", kind, encoded)
+        yield sse_event(None, 'end', json.dumps(job.to_dict()))
+
+    return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+
 @app.route("/stream-refresh")
 def stream_refresh():
-    """Runs the refresh-hosts.py script and streams its output."""
-    def generate():
-        python_executable = sys.executable
-        process = subprocess.Popen(
-            [python_executable, "refresh-hosts.py"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1
-        )
-        for line in process.stdout:
-            yield f"data: {line}\n\n"
-        process.wait()
-        yield "data: __END__\n\n"
-    return Response(generate(), mimetype='text/event-stream')
+    """Streams the running host refresh's events, starting one if needed.
+
+    Every client subscribes to the same job, so opening several streams does
+    not start several refreshes. A browser reconnecting with
+    ``Last-Event-ID`` resumes the refresh it was following, even if that
+    has finished in the meantime; one whose refresh is gone follows the
+    current refresh instead.
+    """
+    resume = last_event_id()
+    job = jobs.manager.get(resume[0]) if resume else None
+    if job is None or job.name != "refresh":
+        job, _ = jobs.start_job("refresh", refresh_hosts)
+    return event_stream(job)
+
+@app.route("/api/jobs/<int:job_id>/events")
+def stream_job_events(job_id):
+    """Streams any job's events as SSE."""
+    job = jobs.manager.get(job_id)
+    if job is None:
+        return jsonify({"error": f"no job {job_id}"}), 404
+    return event_stream(job)
+
+
+@app.route("/api/jobs", methods=["GET"])
+def list_jobs():
+    """Lists queued, running and recently finished jobs, newest first."""
+    return jsonify([job.to_dict() for job in jobs.manager.list()])
+
+@app.route("/api/jobs/<int:job_id>", methods=["GET"])
+def get_job(job_id):
+    """Returns one job's state and progress counters."""
+    job = jobs.manager.get(job_id)
+    if job is None:
+        return jsonify({"error": f"no job {job_id}"}), 404
+    return jsonify(job.to_dict())
+
+@app.route("/api/jobs/<int:job_id>/cancel", methods=["POST"])
+def cancel_job(job_id):
+    """Asks a queued or running job to stop."""
+    job = jobs.manager.get(job_id)
+    if job is None:
+        return jsonify({"error": f"no job {job_id}"}), 404
+    if not jobs.manager.cancel(job_id):
+        return jsonify({"error": f"job {job_id} has already {job.state}"}), 409
+    return jsonify(job.to_dict()), 202
+
+
+INDEX_MODEL_FIELDS = ('name', 'parameter_size', 'quantization_level', 'footprint_gb')
+API_MODEL_FIELDS = ('name', 'modified_at', 'parameter_size', 'quantization_level', 'parameter_size_b', 'footprint_gb')
+
+# Where each model field lives in HOSTS_WITH_MODELS
+MODEL_COLUMNS = {
+    'name': 'c.name',
+    'modified_at': 'hm.modified_at',
+    'parameter_size': 'c.parameter_size',
+    'quantization_level': 'c.quantization_level',
+    'parameter_size_b': 'c.parameter_size_b',
+    'footprint_gb': 'c.footprint_gb',
+}
+
+# ?min_<name>= / ?max_<name>= filters on indexed numeric model columns
+MODEL_RANGE_FILTERS = {'params_b': 'parameter_size_b', 'footprint_gb': 'footprint_gb'}
+
+def model_range_filter(args):
+    """SQL condition on ``h`` for the numeric model range filters.
+
+    A host matches when one of its models satisfies every given bound, so
+    ``?min_params_b=30&max_footprint_gb=24`` finds hosts serving a 30B+
+    model that fits in 24 GB. Raises ValueError for non-numeric bounds.
+    """
+    ranges, params = [], []
+    for name, column in MODEL_RANGE_FILTERS.items():
+        for bound, operator in (('min', '>='), ('max', '<=')):
+            value = args.get(f'{bound}_{name}')
+            if value:
+                ranges.append(f"fc.{column} {operator} ?")
+                params.append(float(value))
+    if not ranges:
+        return None, []
+    return """h.id IN (
+            SELECT f.host_id FROM model_catalog fc JOIN host_models f ON f.model_id = fc.id
+            WHERE {ranges})""".format(ranges=" AND ".join(ranges)), params
+
+HOSTS_WITH_MODELS = """
+    hosts h
+    LEFT JOIN host_models hm ON hm.host_id = h.id
+    LEFT JOIN model_catalog c ON c.id = hm.model_id"""
+
+def models_json(fields):
+    """SQL aggregate that folds a host's joined model rows into a JSON array.
+
+    Grouping hosts with their models in one query replaces a per-host
+    SELECT on the models table.
+    """
+    pairs = ", ".join(f"'{field}', {MODEL_COLUMNS[field]}" for field in fields)
+    return f"json_group_array(json_object({pairs})) FILTER (WHERE hm.host_id IS NOT NULL)"
+
+def rows_with_models(cursor):
+    """Converts rows from a ``models_json`` query into plain dicts."""
+    hosts = []
+    for row in cursor:
+        host_data = dict(row)
+        host_data["models"] = json.loads(host_data["models"])
+        hosts.append(host_data)
+    return hosts
+
+RESPONSE_CACHE_SIZE = 256
+
+# request path + query -> (data version, status, headers, body), LRU ordered
+_response_cache = OrderedDict()
+_response_cache_lock = threading.Lock()
 
+@message_flashed.connect_via(app)
+def note_flash(sender, message, category):
+    g.flashed = True
+
+def cached_by_data_version(view):
+    """Serves a read-only view with ETag/Last-Modified from the data version.
+
+    A client whose If-None-Match (or If-Modified-Since) still matches gets
+    a 304 before the view runs. Other requests are answered from an
+    in-process cache of rendered responses until a write bumps the data
+    version. Pages with pending flash messages always render, and pages
+    that flash while rendering are not cached, because their body depends
+    on the visitor's session.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        data_version = database.get_data_version()
+        version, updated_at = data_version
+        etag = f"{version}-{updated_at}"
+        last_modified = datetime.fromisoformat(updated_at).replace(tzinfo=timezone.utc, microsecond=0)
+
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains(etag)
+        else:
+            not_modified = request.if_modified_since is not None and last_modified <= request.if_modified_since
+        if session.get('_flashes'):
+            response = view(*args, **kwargs)
+        elif not_modified:
+            response = Response(status=304)
+        else:
+            key = request.full_path
+            with _response_cache_lock:
+                cached = _response_cache.get(key)
+                if cached:
+                    _response_cache.move_to_end(key)
+            if cached and cached[0] == data_version:
+                response = Response(cached[3], status=cached[1], headers=cached[2])
+            else:
+                response = app.make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not g.get('flashed'):
+                    with _response_cache_lock:
+                        _response_cache[key] = (data_version, response.status_code,
+                                                list(response.headers), response.get_data())
+                        while len(_response_cache) > RESPONSE_CACHE_SIZE:
+                            _response_cache.popitem(last=False)
+
+        response = app.make_response(response)
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        return response
+    return wrapper
 
 @app.route("/", methods=["GET"])
+@cached_by_data_version
 def index():
     """Renders the web UI for displaying live hosts with sorting and filtering."""
     conn = database.get_db_connection()
@@ -70,73 +287,411 @@ def index():
     if order not in ['asc', 'desc']:
         order = 'desc'
 
-    # Fetch all unique models for the filter dropdown
-    cursor.execute("SELECT DISTINCT name FROM models ORDER BY name ASC")
-    all_models = [row['name'] for row in cursor.fetchall()]
-
-    # Base query
-    query = "SELECT id, ip_address, country, last_seen, performance FROM hosts WHERE is_alive = 1"
+    # Base query: hosts and their models in one grouped pass. The largest
+    # model is the one with the biggest footprint (h.max_model_gb), and its
+    # size in parameters is read from that same model.
+    query = """
+        SELECT h.id, h.ip_address, h.country, h.last_seen, h.performance, h.capacity_gb,
+               (SELECT lc.parameter_size_b
+                FROM host_models lm JOIN model_catalog lc ON lc.id = lm.model_id
+                WHERE lm.host_id = h.id
+                ORDER BY lc.footprint_gb DESC, lc.parameter_size_b DESC LIMIT 1) AS max_params_b,
+               h.max_model_gb AS max_footprint_gb,
+               {models} AS models
+        FROM {hosts_with_models}
+        WHERE h.is_alive = 1""".format(models=models_json(INDEX_MODEL_FIELDS), hosts_with_models=HOSTS_WITH_MODELS)
     params = []
 
     # Add filtering by model
     if selected_models:
-        query += " AND id IN (SELECT host_id FROM models WHERE name IN ({seq}))".format(
+        query += """ AND h.id IN (
+            SELECT f.host_id FROM host_models f JOIN model_catalog fc ON fc.id = f.model_id
+            WHERE fc.name IN ({seq}))""".format(
             seq=','.join(['?' for _ in selected_models]))
         params.extend(selected_models)
 
+    try:
+        size_filter, size_params = model_range_filter(request.args)
+    except ValueError:
+        flash("Model size bounds must be numbers.", "error")
+        size_filter, size_params = None, []
+    if size_filter:
+        query += " AND " + size_filter
+        params.extend(size_params)
+
+    query += " GROUP BY h.id"
+
     # Add sorting
     if sort_by == 'performance':
-        query += f" ORDER BY CASE performance WHEN 'High-Performance' THEN 1 WHEN 'Mid-Range' THEN 2 WHEN 'CPU-Only / Low-RAM' THEN 3 WHEN 'Small-Model / Hobbyist' THEN 4 ELSE 5 END {order}"
+        query += f" ORDER BY CASE h.performance WHEN 'High-Performance' THEN 1 WHEN 'Mid-Range' THEN 2 WHEN 'CPU-Only / Low-RAM' THEN 3 WHEN 'Small-Model / Hobbyist' THEN 4 ELSE 5 END {order}"
+    elif sort_by == 'size':
+        # By the stored footprint of the largest model, like /api/providers?sort=max_model
+        query += f" ORDER BY h.max_model_gb {order}, h.last_seen DESC"
+    elif sort_by == 'capacity':
+        query += f" ORDER BY h.capacity_gb {order}, h.last_seen DESC"
     else: # Default to last_seen
-        query += f" ORDER BY last_seen {order}"
+        query += f" ORDER BY h.last_seen {order}"
 
     cursor.execute(query, params)
-    hosts = cursor.fetchall()
-    
-    hosts_with_models = []
-    for host in hosts:
-        host_data = dict(host)
-        cursor.execute("SELECT name, parameter_size, quantization_level FROM models WHERE host_id = ?", (host['id'],))
-        models = cursor.fetchall()
-        host_data["models"] = [dict(model) for model in models]
-        hosts_with_models.append(host_data)
-        
-    conn.close()
+    hosts_with_models = rows_with_models(cursor)
+
     return render_template(
         "index.html", 
         hosts=hosts_with_models, 
-        all_models=all_models, 
         selected_models=selected_models,
+        min_params_b=request.args.get('min_params_b', ''),
+        max_footprint_gb=request.args.get('max_footprint_gb', ''),
         sort_by=sort_by,
         order=order
     )
 
+HOST_FIELDS = ('id', 'ip_address', 'country', 'last_seen', 'performance', 'max_model_gb', 'capacity_gb')
+# ?sort= orders for /api/providers, each backed by an (is_alive, column) index
+SORT_COLUMNS = {'last_seen': 'last_seen', 'capacity': 'capacity_gb', 'max_model': 'max_model_gb'}
+# ?min_<name>= / ?max_<name>= filters on the indexed host capacity columns
+HOST_RANGE_FILTERS = ('capacity_gb', 'max_model_gb')
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+DEFAULT_HISTORY_SIZE = 1000
+MAX_HISTORY_SIZE = 10000
+DEFAULT_SEARCH_SIZE = 20
+MAX_SEARCH_SIZE = 100
+DEFAULT_STATS_SIZE = 25  # keys per dimension on /stats and /api/stats
+
+def encode_cursor(sort, row):
+    """Opaque pagination cursor for the (sort column, id) position of ``row``."""
+    raw = json.dumps([sort, row[SORT_COLUMNS[sort]], row['id']]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(sort, cursor):
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    position = json.loads(raw)
+    if len(position) == 2:  # cursors from before ?sort= existed
+        position = ['last_seen'] + position
+    cursor_sort, value, host_id = position
+    value_type = str if sort == 'last_seen' else (int, float)
+    if cursor_sort != sort or not isinstance(value, value_type) or not isinstance(host_id, int):
+        raise ValueError("malformed cursor")
+    return value, host_id
+
+def live_host_filters(args):
+    """SQL conditions on ``h`` for the ?model=, ?performance=, ?country= and
+    numeric model range filters. Raises ValueError for non-numeric bounds."""
+    conditions = ["h.is_alive = 1"]
+    params = []
+
+    models = args.getlist('model')
+    if models:
+        conditions.append("""h.id IN (
+            SELECT f.host_id FROM host_models f JOIN model_catalog fc ON fc.id = f.model_id
+            WHERE fc.name IN ({seq}))""".format(seq=','.join(['?' for _ in models])))
+        params.extend(models)
+
+    for field in ('performance', 'country'):
+        values = args.getlist(field)
+        if values:
+            conditions.append("h.{field} IN ({seq})".format(field=field, seq=','.join(['?' for _ in values])))
+            params.extend(values)
+
+    size_filter, size_params = model_range_filter(args)
+    if size_filter:
+        conditions.append(size_filter)
+        params.extend(size_params)
+
+    for column in HOST_RANGE_FILTERS:
+        for bound, operator in (('min', '>='), ('max', '<=')):
+            value = args.get(f'{bound}_{column}')
+            if value:
+                conditions.append(f"h.{column} {operator} ?")
+                params.append(float(value))
+
+    return conditions, params
+
 @app.route("/api/providers", methods=["GET"])
+@cached_by_data_version
 def get_providers():
-    """Returns a list of live Ollama hosts and their models."""
+    """Returns one page of live Ollama hosts and their models.
+
+    Hosts are ordered newest ``last_seen`` first, or with ``sort=capacity``
+    / ``sort=max_model`` by estimated memory needs, largest first. The body
+    stays a JSON list; when there are more results, the ``Link`` header
+    (rel="next") and ``X-Next-Cursor`` carry the cursor for the following
+    page.
+
+    Query parameters: ``limit`` (default 100, max 1000), ``sort``,
+    ``cursor``, ``fields`` (comma-separated subset of the host fields and
+    ``models``), the repeatable filters ``model``, ``performance`` and
+    ``country``, and numeric ``min_``/``max_`` bounds.
+    """
+    try:
+        limit = min(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        if limit < 1:
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": f"limit must be an integer between 1 and {MAX_PAGE_SIZE}"}), 400
+
+    fields = request.args.get('fields')
+    fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else list(HOST_FIELDS) + ['models']
+    unknown = set(fields) - set(HOST_FIELDS) - {'models'}
+    if unknown:
+        return jsonify({"error": f"unknown fields: {', '.join(sorted(unknown))}"}), 400
+
+    sort = request.args.get('sort', 'last_seen')
+    if sort not in SORT_COLUMNS:
+        return jsonify({"error": f"sort must be one of: {', '.join(SORT_COLUMNS)}"}), 400
+    sort_column = SORT_COLUMNS[sort]
+
+    try:
+        conditions, params = live_host_filters(request.args)
+    except ValueError:
+        return jsonify({"error": "min_/max_ bounds must be numbers"}), 400
+    cursor_arg = request.args.get('cursor')
+    if cursor_arg:
+        try:
+            params.extend(decode_cursor(sort, cursor_arg))
+            conditions.append(f"(h.{sort_column}, h.id) < (?, ?)")
+        except (ValueError, TypeError):
+            return jsonify({"error": "invalid cursor"}), 400
+
+    # Select the page of hosts by index first, then attach models to just
+    # those rows, so the work per request is bounded by ``limit``.
+    host_columns = ", ".join(f"h.{f}" for f in dict.fromkeys(['id', sort_column] + [f for f in fields if f != 'models']))
+    order_by = f"h.{sort_column} DESC, h.id DESC"
+    page_query = """
+        SELECT {columns} FROM hosts h
+        WHERE {conditions}
+        ORDER BY {order_by}
+        LIMIT ?""".format(columns=host_columns, conditions=" AND ".join(conditions), order_by=order_by)
+    params.append(limit + 1)
+
     conn = database.get_db_connection()
     cursor = conn.cursor()
-    
-    # Fetch live hosts
-    cursor.execute("SELECT id, ip_address, country, last_seen, performance FROM hosts WHERE is_alive = 1")
-    hosts = cursor.fetchall()
-    
-    providers = []
-    for host in hosts:
-        host_data = dict(host) # Convert Row object to dictionary
-        
-        # Fetch models for each host
-        cursor.execute("SELECT name, modified_at, parameter_size, quantization_level FROM models WHERE host_id = ?", (host['id'],))
-        models = cursor.fetchall()
-        
-        host_data["models"] = [dict(model) for model in models] # Convert Row objects to dictionaries
-        providers.append(host_data)
-        
-    conn.close()
-    return jsonify(providers)
+    if 'models' in fields:
+        cursor.execute("""
+            WITH page AS ({page_query})
+            SELECT h.*, {models} AS models
+            FROM page h
+            LEFT JOIN host_models hm ON hm.host_id = h.id
+            LEFT JOIN model_catalog c ON c.id = hm.model_id
+            GROUP BY h.id
+            ORDER BY {order_by}""".format(page_query=page_query, models=models_json(API_MODEL_FIELDS), order_by=order_by),
+            params)
+        rows = rows_with_models(cursor)
+    else:
+        cursor.execute(page_query, params)
+        rows = [dict(row) for row in cursor]
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    providers = [{f: row[f] for f in fields} for row in rows]
+
+    response = jsonify(providers)
+    if has_more:
+        next_cursor = encode_cursor(sort, rows[-1])
+        args = request.args.to_dict(flat=False)
+        args['cursor'] = [next_cursor]
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = '<{}>; rel="next"'.format(url_for('get_providers', **args))
+    return response
+
+EXPORT_BATCH_SIZE = 500
+CSV_COLUMNS = ('id', 'ip_address', 'country', 'last_seen', 'performance', 'models')
+
+def export_rows(conditions, params, models_expression):
+    """Yields batches of live host rows straight from a SQLite cursor.
+
+    Uses its own connection, closed when the generator finishes or the
+    client goes away. Rows come out in ``last_seen`` order by index, with
+    each host's models fetched through a correlated lookup on the
+    ``host_models`` primary key, so nothing has to be sorted or buffered.
+    """
+    query = """
+        SELECT h.id, h.ip_address, h.country, h.last_seen, h.performance,
+               (SELECT {models} FROM host_models hm JOIN model_catalog c ON c.id = hm.model_id
+                WHERE hm.host_id = h.id) AS models
+        FROM hosts h
+        WHERE {conditions}
+        ORDER BY h.last_seen ASC, h.id ASC""".format(models=models_expression, conditions=" AND ".join(conditions))
+    with database.connect() as conn:
+        cursor = conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                return
+            yield rows
+
+def parse_timestamp(value):
+    """``datetime.fromisoformat`` that also takes a trailing ``Z`` for UTC.
+
+    Python before 3.11 rejects the ``Z`` most clients send. Raises
+    ValueError for anything that is not an ISO 8601 timestamp.
+    """
+    if value.endswith(('Z', 'z')):
+        value = value[:-1] + '+00:00'
+    return datetime.fromisoformat(value)
+
+def export_filters():
+    """The /api/providers filters plus ``?since=`` on last_seen, for exports."""
+    conditions, params = live_host_filters(request.args)
+    since = request.args.get('since')
+    if since:
+        since = parse_timestamp(since) # Raises ValueError for garbage
+        if since.tzinfo is not None:
+            # last_seen is stored as naive UTC isoformat and compared as text
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        conditions.append("h.last_seen > ?")
+        params.append(since.isoformat())
+    return conditions, params
+
+@app.route("/api/providers.ndjson", methods=["GET"])
+def export_providers_ndjson():
+    """Streams every matching live host as one JSON object per line.
+
+    Accepts the /api/providers filters and ``?since=<ISO timestamp>`` to
+    send only hosts seen after that time. Output is ordered by last_seen,
+    so the last line's value is the ``since`` for the next incremental pull.
+    """
+    try:
+        conditions, params = export_filters()
+    except ValueError:
+        return jsonify({"error": "since must be an ISO 8601 timestamp and min_/max_ size bounds numbers"}), 400
+
+    def generate():
+        models = "json_group_array(json_object({pairs}))".format(
+            pairs=", ".join(f"'{field}', {MODEL_COLUMNS[field]}" for field in API_MODEL_FIELDS))
+        for rows in export_rows(conditions, params, models):
+            lines = []
+            for row in rows:
+                host_data = dict(row)
+                host_data["models"] = json.loads(host_data["models"])
+                lines.append(json.dumps(host_data))
+            yield "\n".join(lines) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route("/api/providers.csv", methods=["GET"])
+def export_providers_csv():
+    """Streams every matching live host as CSV, model names joined by ``;``.
+
+    Takes the same parameters as the NDJSON export.
+    """
+    try:
+        conditions, params = export_filters()
+    except ValueError:
+        return jsonify({"error": "since must be an ISO 8601 timestamp and min_/max_ size bounds numbers"}), 400
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_COLUMNS)
+        for rows in export_rows(conditions, params, "group_concat(c.name, ';')"):
+            writer.writerows(tuple(row) for row in rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/csv',
+        headers={'Content-Disposition': 'attachment; filename=providers.csv'},
+    )
 
 import requests
 
+OBSERVATION_STATUS = {
+    database.OBS_UNREACHABLE: 'unreachable',
+    database.OBS_ALIVE: 'alive',
+    database.OBS_EMPTY: 'empty',
+}
+
+def parse_time_arg(value):
+    """Accepts epoch seconds or an ISO 8601 timestamp (UTC if naive)."""
+    try:
+        return int(value)
+    except ValueError:
+        return parse_timestamp(value)
+
+@app.route("/api/host/<ip_address>/history", methods=["GET"])
+@cached_by_data_version
+def get_host_history(ip_address):
+    """Returns a host's probe observations, oldest first.
+
+    Query parameters: ``since`` and ``until`` (epoch seconds or ISO 8601,
+    ``until`` exclusive) and ``limit`` (default 1000, max 10000).
+    """
+    try:
+        since = parse_time_arg(request.args['since']) if 'since' in request.args else None
+        until = parse_time_arg(request.args['until']) if 'until' in request.args else None
+    except ValueError:
+        return jsonify({"error": "since and until must be epoch seconds or ISO 8601 timestamps"}), 400
+    try:
+        limit = min(int(request.args.get('limit', DEFAULT_HISTORY_SIZE)), MAX_HISTORY_SIZE)
+        if limit < 1:
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": f"limit must be an integer between 1 and {MAX_HISTORY_SIZE}"}), 400
+
+    rows = database.get_observations(ip_address, since=since, until=until, limit=limit)
+    return jsonify([{
+        'observed_at': datetime.fromtimestamp(row['observed_at'], timezone.utc).isoformat(),
+        'status': OBSERVATION_STATUS.get(row['status'], row['status']),
+        'latency_ms': row['latency_ms'],
+        'models': json.loads(row['models']) if row['models'] else [],
+    } for row in rows])
+
+@app.route("/api/models/search", methods=["GET"])
+@cached_by_data_version
+def search_models():
+    """Autocompletes model names, with the number of live hosts serving each.
+
+    Query parameters: ``q`` (matched anywhere in the name or family from
+    three characters on, as a name prefix below that) and ``limit``
+    (default 20, max 100).
+    """
+    try:
+        limit = min(int(request.args.get('limit', DEFAULT_SEARCH_SIZE)), MAX_SEARCH_SIZE)
+        if limit < 1:
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": f"limit must be an integer between 1 and {MAX_SEARCH_SIZE}"}), 400
+
+    rows = database.search_models(request.args.get('q', '').strip(), limit=limit)
+    return jsonify([dict(row) for row in rows])
+
+def fleet_stats(limit):
+    """The summary tables as ``{'hosts': {...}, dimension: [{'key', 'hosts'}, ...]}``.
+
+    Unknown countries and tiers are reported with a None key.
+    """
+    stats = database.get_fleet_stats(limit=limit)
+    result = {'hosts': {'alive': 0, 'dead': 0, **dict(stats.pop('status'))}}
+    for dimension, rows in stats.items():
+        result[dimension] = [{'key': key or None, 'hosts': hosts} for key, hosts in rows]
+    return result
+
+@app.route("/api/stats", methods=["GET"])
+@cached_by_data_version
+def get_stats():
+    """Host counts by country, performance tier, model family and quantization.
+
+    Served from summary tables kept current on every write, so the cost
+    does not grow with the fleet. ``limit`` caps the keys per dimension
+    (default 25, 0 for all).
+    """
+    try:
+        limit = int(request.args.get('limit', DEFAULT_STATS_SIZE))
+        if limit < 0:
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": "limit must be a non-negative integer"}), 400
+    return jsonify(fleet_stats(limit or None))
+
+@app.route("/stats", methods=["GET"])
+@cached_by_data_version
+def stats_page():
+    """Renders the fleet dashboard."""
+    return render_template("stats.html", stats=fleet_stats(DEFAULT_STATS_SIZE))
+
 @app.route("/api/host/<ip_address>/status", methods=["GET"])
 def get_host_status(ip_address):
     """
@@ -153,6 +708,11 @@ def get_host_status(ip_address):
     except Exception as e:
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
 
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Probe, database, job and request timings in the Prometheus text format."""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     database.create_database() # Ensure database is initialized
     # Check for FLASK_ENV environment variable to determine debug mode
@@ -0,0 +1,27 @@
+import argparse
+import sys
+
+import database
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check the fleet summaries kept by triggers against a full recompute, and rebuild them.")
+    parser.add_argument("--verify", action="store_true",
+                        help="Only report drift; exit with status 1 if there is any.")
+    args = parser.parse_args()
+
+    database.create_database() # Ensure db is created
+    drift = database.verify_summaries()
+    for table, dimension, key, stored, expected in drift:
+        print(f"[!] {table} {dimension}={key!r}: stored {stored}, recomputed {expected}")
+    if not drift:
+        print("[✓] Summaries match a full recompute.")
+    elif args.verify:
+        sys.exit(1)
+
+    if not args.verify:
+        database.rebuild_summaries()
+        print("[✓] Summaries rebuilt.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import argparse
+
+import database
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Recompute every host's performance tier from its stored models, without re-probing.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report how many hosts would change tier.")
+    args = parser.parse_args()
+
+    database.create_database() # Ensure db is created
+    changed = database.reclassify_hosts(dry_run=args.dry_run)
+    if args.dry_run:
+        print(f"[i] {changed} hosts would change performance tier.")
+    else:
+        print(f"[✓] Reclassified hosts: {changed} changed performance tier.")
+
+if __name__ == "__main__":
+    main()
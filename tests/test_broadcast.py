@@ -0,0 +1,51 @@
+import unittest
+import os
+import threading
+
+# We need to adjust the path to import from the parent directory
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ollama_hunter.broadcast import Broadcaster
+
+class TestBroadcaster(unittest.TestCase):
+
+    def test_fan_out_and_replay(self):
+        """Test that every subscriber, including late joiners, sees every event."""
+        broadcaster = Broadcaster()
+        early = broadcaster.subscribe()
+        broadcaster.publish('host', {'host': "10.0.0.1", 'models': 2})
+        self.assertEqual(next(early)[:3], (1, 'host', {'host': "10.0.0.1", 'models': 2}))
+
+        broadcaster.publish('progress', {'done': 1})
+        broadcaster.close()
+        self.assertEqual([e[0] for e in early], [2])
+        late = list(broadcaster.subscribe())
+        self.assertEqual([(e[0], e[1]) for e in late], [(1, 'host'), (2, 'progress')])
+        self.assertEqual(late[1][3], '{"done":1}')
+        # Resuming after an id skips what the client already has
+        self.assertEqual([e[0] for e in broadcaster.subscribe(after=1)], [2])
+
+    def test_slow_subscriber(self):
+        """Test that a stalled reader does not block publishing and learns what it missed."""
+        broadcaster = Broadcaster(replay=10)
+        stalled = broadcaster.subscribe()
+        publisher = threading.Thread(target=lambda: [broadcaster.publish('log', {'n': n}) for n in range(100)])
+        publisher.start()
+        publisher.join(5)
+        self.assertFalse(publisher.is_alive())
+        broadcaster.close()
+
+        events = list(stalled)
+        self.assertEqual(events[0][1:3], ('lagged', {'skipped': 90}))
+        self.assertEqual([e[2]['n'] for e in events[1:]], list(range(90, 100)))
+
+    def test_keepalive_timeout(self):
+        """Test that an idle subscription yields None so callers can send keep-alives."""
+        broadcaster = Broadcaster()
+        self.assertIsNone(next(broadcaster.subscribe(timeout=0.01)))
+        broadcaster.close()
+        self.assertIsNone(broadcaster.publish('log', {}))
+
+if __name__ == '__main__':
+    unittest.main()
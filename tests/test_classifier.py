@@ -0,0 +1,67 @@
+import unittest
+import os
+
+# We need to adjust the path to import from the parent directory
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ollama_hunter.classifier import estimate_host_performance, parse_size_to_gb, quantization_info
+
+class TestClassifier(unittest.TestCase):
+
+    def test_parse_size_to_gb(self):
+        """Test parsing billions and millions of parameters."""
+        self.assertEqual(parse_size_to_gb("7B"), 7.0)
+        self.assertEqual(parse_size_to_gb(" 8.0b "), 8.0)
+        self.assertEqual(parse_size_to_gb("750M"), 0.75)
+        self.assertEqual(parse_size_to_gb(None), 0.0)
+        self.assertEqual(parse_size_to_gb("garbage"), 0.0)
+        self.assertEqual(parse_size_to_gb("8x7B"), 56.0)
+        self.assertEqual(parse_size_to_gb("1.5T"), 1500.0)
+        # Stray letters used to be stripped, turning these into numbers
+        self.assertEqual(parse_size_to_gb("b1b"), 0.0)
+        self.assertEqual(parse_size_to_gb("7 billion"), 0.0)
+        self.assertEqual(parse_size_to_gb([7]), 0.0)
+
+    def test_quantization_info(self):
+        """Test the quantization lookup table and its fallback for unlisted formats."""
+        self.assertEqual(quantization_info("Q4_K_M"), (4.85, 0.7275))
+        self.assertEqual(quantization_info("f16"), (16.0, 2.4))
+        self.assertEqual(quantization_info("Q5_K_XL"), (5.5, 0.825))
+        self.assertEqual(quantization_info(None), (None, None))
+        self.assertEqual(quantization_info("unknown"), (None, None))
+        self.assertEqual(quantization_info(["Q4_0"]), (None, None))
+
+    def test_estimate_host_performance(self):
+        """Test each performance tier of the heuristic."""
+        self.assertEqual(estimate_host_performance([]), "Unknown")
+        self.assertEqual(
+            estimate_host_performance([{'parameter_size': '70.6B', 'quantization_level': 'Q4_K_M'}]),
+            "High-Performance")
+        self.assertEqual(
+            estimate_host_performance([{'parameter_size': '32B', 'quantization_level': 'Q8_0'}]),
+            "High-Performance")
+        self.assertEqual(
+            estimate_host_performance([{'parameter_size': '32B', 'quantization_level': 'Q4_K_M'}]),
+            "Mid-Range")
+        self.assertEqual(
+            estimate_host_performance([{'parameter_size': '14B', 'quantization_level': 'Q4_0'}]),
+            "CPU-Only / Low-RAM")
+        self.assertEqual(
+            estimate_host_performance([{'parameter_size': '8B', 'quantization_level': 'Q4_0'}]),
+            "Small-Model / Hobbyist")
+
+    def test_missing_quantization_level(self):
+        """Test that a model without a quantization level does not crash the heuristic."""
+        self.assertEqual(
+            estimate_host_performance([{'parameter_size': '8B', 'quantization_level': None}]),
+            "Small-Model / Hobbyist")
+
+    def test_mistyped_fields(self):
+        """Test that non-string sizes and quantization levels are treated as unknown."""
+        self.assertEqual(
+            estimate_host_performance([{'parameter_size': [7], 'quantization_level': 7}]),
+            "Small-Model / Hobbyist")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import unittest
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+# We need to adjust the path to import from the parent directory
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+
+MODELS = [
+    {'name': 'llama3:latest', 'modified_at': 'N/A', 'parameter_size': '8B', 'quantization_level': 'Q4_0'},
+    {'name': 'phi3:latest', 'modified_at': 'N/A', 'parameter_size': '3.8B', 'quantization_level': 'Q4_0'},
+]
+
+class TestConnections(unittest.TestCase):
+
+    def setUp(self):
+        """Point the database module at a fresh file-backed database."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.original_db_file = database.DB_FILE
+        database.DB_FILE = os.path.join(self.tmpdir, "test.db")
+        database.create_database()
+
+    def tearDown(self):
+        database.close_db_connection()
+        database.DB_FILE = self.original_db_file
+        shutil.rmtree(self.tmpdir)
+
+    def test_pragmas(self):
+        """Test that connections use WAL, synchronous=NORMAL and a busy timeout."""
+        conn = database.get_db_connection()
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)
+        self.assertEqual(conn.execute("PRAGMA busy_timeout").fetchone()[0], database.BUSY_TIMEOUT_MS)
+
+    def test_connection_is_reused_per_thread(self):
+        """Test that each thread gets one connection, reused across calls."""
+        self.assertIs(database.get_db_connection(), database.get_db_connection())
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(database.get_db_connection()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], database.get_db_connection())
+
+    def test_transaction_commits_and_rolls_back(self):
+        """Test that transaction() commits on success and rolls back on error."""
+        with database.transaction() as conn:
+            conn.execute("INSERT INTO hosts (ip_address, last_seen) VALUES ('10.0.0.1', 'now')")
+
+        with self.assertRaises(RuntimeError):
+            with database.transaction() as conn:
+                conn.execute("INSERT INTO hosts (ip_address, last_seen) VALUES ('10.0.0.2', 'now')")
+                raise RuntimeError("boom")
+
+        with database.connect() as conn:
+            ips = [row['ip_address'] for row in conn.execute("SELECT ip_address FROM hosts")]
+        self.assertEqual(ips, ['10.0.0.1'])
+
+    def test_connect_closes(self):
+        """Test that connect() closes its dedicated connection on exit."""
+        with database.connect() as conn:
+            conn.execute("SELECT 1")
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+    def test_reader_not_blocked_by_writer(self):
+        """Test that a reader does not wait for an open exclusive write transaction."""
+        database.add_or_update_host("10.0.0.1", "Mid-Range")
+
+        writer = database.open_db_connection()
+        writer.isolation_level = None
+        writer.execute("BEGIN EXCLUSIVE")
+        writer.execute("UPDATE hosts SET performance = 'High-Performance'")
+        try:
+            started = time.perf_counter()
+            host = database.get_host_by_ip("10.0.0.1")
+            self.assertLess(time.perf_counter() - started, 1.0)
+            self.assertEqual(host['performance'], "Mid-Range", "Readers should see the last committed state.")
+        finally:
+            writer.execute("COMMIT")
+            writer.close()
+        self.assertEqual(database.get_host_by_ip("10.0.0.1")['performance'], "High-Performance")
+
+    def test_concurrent_readers_and_writer(self):
+        """Stress test: readers keep querying while a writer commits batches."""
+        errors = []
+        reads = []
+        writing = threading.Event()
+        done = threading.Event()
+
+        def write():
+            try:
+                for batch in range(20):
+                    database.write_probe_results([
+                        {'ip_address': f"10.{batch}.0.{i}", 'performance': "Mid-Range", 'models': MODELS}
+                        for i in range(50)
+                    ])
+                    writing.set()
+            except sqlite3.Error as e:
+                errors.append(e)
+            finally:
+                database.close_db_connection()
+                done.set()
+
+        def read():
+            count = 0
+            try:
+                writing.wait()
+                while not done.is_set():
+                    conn = database.get_db_connection()
+                    conn.execute(
+                        "SELECT h.id, COUNT(m.name) FROM hosts h LEFT JOIN models m ON m.host_id = h.id "
+                        "WHERE h.is_alive = 1 GROUP BY h.id").fetchall()
+                    count += 1
+            except sqlite3.Error as e:
+                errors.append(e)
+            finally:
+                database.close_db_connection()
+                reads.append(count)
+
+        threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertTrue(all(count > 0 for count in reads), "Every reader should make progress during writes.")
+        self.assertEqual(len(database.get_all_hosts()), 1000)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,13 +2,18 @@
 import unittest
 import sqlite3
 from datetime import datetime, timezone
+import json
 import os
+import random
+import shutil
+import tempfile
 
 # We need to adjust the path to import from the parent directory
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import database
+from ollama_hunter.classifier import estimate_host_performance
 
 class TestDatabase(unittest.TestCase):
 
@@ -17,11 +22,13 @@ class TestDatabase(unittest.TestCase):
         self.conn = sqlite3.connect(":memory:")
         self.conn.row_factory = sqlite3.Row # Use dictionary-like rows
         # Monkey-patch the get_db_connection to use our in-memory db
+        self.original_get_db_connection = database.get_db_connection
         database.get_db_connection = lambda: self.conn
         database.create_database()
 
     def tearDown(self):
         """Close the database connection after each test."""
+        database.get_db_connection = self.original_get_db_connection
         self.conn.close()
 
     def test_create_database(self):
@@ -29,8 +36,14 @@ class TestDatabase(unittest.TestCase):
         cursor = self.conn.cursor()
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='hosts'")
         self.assertIsNotNone(cursor.fetchone(), "'hosts' table should be created.")
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='models'")
-        self.assertIsNotNone(cursor.fetchone(), "'models' table should be created.")
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='model_catalog'")
+        self.assertIsNotNone(cursor.fetchone(), "'model_catalog' table should be created.")
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='host_models'")
+        self.assertIsNotNone(cursor.fetchone(), "'host_models' table should be created.")
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='view' AND name='models'")
+        self.assertIsNotNone(cursor.fetchone(), "'models' view should be created.")
+        cursor.execute("PRAGMA user_version")
+        self.assertEqual(cursor.fetchone()[0], len(database.MIGRATIONS))
 
     def test_add_or_update_host(self):
         """Test adding a new host and updating an existing one."""
@@ -100,5 +113,328 @@ class TestDatabase(unittest.TestCase):
         cursor.execute("SELECT COUNT(*) FROM models WHERE host_id = ?", (host_id,))
         self.assertEqual(cursor.fetchone()[0], 0)
 
+    def test_write_probe_results(self):
+        """Test upserting, replacing models and marking dead hosts in one batch."""
+        old_id = database.add_or_update_host("10.0.0.3", "Mid-Range", country="Germany")
+        database.add_models(old_id, [
+            {'name': 'stale:latest', 'modified_at': 'N/A', 'parameter_size': '1B', 'quantization_level': 'Q8_0'}
+        ])
+        dead_id = database.add_or_update_host("10.0.0.4", "Mid-Range")
+
+        rows = database.write_probe_results([
+            {'ip_address': "10.0.0.3", 'performance': "Small-Model / Hobbyist", 'country': None, 'models': [
+                {'name': 'llama3:latest', 'modified_at': 'N/A', 'parameter_size': '8B', 'quantization_level': 'Q4_0'},
+            ]},
+            {'ip_address': "10.0.0.5", 'performance': "Small-Model / Hobbyist", 'country': "France", 'models': [
+                {'name': 'phi3:latest', 'modified_at': 'N/A', 'parameter_size': '3.8B', 'quantization_level': 'Q4_0'},
+            ]},
+            {'ip_address': "10.0.0.4", 'performance': None, 'models': None},
+            {'ip_address': "10.0.0.6", 'performance': None, 'models': None},
+        ])
+        self.assertGreater(rows, 0)
+
+        updated = database.get_host_by_ip("10.0.0.3")
+        self.assertEqual(updated['id'], old_id, "Upsert should keep the existing host ID.")
+        self.assertEqual(updated['performance'], "Small-Model / Hobbyist")
+        self.assertEqual(updated['country'], "Germany", "A missing country should not overwrite a known one.")
+        self.assertEqual(database.get_host_by_ip("10.0.0.5")['country'], "France")
+        self.assertEqual(database.get_host_by_ip("10.0.0.4")['is_alive'], 0)
+        self.assertIsNone(database.get_host_by_ip("10.0.0.6"), "Unknown dead hosts should not be stored.")
+
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT name FROM models WHERE host_id = ?", (old_id,))
+        self.assertEqual([row['name'] for row in cursor.fetchall()], ['llama3:latest'])
+        self.assertEqual(dead_id, database.get_host_by_ip("10.0.0.4")['id'])
+
+    def test_uncataloguable_model(self):
+        """Test that a model the catalog rejects fails loudly instead of with a TypeError."""
+        with self.assertRaisesRegex(ValueError, "could not be added to the catalog"):
+            database.write_probe_results([{'ip_address': "10.0.0.7", 'performance': "Small", 'models': [
+                {'name': None, 'modified_at': 'N/A', 'parameter_size': '8B', 'quantization_level': 'Q4_0'}]}])
+        self.assertIsNone(database.get_host_by_ip("10.0.0.7"), "The batch should be rolled back.")
+
+    def test_refresh_schedule(self):
+        """Test next-probe times, failure backoff and change counting."""
+        llama = {'name': 'llama3:latest', 'modified_at': 'N/A', 'parameter_size': '8B', 'quantization_level': 'Q4_0'}
+        phi = {'name': 'phi3:latest', 'modified_at': 'N/A', 'parameter_size': '3.8B', 'quantization_level': 'Q4_0'}
+        database.write_probe_results([
+            {'ip_address': "10.0.1.1", 'performance': "Small", 'models': [llama]},
+            {'ip_address': "10.0.1.2", 'performance': "Small", 'models': [llama]},
+        ])
+        database.write_probe_results([
+            {'ip_address': "10.0.1.1", 'performance': "Small", 'models': [llama]},
+            {'ip_address': "10.0.1.2", 'performance': "Small", 'models': [llama, phi]},
+        ])
+        stable = database.get_host_by_ip("10.0.1.1")
+        changed = database.get_host_by_ip("10.0.1.2")
+        self.assertEqual((stable['probe_count'], stable['change_count']), (2, 0))
+        self.assertEqual((changed['probe_count'], changed['change_count']), (2, 1))
+        self.assertGreater(stable['next_probe_at'], stable['last_probed_at'])
+
+        backoffs = []
+        for _ in range(3):
+            database.write_probe_results([{'ip_address': "10.0.1.1", 'performance': None, 'models': None}])
+            host = database.get_host_by_ip("10.0.1.1")
+            backoffs.append(datetime.fromisoformat(host['next_probe_at']) - datetime.fromisoformat(host['last_probed_at']))
+        self.assertEqual(host['fail_count'], 3)
+        self.assertEqual([round(b.total_seconds() / database.RECHECK_INTERVAL) for b in backoffs], [1, 2, 4])
+
+    def test_model_list_diffing(self):
+        """Test that re-probes only write the model rows that changed."""
+        llama = {'name': 'llama3:latest', 'modified_at': 'N/A', 'digest': 'aaa', 'parameter_size': '8B', 'quantization_level': 'Q4_0'}
+        phi = {'name': 'phi3:latest', 'modified_at': 'N/A', 'digest': 'bbb', 'parameter_size': '3.8B', 'quantization_level': 'Q4_0'}
+        mistral = {'name': 'mistral:latest', 'modified_at': 'N/A', 'digest': 'ccc', 'parameter_size': '7B', 'quantization_level': 'Q4_0'}
+        database.write_probe_results([{'ip_address': "10.0.3.1", 'performance': "Small", 'models': [llama, phi]}])
+
+        # An unchanged model list only touches the host row (and appends an observation)
+        rows = database.write_probe_results([{'ip_address': "10.0.3.1", 'performance': "Small", 'models': [llama, phi]}])
+        self.assertEqual(rows, 2)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM model_events").fetchone()[0], 0)
+        # With a digest on both sides, a new modified_at alone is not a change
+        rows = database.write_probe_results([{'ip_address': "10.0.3.1", 'performance': "Small", 'models': [
+            dict(llama, modified_at='2024-07-01'), phi]}])
+        self.assertEqual(rows, 2)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM model_events").fetchone()[0], 0)
+
+        # A re-pulled model, a new one and a removed one: 1 host + 3 model rows + 1 event + 1 observation
+        rows = database.write_probe_results([{'ip_address': "10.0.3.1", 'performance': "Small", 'models': [
+            dict(llama, digest='ddd'), mistral]}])
+        self.assertEqual(rows, 6)
+        event = self.conn.execute("SELECT added, removed, updated FROM model_events").fetchone()
+        self.assertEqual([json.loads(v) for v in event], [["mistral:latest"], ["phi3:latest"], ["llama3:latest"]])
+        stored = self.conn.execute("SELECT name, digest FROM models ORDER BY name").fetchall()
+        self.assertEqual([tuple(r) for r in stored], [("llama3:latest", "ddd"), ("mistral:latest", "ccc")])
+        self.assertEqual(database.get_host_by_ip("10.0.3.1")['change_count'], 1)
+
+    def test_host_capacity(self):
+        """Test that a host's capacity columns follow its model list."""
+        small = {'name': 'phi3:latest', 'modified_at': 'N/A', 'parameter_size': '3.8B', 'quantization_level': 'Q4_0'}
+        large = {'name': 'llama3:70b', 'modified_at': 'N/A', 'parameter_size': '70.6B', 'quantization_level': 'Q4_0'}
+        database.write_probe_results([{'ip_address': "10.0.5.1", 'performance': "High", 'models': [small, large]}])
+        host = database.get_host_by_ip("10.0.5.1")
+        self.assertEqual((host['max_model_gb'], host['capacity_gb']), (48.18, 50.77))
+
+        database.write_probe_results([{'ip_address': "10.0.5.1", 'performance': "Small", 'models': [small]}])
+        host = database.get_host_by_ip("10.0.5.1")
+        self.assertEqual((host['max_model_gb'], host['capacity_gb']), (2.59, 2.59))
+
+        database.clear_models_for_host(host['id'])
+        host = database.get_host_by_ip("10.0.5.1")
+        self.assertEqual((host['max_model_gb'], host['capacity_gb']), (0, 0))
+
+    def test_search_models(self):
+        """Test model search and the live host counts kept by triggers."""
+        def model(name, quant='Q4_0'):
+            return {'name': name, 'modified_at': 'N/A', 'parameter_size': '8B', 'quantization_level': quant}
+
+        database.write_probe_results([
+            {'ip_address': "10.0.6.1", 'performance': "Mid", 'models': [
+                model('llama3:8b'), model('llama3:8b', 'Q8_0'), model('qwen2.5-coder:32b')]},
+            {'ip_address': "10.0.6.2", 'performance': "Mid", 'models': [model('llama3:8b'), model('llama3.1:70b')]},
+        ])
+
+        def search(query):
+            return [tuple(row) for row in database.search_models(query)]
+
+        # Two quantizations of a name on one host count once
+        self.assertEqual(search("lla"), [('llama3:8b', 'llama3', 2), ('llama3.1:70b', 'llama3.1', 1)])
+        self.assertEqual(search("CODER"), [('qwen2.5-coder:32b', 'qwen2.5-coder', 1)])
+        self.assertEqual(search(":70b"), [('llama3.1:70b', 'llama3.1', 1)])
+        self.assertEqual(search("q"), [('qwen2.5-coder:32b', 'qwen2.5-coder', 1)])
+        self.assertEqual(search('"x'), [])
+
+        # Dead hosts stop counting, and names nobody serves drop out
+        host_id = database.get_host_by_ip("10.0.6.2")['id']
+        database.mark_host_as_dead(host_id)
+        self.assertEqual(search("lla"), [('llama3:8b', 'llama3', 1)])
+        database.write_probe_results([{'ip_address': "10.0.6.2", 'performance': "Mid", 'models': [model('llama3:8b')]}])
+        self.assertEqual(search("lla"), [('llama3:8b', 'llama3', 2)])
+        database.add_models(host_id, [model('llama3:8b')])
+        database.clear_models_for_host(database.get_host_by_ip("10.0.6.1")['id'])
+        self.assertEqual(search("llama3"), [('llama3:8b', 'llama3', 1)])
+
+    def test_fleet_stats(self):
+        """Test that the trigger-kept summaries track writes and match a recompute."""
+        rng = random.Random(7)
+        names = ['llama3:8b', 'llama3:70b', 'qwen2.5:7b', 'phi3:latest']
+        for _ in range(20):
+            results = []
+            for _ in range(15):
+                models = {(name, quant): {'name': name, 'modified_at': 'N/A', 'parameter_size': '8B', 'quantization_level': quant}
+                          for name, quant in zip(rng.sample(names, rng.randint(0, 3)), rng.choices(['Q4_0', 'Q8_0', None], k=3))}
+                results.append({'ip_address': f"10.0.7.{rng.randint(1, 40)}", 'performance': rng.choice(["High", "Low"]),
+                                'country': rng.choice(["Germany", "France", None]), 'models': list(models.values())})
+            database.write_probe_results(results)
+            host = database.get_host_by_ip(f"10.0.7.{rng.randint(1, 40)}")
+            if host and rng.random() < 0.5:
+                database.mark_host_as_dead(host['id'])
+            self.assertEqual(database.verify_summaries(), [])
+
+        stats = database.get_fleet_stats()
+        self.assertEqual(set(stats), set(database.STATS_DIMENSIONS))
+        alive = dict(stats['status'])['alive']
+        self.assertEqual(alive, self.conn.execute("SELECT COUNT(*) FROM hosts WHERE is_alive = 1").fetchone()[0])
+        self.assertEqual(sum(hosts for _, hosts in stats['performance']), alive)
+        self.assertEqual({key for key, _ in stats['family']} - {'llama3', 'qwen2.5', 'phi3'}, set())
+        self.assertEqual(len(database.get_fleet_stats(limit=1)['family']), 1)
+
+        # Drift is reported, and a rebuild fixes it
+        self.conn.execute("UPDATE fleet_stats SET hosts = hosts + 5 WHERE dimension = 'family' AND key = 'llama3'")
+        self.conn.execute("UPDATE model_names SET host_count = 0")
+        self.conn.commit()
+        drift = database.verify_summaries()
+        self.assertIn(('fleet_stats', 'family', 'llama3'), [row[:3] for row in drift])
+        self.assertIn('model_names', {row[0] for row in drift})
+        database.rebuild_summaries()
+        self.assertEqual(database.verify_summaries(), [])
+
+    def test_get_hosts_due(self):
+        """Test that only due hosts are returned, stalest first, within the limit."""
+        database.write_probe_results([
+            {'ip_address': "10.0.2.1", 'performance': "Small", 'models': [
+                {'name': 'llama3:latest', 'modified_at': 'N/A', 'parameter_size': '8B', 'quantization_level': 'Q4_0'}]},
+        ])
+        for ip, last_seen in [("10.0.2.2", "2024-01-01T00:00:00"), ("10.0.2.3", "2024-06-01T00:00:00"),
+                              ("10.0.2.4", "2023-01-01T00:00:00")]:
+            database.add_or_update_host(ip, "Small")
+            self.conn.execute("UPDATE hosts SET last_seen = ? WHERE ip_address = ?", (last_seen, ip))
+        # A host that keeps failing drops behind equally stale healthy hosts
+        self.conn.execute("UPDATE hosts SET fail_count = 5 WHERE ip_address = '10.0.2.4'")
+
+        due = [host['ip_address'] for host in database.get_hosts_due()]
+        self.assertEqual(due, ["10.0.2.2", "10.0.2.3", "10.0.2.4"])
+        self.assertEqual([host['ip_address'] for host in database.get_hosts_due(limit=1)], ["10.0.2.2"])
+
+    def test_observations(self):
+        """Test that every probe appends an observation and range queries find them."""
+        llama = {'name': 'llama3:latest', 'modified_at': 'N/A', 'parameter_size': '8B', 'quantization_level': 'Q4_0'}
+        database.write_probe_results([
+            {'ip_address': "10.0.4.1", 'performance': "Small", 'models': [llama], 'latency': 0.25},
+            {'ip_address': "10.0.4.2", 'performance': "Small", 'models': [llama]},
+            {'ip_address': "10.0.4.9", 'performance': None, 'models': None},  # unknown and dead, not stored
+        ])
+        self.conn.execute("UPDATE observations SET observed_at = observed_at - 60")
+        database.write_probe_results([{'ip_address': "10.0.4.1", 'performance': None, 'models': []}])
+
+        history = database.get_observations("10.0.4.1")
+        self.assertEqual([(r['status'], r['latency_ms']) for r in history],
+                         [(database.OBS_ALIVE, 250), (database.OBS_EMPTY, None)])
+        self.assertEqual(json.loads(history[0]['models']), ["llama3:latest"])
+        self.assertIsNone(history[1]['models_hash'])
+
+        since = history[1]['observed_at']
+        self.assertEqual([r['ip_address'] for r in database.get_observations(since=since)], ["10.0.4.1"])
+        self.assertEqual(len(database.get_observations(until=since)), 2)
+
+    def test_compact_observations(self):
+        """Test retention and downsampling of old observations."""
+        database.add_or_update_host("10.0.5.1", "Small")
+        host_id = database.get_host_by_ip("10.0.5.1")['id']
+        day = 86400
+        now = 400 * day
+        rows = [
+            (now - 380 * day, database.OBS_ALIVE, 1),      # past retention: dropped
+            (now - 100 * day, database.OBS_ALIVE, 1),      # first of its day: kept
+            (now - 100 * day + 60, database.OBS_ALIVE, 1),  # unchanged repeat: dropped
+            (now - 100 * day + 120, database.OBS_ALIVE, 2),  # model set changed: kept
+            (now - 100 * day + 180, database.OBS_UNREACHABLE, None),  # went dead: kept
+            (now - 100 * day + 240, database.OBS_UNREACHABLE, None),  # unchanged repeat: dropped
+            (now - day, database.OBS_ALIVE, 2),            # recent: kept raw
+            (now - day + 60, database.OBS_ALIVE, 2),
+        ]
+        self.conn.executemany("INSERT INTO observations (host_id, observed_at, status, models_hash) VALUES (?, ?, ?, ?)",
+                              [(host_id,) + row for row in rows])
+
+        version = database.get_data_version()
+        self.assertEqual(database.compact_observations(now=now), 3)
+        self.assertNotEqual(database.get_data_version(), version, "Cached history must be invalidated.")
+        kept = [r['observed_at'] for r in database.get_observations("10.0.5.1")]
+        self.assertEqual(kept, [rows[i][0] for i in (1, 3, 4, 6, 7)])
+        # Already-compacted ranges are not scanned again
+        version = database.get_data_version()
+        self.assertEqual(database.compact_observations(now=now), 0)
+        self.assertEqual(database.get_data_version(), version)
+
+    def test_compact_observations_across_calls(self):
+        """Test that a day reached by two compactions keeps one first-of-day observation."""
+        database.add_or_update_host("10.0.5.2", "Small")
+        host_id = database.get_host_by_ip("10.0.5.2")['id']
+        day = 86400
+        start = 100 * day
+        hours = [start + hour * 3600 for hour in range(24)]
+        self.conn.executemany("INSERT INTO observations (host_id, observed_at, status, models_hash) VALUES (?, ?, ?, ?)",
+                              [(host_id, at, database.OBS_ALIVE, 1) for at in hours])
+
+        # Two runs whose raw cut-offs fall at 06:00 and 18:00 of that day
+        raw_days = database.OBSERVATION_RAW_DAYS
+        database.compact_observations(now=start + raw_days * day + 6 * 3600)
+        database.compact_observations(now=start + raw_days * day + 18 * 3600)
+        self.assertEqual(len(database.get_observations("10.0.5.2")), 24, "A day still in progress is left raw.")
+
+        database.compact_observations(now=start + (raw_days + 1) * day + 6 * 3600)
+        self.assertEqual([r['observed_at'] for r in database.get_observations("10.0.5.2")], [start])
+
+    def test_reclassify_hosts(self):
+        """Test that the whole-fleet SQL pass agrees with the per-host heuristic."""
+        rng = random.Random(7)
+        sizes = ['70.6B', '32B', '14B', '10B', '8B', '750M', None, 'garbage']
+        quants = ['Q4_0', 'Q4_K_M', 'Q8_0', 'F16', 'IQ3_XS', 'iq2_s', None]
+        results = []
+        for i in range(300):
+            models = [{'name': f"model{j}", 'modified_at': 'N/A', 'parameter_size': rng.choice(sizes),
+                       'quantization_level': rng.choice(quants)} for j in range(rng.randint(1, 4))]
+            results.append({'ip_address': f"10.1.{i // 256}.{i % 256}", 'performance': "stale", 'models': models})
+        database.write_probe_results(results)
+
+        self.assertEqual(database.reclassify_hosts(dry_run=True), 300)
+        self.assertEqual(database.reclassify_hosts(), 300)
+        for r in results:
+            self.assertEqual(database.get_host_by_ip(r['ip_address'])['performance'],
+                             estimate_host_performance(r['models']), r['models'])
+        self.assertEqual(database.reclassify_hosts(), 0)
+
+class TestMigrations(unittest.TestCase):
+
+    def setUp(self):
+        """Start from a file-backed database with the original schema."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.original_db_file = database.DB_FILE
+        database.DB_FILE = os.path.join(self.tmpdir, "legacy.db")
+        conn = sqlite3.connect(database.DB_FILE)
+        database._create_tables(conn.cursor())
+        conn.executemany("INSERT INTO hosts (ip_address, last_seen, performance) VALUES (?, 'then', 'Mid-Range')",
+                         [("10.0.0.1",), ("10.0.0.2",)])
+        conn.executemany(
+            "INSERT INTO models (host_id, name, modified_at, parameter_size, quantization_level) VALUES (?, ?, ?, ?, ?)",
+            [(1, 'llama3:latest', 'a', '8B', 'Q4_0'),
+             (1, 'nomic-embed-text:latest', 'b', None, None),
+             (2, 'llama3:latest', 'c', '8B', 'Q4_0'),
+             (2, 'nomic-embed-text:latest', 'd', None, None)])
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        database.close_db_connection()
+        database.DB_FILE = self.original_db_file
+        shutil.rmtree(self.tmpdir)
+
+    def test_upgrade_in_place(self):
+        """Test that an existing database keeps its models after the upgrade."""
+        database.create_database()
+        database.create_database() # Running again must be a no-op
+
+        conn = database.get_db_connection()
+        self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], len(database.MIGRATIONS))
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM model_catalog").fetchone()[0], 2,
+                         "Identical models on different hosts should share a catalog entry.")
+        rows = conn.execute("SELECT host_id, name, modified_at, parameter_size FROM models ORDER BY host_id, name").fetchall()
+        self.assertEqual([tuple(row) for row in rows], [
+            (1, 'llama3:latest', 'a', '8B'), (1, 'nomic-embed-text:latest', 'b', None),
+            (2, 'llama3:latest', 'c', '8B'), (2, 'nomic-embed-text:latest', 'd', None),
+        ])
+        self.assertEqual([tuple(row) for row in database.search_models("emb")], [('nomic-embed-text:latest', 'nomic-embed-text', 2)])
+        indexes = {row['name'] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertTrue({'idx_hosts_alive_last_seen', 'idx_host_models_model'} <= indexes)
+
 if __name__ == '__main__':
     unittest.main()
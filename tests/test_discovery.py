@@ -0,0 +1,146 @@
+import unittest
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from unittest import mock
+
+# We need to adjust the path to import from the parent directory
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+from ollama_hunter import discovery
+
+MODELS = [{'name': 'llama3:8b', 'modified_at': 'N/A', 'parameter_size': '8B', 'quantization_level': 'Q4_0'}]
+
+class _NoWait(threading.Event):
+    """A cancel event whose politeness delays return at once."""
+
+    def wait(self, timeout=None):
+        return self.is_set()
+
+class TestDiscovery(unittest.TestCase):
+
+    def setUp(self):
+        """Walk canned Shodan pages against a fresh file-backed database."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.original_db_file = database.DB_FILE
+        database.DB_FILE = os.path.join(self.tmpdir, "test.db")
+        database.create_database()
+        self.pages = {
+            1: ["10.0.8.1", "10.0.8.2"],
+            2: ["10.0.8.3", "10.0.8.1", "10.0.8.4"],
+        }
+        self.probed = []
+        self.cancel = _NoWait()
+        self.cancel_on = None
+        self.fail_on = None
+
+        def scrape(page, headers, query, log):
+            return [{'ip': ip, 'country': None, 'city': None, 'org': None, 'timestamp': None}
+                    for ip in self.pages.get(page, [])]
+
+        def probe(ip, timeout):
+            self.probed.append(ip)
+            if ip == self.cancel_on:
+                self.cancel.set()
+            if ip == self.fail_on:
+                raise RuntimeError("probe bug")
+            return {'models': MODELS, 'error': None, 'message': None, 'timings': {}, 'elapsed': 0.01}
+
+        patches = [mock.patch.object(discovery, 'scrape_hosts_from_page', scrape),
+                   mock.patch.object(discovery, 'probe_host', probe)]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        database.close_db_connection()
+        database.DB_FILE = self.original_db_file
+        shutil.rmtree(self.tmpdir)
+
+    def discover(self, **kwargs):
+        self.cancel = _NoWait()
+        discovery.discover_hosts("cookie", log=lambda line: None, concurrency=1, cancel=self.cancel, **kwargs)
+
+    def test_resume_after_interruption(self):
+        """Test that --resume continues after the last finished page without re-probing."""
+        # Cancelling while 10.0.8.3 is probed drops 10.0.8.4, so page 2 is left unfinished
+        self.cancel_on = "10.0.8.3"
+        self.discover()
+        self.assertEqual(self.probed, ["10.0.8.1", "10.0.8.2", "10.0.8.3"])
+        run = database.get_resumable_discovery_run(discovery.QUERY)
+        self.assertEqual(run['last_page'], 1)
+        self.assertEqual(database.get_discovery_seen(run['id']), {"10.0.8.1", "10.0.8.2", "10.0.8.3"})
+
+        self.cancel_on = None
+        self.probed.clear()
+        self.discover(resume=True, skip_ttl=0)
+        self.assertEqual(self.probed, ["10.0.8.4"])
+        self.assertIsNone(database.get_resumable_discovery_run(discovery.QUERY))
+        self.assertEqual(database.get_discovery_seen(run['id']), set(), "Finished runs drop their seen IPs.")
+
+        # Nothing left to resume, so a new run starts from the first page
+        self.probed.clear()
+        self.discover(resume=True, skip_ttl=0)
+        self.assertEqual(self.probed, ["10.0.8.1", "10.0.8.2", "10.0.8.3", "10.0.8.4"])
+
+    def test_skips_recently_alive_hosts(self):
+        """Test that hosts probed successfully within the TTL, by any job, are skipped."""
+        database.write_probe_results([
+            {'ip_address': "10.0.8.1", 'performance': "Small", 'models': MODELS},
+            {'ip_address': "10.0.8.3", 'performance': "Small", 'models': []},
+        ])
+        self.discover()
+        self.assertEqual(self.probed, ["10.0.8.2", "10.0.8.3", "10.0.8.4"])
+
+        self.probed.clear()
+        self.discover(skip_ttl=0)
+        self.assertEqual(self.probed, ["10.0.8.1", "10.0.8.2", "10.0.8.3", "10.0.8.4"])
+
+    def test_parallel_probes(self):
+        """Test that several probe workers write every host once and finish the run."""
+        self.pages = {page: [f"10.0.{page}.{i}" for i in range(1, 21)] for page in range(1, 6)}
+        done = []
+        discovery.discover_hosts("cookie", log=lambda line: None, concurrency=8, chunk_size=7,
+                                 cancel=_NoWait(), progress=done.append)
+        self.assertEqual(sorted(self.probed), sorted(ip for ips in self.pages.values() for ip in ips))
+        self.assertEqual(done[-1], 100)
+        self.assertEqual(database.get_db_connection().execute("SELECT COUNT(*) FROM hosts").fetchone()[0], 100)
+        self.assertIsNone(database.get_resumable_discovery_run(discovery.QUERY))
+
+    def test_probe_crash_is_a_failed_result(self):
+        """Test that an unexpected probe exception fails that host without stalling the run."""
+        self.fail_on = "10.0.8.2"
+        self.discover()
+        self.assertIsNone(database.get_resumable_discovery_run(discovery.QUERY), "The run should finish.")
+        self.assertIsNone(database.get_host_by_ip("10.0.8.2"))
+        self.assertIsNotNone(database.get_host_by_ip("10.0.8.4"))
+
+    def test_writer_failure_stops_every_stage(self):
+        """Test that a database error in the writer cancels the pipeline instead of hanging it."""
+        self.pages = {page: [f"10.0.{page}.{i}" for i in range(1, 101)] for page in range(1, 4)}
+        failure = sqlite3.OperationalError("disk I/O error")
+        outcome = []
+
+        def run():
+            try:
+                discovery.discover_hosts("cookie", log=lambda line: None, concurrency=2, chunk_size=5,
+                                         cancel=_NoWait())
+            except sqlite3.OperationalError as e:
+                outcome.append(e)
+            finally:
+                database.close_db_connection()
+
+        with mock.patch.object(database, 'write_probe_results', side_effect=failure):
+            thread = threading.Thread(target=run)
+            thread.start()
+            thread.join(10)
+        self.assertFalse(thread.is_alive(), "discover_hosts hung after the writer failed.")
+        self.assertEqual(outcome, [failure])
+        self.assertEqual([t.name for t in threading.enumerate() if t.name.startswith("discovery-")], [])
+
+if __name__ == '__main__':
+    unittest.main()
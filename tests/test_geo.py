@@ -0,0 +1,95 @@
+import unittest
+import gzip
+import os
+import shutil
+import tempfile
+
+# We need to adjust the path to import from the parent directory
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+from ollama_hunter import geo
+
+RANGES = os.path.join(os.path.dirname(__file__), 'fixtures', 'ip_ranges.csv')
+
+class TestCountryIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = geo.CountryIndex.from_file(RANGES)
+
+    def test_lookup(self):
+        """Test CIDR, dotted, integer and four-column ranges, and misses."""
+        self.assertEqual(self.index.lookup("192.0.2.200"), "France")
+        self.assertEqual(self.index.lookup("198.51.100.0"), "Germany")
+        self.assertIsNone(self.index.lookup("203.0.113.255"), "'-' marks an unassigned range.")
+        self.assertEqual(self.index.lookup("203.0.112.255"), "Singapore")
+        self.assertEqual(self.index.lookup("100.64.3.4"), "United States")
+        self.assertEqual(self.index.lookup("2001:db8::1f"), "Japan")
+        self.assertIsNone(self.index.lookup("2001:db9::1"))
+        self.assertIsNone(self.index.lookup("8.8.8.8"))
+        self.assertIsNone(self.index.lookup("not-an-ip"))
+
+    def test_ranges_are_merged(self):
+        """Test that adjacent ranges merge and a range inside an earlier one is dropped."""
+        # Both French halves become one range; 10.1.0.0/16 is inside 10.0.0.0/8
+        self.assertEqual(len(self.index), 6)
+        self.assertEqual(self.index.lookup("10.1.2.3"), "United States")
+
+    def test_lookup_many(self):
+        """Test that the batch lookup only returns the IPs it can place."""
+        ips = ["192.0.2.1", "8.8.8.8", "2001:db8::1", "bogus"]
+        self.assertEqual(self.index.lookup_many(ips), {"192.0.2.1": "France", "2001:db8::1": "Japan"})
+
+    def test_gzip_and_bad_rows(self):
+        """Test gzipped range files, and that malformed rows are reported with their line."""
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, "ranges.csv.gz")
+        with gzip.open(path, 'wt') as f:
+            f.write("192.0.2.0/24,France\n")
+        self.assertEqual(geo.CountryIndex.from_file(path).lookup("192.0.2.9"), "France")
+
+        path = os.path.join(tmpdir, "bad.csv")
+        with open(path, 'w') as f:
+            f.write("192.0.2.0/24,France\n192.0.2.300,192.0.2.1,France\n")
+        with self.assertRaisesRegex(ValueError, r"bad\.csv:2"):
+            geo.CountryIndex.from_file(path)
+
+class TestBackfill(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.original_db_file = database.DB_FILE
+        database.DB_FILE = os.path.join(self.tmpdir, "test.db")
+        database.create_database()
+        database.write_probe_results([
+            {'ip_address': ip, 'performance': "Small", 'country': country,
+             'models': [{'name': 'llama3:8b', 'modified_at': 'N/A', 'parameter_size': '8B', 'quantization_level': 'Q4_0'}]}
+            for ip, country in [("192.0.2.1", None), ("198.51.100.1", "Deutschland"), ("8.8.8.8", None)]
+        ])
+
+    def tearDown(self):
+        database.close_db_connection()
+        database.DB_FILE = self.original_db_file
+        shutil.rmtree(self.tmpdir)
+
+    def countries(self):
+        return dict(database.get_host_countries())
+
+    def test_backfill_countries(self):
+        """Test that backfill fills missing countries, and only replaces others with overwrite."""
+        index = geo.CountryIndex.from_file(RANGES)
+        self.assertEqual(geo.backfill_countries(index, dry_run=True), (2, 1))
+        self.assertIsNone(self.countries()["192.0.2.1"])
+
+        self.assertEqual(geo.backfill_countries(index), (2, 1))
+        self.assertEqual(self.countries(), {"192.0.2.1": "France", "198.51.100.1": "Deutschland", "8.8.8.8": None})
+        self.assertEqual(dict(database.get_fleet_stats()['country'])["France"], 1)
+
+        self.assertEqual(geo.backfill_countries(index, overwrite=True), (3, 1))
+        self.assertEqual(self.countries()["198.51.100.1"], "Germany")
+        self.assertEqual(database.verify_summaries(), [])
+
+if __name__ == '__main__':
+    unittest.main()
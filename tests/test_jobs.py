@@ -0,0 +1,86 @@
+import unittest
+import os
+import threading
+
+# We need to adjust the path to import from the parent directory
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ollama_hunter import jobs
+
+def blocking_job(release, log, progress, publish, cancel):
+    """Reports progress, then waits for ``release`` or cancellation."""
+    log("[+] started")
+    progress(1, 4)
+    while not release.wait(0.01):
+        if cancel.is_set():
+            log("[!] stopping")
+            return
+
+def failing_job(log, progress, publish, cancel):
+    raise RuntimeError("boom")
+
+class TestJobManager(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = jobs.JobManager(max_workers=1, echo=None)
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+
+    def test_dedupe_and_queueing(self):
+        """Test that identical submissions share a job and the pool is bounded."""
+        first, created = self.manager.submit("refresh", blocking_job, self.release)
+        self.assertTrue(created)
+        again, created = self.manager.submit("refresh", blocking_job, self.release)
+        self.assertIs(again, first)
+        self.assertFalse(created)
+
+        other, created = self.manager.submit("other", blocking_job, self.release)
+        self.assertTrue(created)
+        self.assertEqual(other.state, jobs.QUEUED)  # the only worker is busy
+
+        self.release.set()
+        self.assertTrue(other.wait(5))
+        self.assertEqual((first.state, other.state), (jobs.SUCCEEDED, jobs.SUCCEEDED))
+        self.assertEqual([job.id for job in self.manager.list()], [other.id, first.id])
+        # A finished job no longer absorbs new submissions
+        self.assertTrue(self.manager.submit("refresh", blocking_job, self.release)[1])
+
+    def test_progress_and_follow(self):
+        """Test progress counters and that late followers get the replayed log."""
+        job, _ = self.manager.submit("refresh", blocking_job, self.release)
+        self.assertTrue(self.manager.get(job.id) is job)
+        follower = job.follow()
+        self.assertEqual(next(follower), "[+] started")
+        self.assertEqual((job.to_dict()['done'], job.to_dict()['total']), (1, 4))
+
+        self.release.set()
+        rest = list(follower)
+        self.assertTrue(rest[-1].startswith("[i] Job 'refresh' succeeded"))
+        self.assertEqual(list(job.follow())[0], "[+] started")
+
+    def test_cancel(self):
+        """Test cancelling running and queued jobs."""
+        running, _ = self.manager.submit("refresh", blocking_job, self.release)
+        queued, _ = self.manager.submit("other", blocking_job, self.release)
+        next(running.follow())  # wait until it has started
+
+        self.assertTrue(self.manager.cancel(queued.id))
+        self.assertEqual(queued.state, jobs.CANCELLED)
+        self.assertTrue(self.manager.cancel(running.id))
+        self.assertTrue(running.wait(5))
+        self.assertEqual(running.state, jobs.CANCELLED)
+        self.assertIn("[!] stopping", list(running.follow()))
+        self.assertFalse(self.manager.cancel(running.id))
+        self.assertFalse(self.manager.cancel(12345))
+
+    def test_failure(self):
+        """Test that a failing target marks the job failed with its error."""
+        job, _ = self.manager.submit("broken", failing_job)
+        self.assertTrue(job.wait(5))
+        self.assertEqual((job.state, job.error), (jobs.FAILED, "boom"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+import os
+
+# We need to adjust the path to import from the parent directory
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ollama_hunter import metrics
+
+class TestMetrics(unittest.TestCase):
+
+    def test_histogram(self):
+        """Test cumulative buckets, sum and count in the text format."""
+        histogram = metrics.Histogram("test_seconds", "A test histogram.", ["phase"], buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 3.0):
+            histogram.observe(value, phase="connect")
+        self.assertEqual(histogram.render(), [
+            '# HELP test_seconds A test histogram.',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{phase="connect",le="0.1"} 1',
+            'test_seconds_bucket{phase="connect",le="1.0"} 3',
+            'test_seconds_bucket{phase="connect",le="+Inf"} 4',
+            'test_seconds_sum{phase="connect"} 4.25',
+            'test_seconds_count{phase="connect"} 4',
+        ])
+        with self.assertRaises(ValueError):
+            histogram.observe(1.0)
+
+    def test_counter_and_registry(self):
+        """Test counters, label escaping and idempotent registration."""
+        counter = metrics.counter("test_errors", "A test counter.", ["kind"])
+        self.assertIs(metrics.counter("test_errors", "A test counter.", ["kind"]), counter)
+        counter.inc(kind='say "hi"')
+        counter.inc(2, kind='say "hi"')
+        self.assertEqual(counter.value(kind='say "hi"'), 3)
+        self.assertIn('test_errors_total{kind="say \\"hi\\""} 3', metrics.render())
+        with self.assertRaises(ValueError):
+            metrics.histogram("test_errors", "Clashes with the counter.")
+
+if __name__ == '__main__':
+    unittest.main()
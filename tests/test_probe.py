@@ -0,0 +1,162 @@
+import unittest
+import json
+import os
+import socket
+import threading
+import time
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# We need to adjust the path to import from the parent directory
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ollama_hunter import probe
+
+TAGS = {"models": [{"name": "llama3:8b", "modified_at": "2024-07-01T12:00:00Z", "digest": "365c0bd3",
+                    "details": {"parameter_size": "8.0B", "quantization_level": "Q4_0"}}]}
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        status, body = self.server.reply
+        self.send_response(status)
+        headers = {"Content-Type": "application/json", "Content-Length": str(len(body)), **self.server.headers}
+        for name, value in headers.items():
+            if value is not None:
+                self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except ConnectionError:
+            pass  # the probe gave up on the body
+
+    def log_message(self, *args):
+        pass
+
+class TestProbe(unittest.TestCase):
+
+    def setUp(self):
+        """Serve canned /api/tags replies on a free local port."""
+        self.server = HTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.reply = (200, json.dumps(TAGS).encode())
+        self.server.headers = {}
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.original_port = probe.OLLAMA_PORT
+        probe.OLLAMA_PORT = self.server.server_address[1]
+
+    def tearDown(self):
+        probe.OLLAMA_PORT = self.original_port
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_probe_host(self):
+        """Test a successful probe reports its models and every phase."""
+        errors_before = probe.PROBE_SECONDS.count(outcome='ok')
+        result = probe.probe_host("127.0.0.1")
+        self.assertIsNone(result['error'])
+        self.assertEqual([model.as_dict() for model in result['models']], [{
+            'name': 'llama3:8b', 'modified_at': '2024-07-01T12:00:00Z', 'digest': '365c0bd3', 'size': None,
+            'parameter_size': '8.0B', 'quantization_level': 'Q4_0'}])
+        self.assertEqual(tuple(result['timings']), probe.PHASES)
+        self.assertGreaterEqual(result['elapsed'], sum(result['timings'].values()))
+        self.assertEqual(probe.PROBE_SECONDS.count(outcome='ok'), errors_before + 1)
+
+    def test_error_classification(self):
+        """Test that failures are classified by kind."""
+        self.server.reply = (404, b"not found")
+        self.assertEqual(probe.probe_host("127.0.0.1")['error'], 'http')
+        self.server.reply = (200, b"<html>")
+        self.assertEqual(probe.probe_host("127.0.0.1")['error'], 'json')
+        self.server.reply = (200, b"[1, 2]")
+        self.assertEqual(probe.probe_host("127.0.0.1")['error'], 'json')
+        self.server.reply = (200, b'{"models": [1, 2]}')
+        self.assertEqual(probe.probe_host("127.0.0.1")['error'], 'json')
+        for model in ({"modified_at": "N/A"}, {"name": None}, {"name": ""},
+                      {"name": "x", "details": {"parameter_size": [7]}}, {"name": "x", "digest": 1}):
+            self.server.reply = (200, json.dumps({"models": [model]}).encode())
+            self.assertEqual(probe.probe_host("127.0.0.1")['error'], 'json', model)
+        self.assertEqual(probe.probe_host("no-such-host.invalid")['error'], 'dns')
+
+        # Nothing listens on a port we just released
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            probe.OLLAMA_PORT = sock.getsockname()[1]
+        refusals_before = probe.PROBE_ERRORS.value(kind='refused')
+        self.assertEqual(probe.probe_host("127.0.0.1")['error'], 'refused')
+        self.assertEqual(probe.PROBE_ERRORS.value(kind='refused'), refusals_before + 1)
+
+    def test_timeout(self):
+        """Test that a host that accepts but never answers times out."""
+        with socket.socket() as listener:
+            listener.bind(("127.0.0.1", 0))
+            listener.listen()
+            probe.OLLAMA_PORT = listener.getsockname()[1]
+            result = probe.probe_host("127.0.0.1", timeout=0.2)
+        self.assertEqual(result['error'], 'timeout')
+        self.assertIn('connect', result['timings'])
+        self.assertIsNone(result['models'])
+
+    def test_content_type_and_size_cap(self):
+        """Test that non-JSON replies and bodies over the cap are abandoned early."""
+        self.server.headers = {"Content-Type": "text/html; charset=utf-8"}
+        result = probe.probe_host("127.0.0.1")
+        self.assertEqual(result['error'], 'json')
+        self.assertNotIn('body', result['timings'], "The body should not be read.")
+
+        big = json.dumps({"models": TAGS["models"] * 200}).encode()
+        self.server.headers = {}
+        self.server.reply = (200, big)
+        original_cap = probe.MAX_TAGS_BYTES
+        self.addCleanup(setattr, probe, 'MAX_TAGS_BYTES', original_cap)
+        probe.MAX_TAGS_BYTES = len(big) - 1
+        self.assertEqual(probe.probe_host("127.0.0.1")['error'], 'size')
+
+        # Without a Content-Length the cap is enforced while streaming
+        self.server.headers = {"Content-Length": None}
+        self.assertEqual(probe.probe_host("127.0.0.1")['error'], 'size')
+        probe.MAX_TAGS_BYTES = len(big)
+        self.assertEqual(len(probe.probe_host("127.0.0.1")['models']), 200)
+
+    def test_model_record(self):
+        """Test that model records read like the dicts they replace, with either JSON parser."""
+        body = json.dumps({"models": [{**TAGS["models"][0], "size": 4661224676, "details": None}]}).encode()
+        for loads in {probe._loads, json.loads}:
+            with self.subTest(loads=loads):
+                with mock.patch.object(probe, '_loads', loads):
+                    model, = probe._parse_tags(body)
+                self.assertEqual(model['name'], 'llama3:8b')
+                self.assertEqual(model.get('size'), 4661224676)
+                self.assertIsNone(model.get('parameter_size'))
+                self.assertEqual(model.get('nope', 'default'), 'default')
+                with self.assertRaises(KeyError):
+                    model['details']
+                self.assertFalse(hasattr(model, '__dict__'))
+
+    def test_trickling_reply_times_out(self):
+        """Test that the timeout bounds the whole probe, not each read."""
+        with socket.socket() as listener:
+            listener.bind(("127.0.0.1", 0))
+            listener.listen()
+            probe.OLLAMA_PORT = listener.getsockname()[1]
+
+            def trickle():
+                conn, _ = listener.accept()
+                with conn:
+                    conn.recv(4096)
+                    try:
+                        conn.sendall(b"HTTP/1.0 200 OK\r\nContent-Type: application/json\r\n\r\n")
+                        for _ in range(20):
+                            conn.sendall(b" ")
+                            time.sleep(0.1)
+                    except OSError:
+                        pass  # the probe hung up
+
+            threading.Thread(target=trickle, daemon=True).start()
+            started = time.monotonic()
+            result = probe.probe_host("127.0.0.1", timeout=0.5)
+        self.assertEqual(result['error'], 'timeout')
+        self.assertLess(time.monotonic() - started, 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
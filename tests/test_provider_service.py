@@ -0,0 +1,353 @@
+import unittest
+import csv
+import importlib.util
+import io
+import json
+from datetime import datetime, timedelta, timezone
+import os
+import shutil
+import tempfile
+import threading
+from unittest.mock import patch
+
+# We need to adjust the path to import from the parent directory
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+
+# provider-service.py is not a valid module name, so load it by path
+_spec = importlib.util.spec_from_file_location(
+    "provider_service", os.path.join(os.path.dirname(__file__), '..', 'provider-service.py'))
+provider_service = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(provider_service)
+
+class TestProviderService(unittest.TestCase):
+
+    def setUp(self):
+        """Point the app at a fresh file-backed database with a few hosts."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.original_db_file = database.DB_FILE
+        database.DB_FILE = os.path.join(self.tmpdir, "test.db")
+        database.create_database()
+        database.write_probe_results([
+            {'ip_address': "10.0.0.1", 'performance': "High-Performance", 'country': "Germany", 'models': [
+                {'name': 'llama3:70b', 'modified_at': '2024-07-01', 'parameter_size': '70.6B', 'quantization_level': 'Q4_0'},
+                {'name': 'phi3:latest', 'modified_at': '2024-05-01', 'parameter_size': '3.8B', 'quantization_level': 'Q4_0'},
+            ]},
+            {'ip_address': "10.0.0.2", 'performance': "Small-Model / Hobbyist", 'country': None, 'models': [
+                {'name': 'phi3:latest', 'modified_at': '2024-05-01', 'parameter_size': '3.8B', 'quantization_level': 'Q4_0'},
+            ]},
+            {'ip_address': "10.0.0.3", 'performance': "Mid-Range", 'country': "France", 'models': [
+                {'name': 'qwen2.5:32b', 'modified_at': '2024-09-01', 'parameter_size': '32.8B', 'quantization_level': 'Q4_K_M'},
+            ]},
+        ])
+        database.mark_host_as_dead(database.get_host_by_ip("10.0.0.3")['id'])
+        self.client = provider_service.app.test_client()
+
+    def tearDown(self):
+        database.close_db_connection()
+        database.DB_FILE = self.original_db_file
+        shutil.rmtree(self.tmpdir)
+
+    def test_api_providers(self):
+        """Test that live hosts are returned with all of their models."""
+        response = self.client.get("/api/providers")
+        self.assertEqual(response.status_code, 200)
+        providers = {p['ip_address']: p for p in response.get_json()}
+        self.assertEqual(set(providers), {"10.0.0.1", "10.0.0.2"})
+        self.assertEqual([m['name'] for m in providers["10.0.0.1"]['models']], ['llama3:70b', 'phi3:latest'])
+        self.assertEqual(providers["10.0.0.1"]['models'][0], {
+            'name': 'llama3:70b', 'modified_at': '2024-07-01', 'parameter_size': '70.6B', 'quantization_level': 'Q4_0',
+            'parameter_size_b': 70.6, 'footprint_gb': 48.18})
+
+    def test_index_filters_by_model(self):
+        """Test that the index page lists live hosts and honours the model filter."""
+        body = self.client.get("/").get_data(as_text=True)
+        self.assertIn("10.0.0.1", body)
+        self.assertIn("10.0.0.2", body)
+        self.assertNotIn("10.0.0.3", body)
+
+        body = self.client.get("/?models=llama3:70b&sort_by=performance&order=asc").get_data(as_text=True)
+        self.assertIn("10.0.0.1", body)
+        self.assertNotIn("10.0.0.2", body)
+
+        body = self.client.get("/?sort_by=size&order=asc").get_data(as_text=True)
+        self.assertLess(body.index("10.0.0.2"), body.index("10.0.0.1"))
+        self.assertIn("70.6B, ~48.2 GB", body)
+        body = self.client.get("/?min_params_b=30").get_data(as_text=True)
+        self.assertIn("10.0.0.1", body)
+        self.assertNotIn("10.0.0.2", body)
+
+        # Sort links and the filter form carry the size filters and sort along
+        body = self.client.get("/?min_params_b=30&max_footprint_gb=60&sort_by=capacity").get_data(as_text=True)
+        self.assertIn("sort_by=size&amp;order=desc&amp;min_params_b=30&amp;max_footprint_gb=60", body)
+        self.assertNotIn("models=", body.split("<thead>")[1].split("</thead>")[0])
+        self.assertIn('<input type="hidden" name="sort_by" value="capacity">', body)
+
+    def test_index_largest_model_is_one_model(self):
+        """Test that the Largest Model column describes a single model."""
+        database.write_probe_results([
+            {'ip_address': "10.0.0.4", 'performance': "High-Performance", 'models': [
+                {'name': 'llama3:70b-q2', 'modified_at': '2024-07-01', 'parameter_size': '70.6B', 'quantization_level': 'Q2_K'},
+                {'name': 'qwen2.5:32b-fp16', 'modified_at': '2024-09-01', 'parameter_size': '32.8B', 'quantization_level': 'F16'},
+            ]},
+        ])
+        models = {m['name']: m for m in self.client.get("/api/providers?ip=10.0.0.4").get_json()[0]['models']}
+        largest = models['qwen2.5:32b-fp16']
+        self.assertGreater(largest['footprint_gb'], models['llama3:70b-q2']['footprint_gb'])
+        body = self.client.get("/").get_data(as_text=True)
+        self.assertIn(f"32.8B, ~{largest['footprint_gb']:.1f} GB", body)
+        self.assertNotIn("70.6B, ~" + f"{largest['footprint_gb']:.1f}", body)
+
+    def test_api_providers_pagination(self):
+        """Test walking every page with the keyset cursor."""
+        seen = []
+        response = self.client.get("/api/providers?limit=1")
+        while True:
+            self.assertEqual(response.status_code, 200)
+            page = response.get_json()
+            self.assertEqual(len(page), 1)
+            seen.extend(p['ip_address'] for p in page)
+            next_cursor = response.headers.get('X-Next-Cursor')
+            if not next_cursor:
+                self.assertNotIn('Link', response.headers)
+                break
+            self.assertIn('rel="next"', response.headers['Link'])
+            response = self.client.get(f"/api/providers?limit=1&cursor={next_cursor}")
+        self.assertEqual(seen, ["10.0.0.2", "10.0.0.1"], "Ties on last_seen should fall back to newest id first.")
+
+    def test_api_providers_sort_by_capacity(self):
+        """Test ?sort=capacity paging and the capacity bounds."""
+        response = self.client.get("/api/providers?sort=capacity&limit=1&fields=ip_address,capacity_gb")
+        self.assertEqual(response.get_json(), [{'ip_address': "10.0.0.1", 'capacity_gb': 50.77}])
+        response = self.client.get(f"/api/providers?sort=capacity&limit=1&fields=ip_address&cursor={response.headers['X-Next-Cursor']}")
+        self.assertEqual(response.get_json(), [{'ip_address': "10.0.0.2"}])
+        self.assertNotIn('X-Next-Cursor', response.headers)
+
+        response = self.client.get("/api/providers?min_capacity_gb=10&fields=ip_address,max_model_gb")
+        self.assertEqual(response.get_json(), [{'ip_address': "10.0.0.1", 'max_model_gb': 48.18}])
+        response = self.client.get("/api/providers?max_max_model_gb=10&fields=ip_address")
+        self.assertEqual(response.get_json(), [{'ip_address': "10.0.0.2"}])
+
+        # A cursor only continues the ordering it was issued for
+        cursor = self.client.get("/api/providers?limit=1").headers['X-Next-Cursor']
+        self.assertEqual(self.client.get(f"/api/providers?sort=capacity&cursor={cursor}").status_code, 400)
+        self.assertEqual(self.client.get("/api/providers?sort=ip").status_code, 400)
+
+    def test_api_providers_fields_and_filters(self):
+        """Test ?fields= projection and the SQL-side filters."""
+        response = self.client.get("/api/providers?fields=ip_address,performance")
+        self.assertEqual(sorted(p['ip_address'] for p in response.get_json()), ["10.0.0.1", "10.0.0.2"])
+        self.assertEqual(set(response.get_json()[0]), {'ip_address', 'performance'})
+
+        response = self.client.get("/api/providers?model=llama3:70b&fields=ip_address,models")
+        self.assertEqual(response.get_json(), [{'ip_address': "10.0.0.1", 'models': [
+            {'name': 'llama3:70b', 'modified_at': '2024-07-01', 'parameter_size': '70.6B', 'quantization_level': 'Q4_0',
+             'parameter_size_b': 70.6, 'footprint_gb': 48.18},
+            {'name': 'phi3:latest', 'modified_at': '2024-05-01', 'parameter_size': '3.8B', 'quantization_level': 'Q4_0',
+             'parameter_size_b': 3.8, 'footprint_gb': 2.59},
+        ]}])
+
+        # Numeric bounds apply to a single model on the host
+        response = self.client.get("/api/providers?min_params_b=30&fields=ip_address")
+        self.assertEqual(response.get_json(), [{'ip_address': "10.0.0.1"}])
+        response = self.client.get("/api/providers?min_params_b=30&max_footprint_gb=24&fields=ip_address")
+        self.assertEqual(response.get_json(), [])
+        response = self.client.get("/api/providers?max_footprint_gb=24&fields=ip_address")
+        self.assertEqual(sorted(p['ip_address'] for p in response.get_json()), ["10.0.0.1", "10.0.0.2"])
+
+        response = self.client.get("/api/providers?performance=Small-Model / Hobbyist&fields=ip_address")
+        self.assertEqual(response.get_json(), [{'ip_address': "10.0.0.2"}])
+        response = self.client.get("/api/providers?country=Germany&fields=ip_address")
+        self.assertEqual(response.get_json(), [{'ip_address': "10.0.0.1"}])
+
+    def test_api_providers_bad_arguments(self):
+        """Test that bad paging arguments are rejected with a 400."""
+        self.assertEqual(self.client.get("/api/providers?limit=0").status_code, 400)
+        self.assertEqual(self.client.get("/api/providers?fields=password").status_code, 400)
+        self.assertEqual(self.client.get("/api/providers?cursor=not-a-cursor").status_code, 400)
+        self.assertEqual(self.client.get("/api/providers?min_params_b=big").status_code, 400)
+
+    def test_model_search(self):
+        """Test the model autocomplete endpoint."""
+        response = self.client.get("/api/models/search?q=phi")
+        self.assertEqual(response.get_json(), [{'name': 'phi3:latest', 'family': 'phi3', 'hosts': 2}])
+        # 10.0.0.3 is dead, so nobody serves qwen2.5
+        self.assertEqual(self.client.get("/api/models/search?q=qwen").get_json(), [])
+        response = self.client.get("/api/models/search?limit=1")
+        self.assertEqual(response.get_json(), [{'name': 'phi3:latest', 'family': 'phi3', 'hosts': 2}])
+        self.assertEqual(self.client.get("/api/models/search?q=l&limit=0").status_code, 400)
+
+    def test_stats(self):
+        """Test the fleet stats API and page."""
+        stats = self.client.get("/api/stats").get_json()
+        self.assertEqual(stats['hosts'], {'alive': 2, 'dead': 1})
+        self.assertEqual(stats['country'], [{'key': None, 'hosts': 1}, {'key': 'Germany', 'hosts': 1}])
+        self.assertEqual(stats['family'], [{'key': 'phi3', 'hosts': 2}, {'key': 'llama3', 'hosts': 1}])
+        self.assertEqual(stats['quantization'], [{'key': 'Q4_0', 'hosts': 2}])
+        self.assertEqual(self.client.get("/api/stats?limit=1").get_json()['family'], [{'key': 'phi3', 'hosts': 2}])
+        self.assertEqual(self.client.get("/api/stats?limit=-1").status_code, 400)
+
+        body = self.client.get("/stats").get_data(as_text=True)
+        self.assertIn("Live hosts by model family", body)
+        self.assertIn("phi3", body)
+
+    def test_export_ndjson(self):
+        """Test the NDJSON export and its ?since= filter."""
+        response = self.client.get("/api/providers.ndjson")
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([line['ip_address'] for line in lines], ["10.0.0.1", "10.0.0.2"])
+        self.assertEqual([m['name'] for m in lines[0]['models']], ['llama3:70b', 'phi3:latest'])
+
+        since = lines[-1]['last_seen']
+        self.assertEqual(self.client.get(f"/api/providers.ndjson?since={since}").get_data(as_text=True), "")
+        self.assertEqual(self.client.get("/api/providers.ndjson?since=yesterday").status_code, 400)
+
+        # An offset timestamp means the same instant as its naive UTC form, not a later one
+        before = datetime.fromisoformat(lines[0]['last_seen']) - timedelta(seconds=1)
+        shifted = (before + timedelta(hours=2)).replace(tzinfo=timezone(timedelta(hours=2))).isoformat()
+        response = self.client.get("/api/providers.ndjson", query_string={'since': shifted})
+        self.assertEqual(len(response.get_data(as_text=True).splitlines()), 2)
+
+        # So does a trailing Z, which fromisoformat only accepts from Python 3.11
+        zulu = before.isoformat() + "Z"
+        response = self.client.get("/api/providers.ndjson", query_string={'since': zulu})
+        self.assertEqual(len(response.get_data(as_text=True).splitlines()), 2)
+
+    def test_export_csv(self):
+        """Test the CSV export."""
+        response = self.client.get("/api/providers.csv?country=Germany")
+        self.assertEqual(response.mimetype, 'text/csv')
+        rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual(rows[0], ['id', 'ip_address', 'country', 'last_seen', 'performance', 'models'])
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][1], "10.0.0.1")
+        self.assertEqual(rows[1][5], "llama3:70b;phi3:latest")
+
+    def test_host_history(self):
+        """Test the observation history endpoint and its time window."""
+        database.get_db_connection().execute("UPDATE observations SET observed_at = observed_at - 60")
+        database.write_probe_results([{'ip_address': "10.0.0.2", 'performance': None, 'models': None}])
+        history = self.client.get("/api/host/10.0.0.2/history").get_json()
+        self.assertEqual([h['status'] for h in history], ['alive', 'unreachable'])
+        self.assertEqual(history[0]['models'], ['phi3:latest'])
+
+        self.assertEqual(self.client.get("/api/host/10.0.0.2/history?until=2000-01-01T00:00:00").get_json(), [])
+        self.assertEqual(self.client.get("/api/host/10.0.0.2/history?until=2000-01-01T00:00:00Z").get_json(), [])
+        self.assertEqual(len(self.client.get("/api/host/10.0.0.2/history?since=2000-01-01T00:00:00Z").get_json()), 2)
+        self.assertEqual(self.client.get("/api/host/10.0.0.2/history?since=yesterday").status_code, 400)
+
+    def test_metrics(self):
+        """Test that /metrics exposes request and database timings."""
+        self.client.get("/api/providers")
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain"))
+        body = response.get_data(as_text=True)
+        self.assertIn('ollama_http_request_seconds_count{endpoint="get_providers",status="200"}', body)
+        self.assertIn('ollama_db_query_seconds_count{query="write_probe_results"}', body)
+        self.assertIn('ollama_db_query_seconds_count{query="mark_host_as_dead"}', body)
+
+    def test_jobs_api(self):
+        """Test listing, inspecting and cancelling jobs over the API."""
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def wait_for_release(log, progress, publish, cancel):
+            while not release.wait(0.01) and not cancel.is_set():
+                pass
+
+        job, _ = provider_service.jobs.start_job("test", wait_for_release)
+        listed = self.client.get("/api/jobs").get_json()
+        self.assertIn(job.id, [j['id'] for j in listed])
+        self.assertEqual(self.client.get(f"/api/jobs/{job.id}").get_json()['name'], "test")
+
+        self.assertEqual(self.client.post(f"/api/jobs/{job.id}/cancel").status_code, 202)
+        self.assertTrue(job.wait(5))
+        self.assertEqual(job.state, "cancelled")
+        self.assertEqual(self.client.post(f"/api/jobs/{job.id}/cancel").status_code, 409)
+        self.assertEqual(self.client.get("/api/jobs/999999").status_code, 404)
+
+    def test_job_events_stream(self):
+        """Test that a job's events arrive as SSE frames ending with an end event."""
+        def report(log, progress, publish, cancel):
+            publish('host', {'host': "10.0.0.9", 'status': 'alive', 'models': 3})
+            progress(1, 1)
+
+        job, _ = provider_service.jobs.start_job("report", report)
+        self.assertTrue(job.wait(5))
+        body = self.client.get(f"/api/jobs/{job.id}/events").get_data(as_text=True)
+        frames = [frame for frame in body.split("\n\n") if frame]
+        kinds = [frame.split("event: ")[1].split("\n")[0] for frame in frames]
+        self.assertEqual(kinds[kinds.index('host'):], ['host', 'progress', 'log', 'state', 'end'])
+        self.assertIn('data: {"host":"10.0.0.9","status":"alive","models":3}', body)
+
+        # A reconnecting client only gets what it has not seen
+        self.assertIn(f"id: {job.id}:{job.events.last_id}\n", body)
+        resumed = self.client.get(f"/api/jobs/{job.id}/events", headers={'Last-Event-ID': f"{job.id}:{job.events.last_id}"})
+        self.assertEqual(resumed.get_data(as_text=True).count("event: "), 1)
+
+        # A position in another job does not skip any of this one
+        other = self.client.get(f"/api/jobs/{job.id}/events", headers={'Last-Event-ID': f"{job.id + 1000}:{job.events.last_id}"})
+        self.assertEqual(other.get_data(as_text=True), body)
+
+    def test_stream_refresh_resumes_its_own_job(self):
+        """Test that a reconnecting refresh stream never resumes a different refresh."""
+        def finish(log, progress, publish, cancel):
+            log("[✓] done")
+
+        old, _ = provider_service.jobs.start_job("refresh", finish)
+        self.assertTrue(old.wait(5))
+        seen = {'Last-Event-ID': f"{old.id}:{old.events.last_id}"}
+        body = self.client.get("/stream-refresh", headers=seen).get_data(as_text=True)
+        self.assertEqual(body.count("event: "), 1)  # only the end event is new
+        self.assertIn(f'"id": {old.id},', body)
+
+        # An id from a refresh that is gone replays a new refresh from the start
+        with patch.object(provider_service, 'refresh_hosts', finish):
+            body = self.client.get("/stream-refresh", headers={'Last-Event-ID': "999999:5"}).get_data(as_text=True)
+        new = provider_service.jobs.manager.latest("refresh")
+        self.assertNotEqual(new.id, old.id)
+        self.assertTrue(body.startswith(f"id: {new.id}:1\n"))
+
+    def test_conditional_get(self):
+        """Test ETag revalidation and that writes invalidate cached responses."""
+        first = self.client.get("/api/providers?fields=ip_address")
+        etag = first.headers['ETag']
+        self.assertIsNotNone(first.headers.get('Last-Modified'))
+
+        cached = self.client.get("/api/providers?fields=ip_address", headers={'If-None-Match': etag})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.get_data(), b"")
+
+        database.write_probe_results([
+            {'ip_address': "10.0.0.9", 'performance': "Mid-Range", 'models': [
+                {'name': 'mistral:latest', 'modified_at': '2024-02-01', 'parameter_size': '7.2B', 'quantization_level': 'Q4_0'},
+            ]},
+        ])
+        fresh = self.client.get("/api/providers?fields=ip_address", headers={'If-None-Match': etag})
+        self.assertEqual(fresh.status_code, 200)
+        self.assertNotEqual(fresh.headers['ETag'], etag)
+        self.assertIn("10.0.0.9", [p['ip_address'] for p in fresh.get_json()])
+
+    def test_flashed_page_bypasses_cache(self):
+        """Test that a pending flash message is rendered even when the ETag matches."""
+        etag = self.client.get("/").headers['ETag']
+        self.client.post("/run-compass", data={})
+        response = self.client.get("/", headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Shodan cookie is required!", response.get_data(as_text=True))
+
+    def test_page_that_flashes_is_not_cached(self):
+        """Test that a page which flashed while rendering is not served to the next visitor."""
+        url = "/?min_params_b=lots"
+        self.assertIn("Model size bounds must be numbers.", self.client.get(url).get_data(as_text=True))
+        with patch.object(provider_service, 'flash') as flash:
+            body = self.client.get(url).get_data(as_text=True)
+        flash.assert_called_once()
+        self.assertNotIn("Model size bounds must be numbers.", body)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from unittest import mock
+
+# We need to adjust the path to import from the parent directory
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+from ollama_hunter import refresh
+from ollama_hunter.refresh import interleave_by_subnet, subnet_key
+
+MODELS = [{'name': 'llama3:8b', 'modified_at': 'N/A', 'parameter_size': '8B', 'quantization_level': 'Q4_0'}]
+
+class TestRefresh(unittest.TestCase):
+
+    def test_subnet_key(self):
+        """Test grouping of IPv4, IPv6 and hostnames for politeness limits."""
+        self.assertEqual(subnet_key("10.1.2.3"), "10.1.2.0/24")
+        self.assertEqual(subnet_key("10.1.2.200"), "10.1.2.0/24")
+        self.assertEqual(subnet_key("2001:db8::1"), "2001:db8::/64")
+        self.assertEqual(subnet_key("ollama.example.com"), "ollama.example.com")
+
+    def test_interleave_by_subnet(self):
+        """Test that hosts from one /24 are spread out round-robin."""
+        hosts = [{'ip_address': ip} for ip in ["10.0.0.1", "10.0.0.2", "10.0.0.3", "10.0.1.1", "10.0.2.1"]]
+        ordered = [h['ip_address'] for h in interleave_by_subnet(hosts)]
+        self.assertEqual(ordered, ["10.0.0.1", "10.0.1.1", "10.0.2.1", "10.0.0.2", "10.0.0.3"])
+
+class TestRefreshHosts(unittest.TestCase):
+
+    def setUp(self):
+        """Run refreshes against a fresh database with a probe that tracks what is in flight."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.original_db_file = database.DB_FILE
+        database.DB_FILE = os.path.join(self.tmpdir, "test.db")
+        database.create_database()
+        # Four /24s of ten hosts each; hosts ending in 0 do not answer
+        self.ips = [f"10.0.{subnet}.{i}" for subnet in range(4) for i in range(10)]
+        with database.transaction() as conn:
+            conn.executemany("INSERT INTO hosts (ip_address, last_seen, performance, is_alive) "
+                             "VALUES (?, '2024-01-01T00:00:00', 'Unknown', 1)", [(ip,) for ip in self.ips])
+
+        self.lock = threading.Lock()
+        self.in_flight = Counter()
+        self.peak = Counter()
+        self.started = []
+
+        def probe(ip, timeout):
+            subnet = subnet_key(ip)
+            with self.lock:
+                self.started.append(time.monotonic())
+                self.in_flight['all'] += 1
+                self.in_flight[subnet] += 1
+                for key in ('all', subnet):
+                    self.peak[key] = max(self.peak[key], self.in_flight[key])
+            time.sleep(0.02)
+            with self.lock:
+                self.in_flight['all'] -= 1
+                self.in_flight[subnet] -= 1
+            dead = ip.endswith(".0")
+            return {'models': None if dead else MODELS, 'error': 'refused' if dead else None,
+                    'message': None, 'timings': {'connect': 0.01}, 'elapsed': 0.02}
+
+        patch = mock.patch.object(refresh, 'probe_host', probe)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        database.close_db_connection()
+        database.DB_FILE = self.original_db_file
+        shutil.rmtree(self.tmpdir)
+
+    def test_concurrency_limits(self):
+        """Test that the global and per-/24 limits hold and every result is written."""
+        done = []
+        refresh.refresh_hosts(log=lambda line: None, concurrency=8, per_subnet=1, chunk_size=7,
+                              full=True, progress=lambda probed, total: done.append(probed))
+        self.assertEqual(done[-1], len(self.ips))
+        # With eight workers but one probe per /24, four subnets allow four at once
+        self.assertEqual(self.peak['all'], 4)
+        for subnet in range(4):
+            self.assertEqual(self.peak[f"10.0.{subnet}.0/24"], 1)
+
+        hosts = {h['ip_address']: h for h in database.get_all_hosts()}
+        self.assertEqual(set(hosts), set(self.ips))
+        for ip, host in hosts.items():
+            self.assertIsNotNone(host['last_probed_at'], ip)
+            self.assertEqual(host['is_alive'], 0 if ip.endswith(".0") else 1, ip)
+
+        self.peak.clear()
+        refresh.refresh_hosts(log=lambda line: None, concurrency=3, per_subnet=10, full=True)
+        self.assertEqual(self.peak['all'], 3)
+
+    def test_max_rate(self):
+        """Test that max_rate spaces out probe starts."""
+        refresh.refresh_hosts(log=lambda line: None, concurrency=8, per_subnet=8, max_rate=100, full=True)
+        self.assertEqual(len(self.started), len(self.ips))
+        # 40 starts at 100/s take at least 0.39s
+        self.assertGreaterEqual(max(self.started) - min(self.started), 0.37)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import os
+from unittest import mock
+
+# We need to adjust the path to import from the parent directory
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ollama_hunter import shodan
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+class TestShodanParsing(unittest.TestCase):
+
+    def setUp(self):
+        self.page = fixture('shodan_results.html')
+
+    def test_parse_results(self):
+        """Test that every field is pulled from each result card."""
+        hosts = shodan.parse_results(self.page)
+        self.assertEqual(len(hosts), 10)
+        self.assertEqual(hosts[0], {'ip': '116.238.231.131', 'country': 'France', 'city': 'Roubaix',
+                                    'org': 'Hetzner Online GmbH', 'timestamp': '2024-07-26T15:40:39.831496'})
+        self.assertEqual(hosts[5]['ip'], '2001:db8::1f')
+        # Entities are decoded, and markup quoted in banners is ignored
+        self.assertEqual(hosts[3], {'ip': '62.15.237.84', 'country': None, 'city': None,
+                                    'org': 'AT&T Services, Inc.', 'timestamp': '2024-07-16T16:14:40.308440'})
+        self.assertIsNone(hosts[6]['org'])
+        self.assertIsNone(hosts[8]['timestamp'])
+        self.assertNotIn('10.9.9.9', [host['ip'] for host in hosts])
+
+    def test_backends_agree(self):
+        """Test that every installed backend extracts the same hosts."""
+        expected = shodan.parse_results(self.page, backend='regex')
+        for backend in shodan.available_backends():
+            with self.subTest(backend=backend):
+                self.assertEqual(shodan.parse_results(self.page, backend=backend), expected)
+                self.assertEqual(shodan.parse_results(fixture('shodan_no_results.html'), backend=backend), [])
+
+    def test_card_variants(self):
+        """Test absolute host links, extra classes and cards without a host link."""
+        page = '''
+            <div class="result extra"><a class="text-dark title" href="https://www.shodan.io/host/198.51.100.7">x</a>
+                <span class="flag country_name"> South
+                    Korea </span></div>
+            <div class="result"><a class="title" href="/search?query=x">not a host</a></div>
+            <div class="results-summary"><a class="title" href="/host/192.0.2.1">sidebar</a></div>
+        '''
+        for backend in shodan.available_backends():
+            with self.subTest(backend=backend):
+                self.assertEqual(shodan.parse_results(page, backend=backend), [
+                    {'ip': '198.51.100.7', 'country': 'South Korea', 'city': None, 'org': None, 'timestamp': None}])
+
+    def test_falls_back_when_fast_path_misses(self):
+        """Test that a backend finding nothing on a page with host links hands over to the next."""
+        with mock.patch.dict(shodan.BACKENDS, regex=lambda page: []):
+            self.assertEqual(len(shodan.parse_results(self.page)), 10)
+            self.assertEqual(shodan.parse_results(fixture('shodan_no_results.html')), [])
+
+if __name__ == '__main__':
+    unittest.main()